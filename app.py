@@ -1,20 +1,27 @@
-import os
 import streamlit as st
 st.set_page_config(layout='wide')
-import io
 import json
 import logging
+import os
 from typing import List, Tuple
-from PIL import Image
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import landscape, A4
-from reportlab.lib import colors
 from datetime import datetime
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-import matplotlib.pyplot as plt
-from reportlab.lib.units import inch
-import tempfile
+from catalog_index import CatalogIndex
+from chart_cache import CHART_CACHE
+from metrics import METRICS, cache_collector, start_exporters
+from questionnaires import QUESTIONNAIRES
+from render_pool import RENDER_POOL
+from report_cache import ASSESSMENT_REPORT_CACHE, STRATEGY_REPORT_CACHE, assessment_report_job, cached_report_pdf, catalog_version, strategy_report_job
+from report_jobs import DONE, ReportJobPool
+from response_aggregates import COMPLETED_TOPICS_COLUMN, RESPONSE_AGGREGATES, format_completed_topics
+from response_store import RESPONSE_STORE
+from row_encoding import sheet_row
+from session_metrics import SESSION_FOOTPRINTS
+from sheets_client import SheetsClientPool
+from sheets_partitions import PartitionRouter, partitioning_enabled
+from sheets_scheduler import SHEETS_SCHEDULER
+from sheets_writer import SheetsWriteBehind
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from web_images import WEB_IMAGES
 
 # Add Sidebar Navigation
 st.sidebar.title("Navigation")
@@ -23,14 +30,22 @@ app_mode = st.sidebar.selectbox("Choose the app mode", ["Strategy Tool", "ERP Ma
 # Initialize session state variables
 if 'form_submitted' not in st.session_state:
     st.session_state.form_submitted = False
-if 'pdf_output' not in st.session_state:
-    st.session_state.pdf_output = None
+if 'strategy_report' not in st.session_state:
+    st.session_state.strategy_report = None
+if 'strategy_selection' not in st.session_state:
+    st.session_state.strategy_selection = None
 
 # ERP Maturity Assessment session state variables
 if 'erp_assessment_submitted' not in st.session_state:
     st.session_state.erp_assessment_submitted = False
-if 'erp_assessment_pdf' not in st.session_state:
-    st.session_state.erp_assessment_pdf = None
+if 'erp_report' not in st.session_state:
+    st.session_state.erp_report = None
+if 'erp_report_job_id' not in st.session_state:
+    st.session_state.erp_report_job_id = None
+if 'erp_report_error' not in st.session_state:
+    st.session_state.erp_report_error = None
+if 'erp_submission' not in st.session_state:
+    st.session_state.erp_submission = None
 if 'erp_responses' not in st.session_state:
     st.session_state.erp_responses = {}
 if 'erp_current_page' not in st.session_state:
@@ -47,8 +62,14 @@ if 'erp_user_info' not in st.session_state:
 # R&D Maturity Assessment session state variables
 if 'rnd_assessment_submitted' not in st.session_state:
     st.session_state.rnd_assessment_submitted = False
-if 'rnd_assessment_pdf' not in st.session_state:
-    st.session_state.rnd_assessment_pdf = None
+if 'rnd_report' not in st.session_state:
+    st.session_state.rnd_report = None
+if 'rnd_report_job_id' not in st.session_state:
+    st.session_state.rnd_report_job_id = None
+if 'rnd_report_error' not in st.session_state:
+    st.session_state.rnd_report_error = None
+if 'rnd_submission' not in st.session_state:
+    st.session_state.rnd_submission = None
 if 'rnd_responses' not in st.session_state:
     st.session_state.rnd_responses = {}
 if 'rnd_current_page' not in st.session_state:
@@ -62,17 +83,30 @@ if 'rnd_show_dialog' not in st.session_state:
 if 'rnd_user_info' not in st.session_state:
     st.session_state.rnd_user_info = {}
 
-# Load images
-@st.cache_resource
-def load_image(image_path):
-    return Image.open(image_path)
-
-background_image = load_image("Background_Tool.png")
-logo_image = load_image("efeso_logo.png")
-
 # Paths to images
 background_image_path = "Background_Tool.png"
 logo_path = "efeso_logo.png"
+LOGO_WIDTH = 300
+
+# Compressed WebP/JPEG/PNG variants of the header images, encoded once per process (and reused
+# from static/web_images across restarts)
+@st.cache_resource
+def load_web_images():
+    return {
+        "background": WEB_IMAGES.get(background_image_path),
+        "logo": WEB_IMAGES.get(logo_path, widths=(LOGO_WIDTH, 2 * LOGO_WIDTH)),
+    }
+
+# Show a header image. With static serving (.streamlit/config.toml) the browser picks the variant
+# for its screen from a srcset and caches the file, so reruns only resend a short HTML tag.
+# Otherwise a pre-encoded variant no wider than the content area goes through st.image, which
+# then passes the bytes on without decoding or re-encoding them.
+def display_web_image(name: str, alt: str, width: int = None):
+    web_image = load_web_images()[name]
+    if st.get_option("server.enableStaticServing"):
+        st.markdown(web_image.html(alt, width), unsafe_allow_html=True)
+    else:
+        st.image(web_image.best(width or 1280).data, width=width or "stretch")
 
 # Load the dynamic logic structure from an external JSON file
 @st.cache_data
@@ -82,21 +116,21 @@ def load_dynamic_logic():
 
 dynamic_logic_with_use_cases = load_dynamic_logic()
 
-# Load the ERP maturity assessment questions from an external JSON file
-@st.cache_data
-def load_maturity_questions():
-    with open('maturity_questions.json', 'r') as file:
-        return json.load(file)
+# Inverted indexes over the catalog for the dropdowns and the multi-goal explorer
+@st.cache_resource
+def load_catalog_index():
+    return CatalogIndex(load_dynamic_logic())
 
-maturity_questions = load_maturity_questions()
+catalog_index = load_catalog_index()
 
-# Load the R&D maturity assessment questions from an external JSON file
+# Fingerprint of the catalog, part of every cached Strategy report key
 @st.cache_data
-def load_maturity_questions_rnd():
-    with open('maturity_questions_RnD.json', 'r') as file:
-        return json.load(file)
+def load_catalog_version():
+    return catalog_version(load_dynamic_logic())
 
-maturity_questions_rnd = load_maturity_questions_rnd()
+# Compiled ERP and R&D maturity questionnaires; edits to the JSON files are picked up on the next rerun
+maturity_questions = QUESTIONNAIRES.get("erp")
+maturity_questions_rnd = QUESTIONNAIRES.get("rnd")
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -105,435 +139,218 @@ logger = logging.getLogger(__name__)
 # Function to get available methods, tools, and KPIs based on the selected goal
 def get_available_options(goal: str) -> List[str]:
     if goal in dynamic_logic_with_use_cases:
-        return dynamic_logic_with_use_cases[goal]['methods']
+        return catalog_index.methods(goal)
     else:
         logger.warning(f"Goal '{goal}' not found in dynamic logic structure.")
         return []
 
 def get_tools_and_use_cases(goal: str, method: str) -> Tuple[List[str], List[str], List[str]]:
-    if goal in dynamic_logic_with_use_cases and method in dynamic_logic_with_use_cases[goal]['tools']:
-        tools_data = dynamic_logic_with_use_cases[goal]['tools'][method]
-        tools = tools_data['tools']
-        use_cases = tools_data['use_cases']
-        partners = tools_data['partners']
-        return tools, use_cases, partners
+    tools_and_use_cases = catalog_index.tools_and_use_cases(goal, method)
+    if tools_and_use_cases is not None:
+        return tools_and_use_cases
     else:
         logger.error(f"Method '{method}' not found under goal '{goal}'.")
         return [], [], []
 
-# Function to add data to Google Sheets for the Strategy Tool
-def add_data_to_google_sheet(user_data):
-    try:
-        scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-        credentials = ServiceAccountCredentials.from_json_keyfile_dict(
-            st.secrets["google_service_account"], scope
-        )
-        client = gspread.authorize(credentials)
-        # Open your Google Sheet by name
-        sheet = client.open("client_inputs_strategytoolrnd").sheet1
-
-        if not sheet.get_all_values():
-            headers = list(user_data.keys())
-            sheet.append_row(headers)
-
-        sheet.append_row(list(user_data.values()))
-        return True
-    except Exception as e:
-        st.error(f"An error occurred while saving your data: {e}")
-        print(f"Error while saving data: {e}")
-        return False
+# Process-wide Google Sheets client; spreadsheets and worksheets are resolved once and reused.
+# SHEETS_BACKEND=fake writes to an in-memory stand-in instead (load tests, local development).
+# All API calls go through the process-wide scheduler, which keeps them within the account's quotas.
+@st.cache_resource
+def get_sheets_pool():
+    if os.environ.get("SHEETS_BACKEND") == "fake":
+        from sheets_fake import FakeSheetsBackend
+
+        backend = FakeSheetsBackend().create_app_spreadsheets()
+        return SheetsClientPool(client_factory=lambda: backend, scheduler=SHEETS_SCHEDULER)
+    return SheetsClientPool(
+        dict(st.secrets["google_service_account"]),
+        spreadsheet_keys=dict(st.secrets.get("sheet_keys", {})),
+        scheduler=SHEETS_SCHEDULER
+    )
 
-# Function to add data to Google Sheets for the ERP Maturity Assessment
-def add_assessment_data_to_google_sheet(user_data):
+# Process-wide write-behind queue for Google Sheets submissions
+@st.cache_resource
+def get_sheets_writer():
+    pool = get_sheets_pool()
+    # SHEETS_PARTITION_PERIOD / SHEETS_PARTITION_MAX_ROWS spread each destination over monthly or size-bounded tabs
+    partitions = PartitionRouter(pool.spreadsheet) if partitioning_enabled() else None
+    writer = SheetsWriteBehind(pool.worksheet, on_flush_error=pool.handle_error, partitions=partitions)
+    writer.start()
+    return writer
+
+# Queue a submission for a Google Sheets destination; it is spooled locally and written in batches
+def queue_sheet_row(destination: str, user_data) -> bool:
     try:
-        scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-        credentials = ServiceAccountCredentials.from_json_keyfile_dict(
-            st.secrets["google_service_account"], scope
-        )
-        client = gspread.authorize(credentials)
-        sheet = client.open("Maturity_Assessment_Responses").worksheet("AssessmentData")
-
-        if not sheet.get_all_values():
-            headers = list(user_data.keys())
-            sheet.append_row(headers)
-
-        sheet.append_row(list(user_data.values()))
+        get_sheets_writer().enqueue(destination, user_data)
         return True
     except Exception as e:
         st.error(f"An error occurred while saving your data: {e}")
         print(f"Error while saving data: {e}")
         return False
 
-# Function to add data to Google Sheets for the R&D Maturity Assessment
-def add_assessment_data_to_google_sheet_rnd(user_data):
-    try:
-        scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-        credentials = ServiceAccountCredentials.from_json_keyfile_dict(
-            st.secrets["google_service_account"], scope
-        )
-        client = gspread.authorize(credentials)
-        sheet = client.open("RnD_Maturity_Assessment_Responses").worksheet("AssessmentData")
+# Function to add data to Google Sheets for the Strategy Tool
+def add_data_to_google_sheet(user_data):
+    return queue_sheet_row("strategy", user_data)
+
+# Report jobs for the Strategy Tool and the assessments. Sessions keep these compact inputs and the
+# report key; the PDF is rendered when the download is requested and shared through the report caches.
+def create_strategy_report(goal, method, tool, kpi, use_cases, partners):
+    return strategy_report_job(load_catalog_version(), goal, method, tool, kpi, use_cases, partners)
+
+# The peer comparison is read before the submission is counted, so it only covers earlier respondents.
+def create_assessment_report(responses, user_info, y_axis_range):
+    # Report only the completed topics
+    completed_topics = st.session_state.erp_completed_topics
+    return assessment_report_job(maturity_questions, responses, user_info, completed_topics, y_axis_range,
+                                 RESPONSE_AGGREGATES.benchmarks(maturity_questions, responses, completed_topics))
+
+def create_assessment_report_rnd(responses, user_info, y_axis_range):
+    completed_topics = st.session_state.rnd_completed_topics
+    return assessment_report_job(maturity_questions_rnd, responses, user_info, completed_topics, y_axis_range,
+                                 RESPONSE_AGGREGATES.benchmarks(maturity_questions_rnd, responses, completed_topics))
+
+# Download button that renders the report job only when it is clicked
+def report_download_button(label: str, report_job: dict, file_name: str):
+    st.download_button(
+        label=label,
+        data=lambda: cached_report_pdf(report_job),
+        file_name=file_name,
+        mime="application/pdf"
+    )
 
-        if not sheet.get_all_values():
-            headers = list(user_data.keys())
-            sheet.append_row(headers)
+# Start the render worker processes with the server rather than on the first report
+@st.cache_resource
+def start_render_pool():
+    return RENDER_POOL.start()
+
+start_render_pool()
+
+# Per-session memory and cache hit counters for the metrics export (METRICS_ENABLED=1)
+def session_footprint_metrics():
+    stats = SESSION_FOOTPRINTS.stats()
+    return [
+        ("sessions", "gauge", {}, stats["sessions"]),
+        ("session_state_bytes", "gauge", {"stat": "total"}, stats["total_bytes"]),
+        ("session_state_bytes", "gauge", {"stat": "max"}, stats["max_bytes"]),
+        ("session_state_bytes", "gauge", {"stat": "mean"}, stats["mean_bytes"]),
+    ]
 
-        sheet.append_row(list(user_data.values()))
-        return True
+# Register the collectors and start the Prometheus endpoint/file exporter once per process
+@st.cache_resource
+def start_metrics():
+    METRICS.register_collector(session_footprint_metrics)
+    METRICS.register_collector(cache_collector("chart", CHART_CACHE))
+    METRICS.register_collector(cache_collector("strategy_report", STRATEGY_REPORT_CACHE))
+    METRICS.register_collector(cache_collector("assessment_report", ASSESSMENT_REPORT_CACHE))
+    METRICS.register_collector(SHEETS_SCHEDULER.metrics_samples)
+    start_exporters()
+    return METRICS
+
+start_metrics()
+
+# Process-wide worker pool that saves assessment submissions and renders their reports
+# outside the script run, so the page stays responsive
+@st.cache_resource
+def get_report_jobs():
+    return ReportJobPool()
+
+# Submit saving and rendering of an assessment report; the report page polls the job.
+# `prefix` is the session state prefix of the assessment, "erp" or "rnd".
+# The submission is kept in the session: submitting the same answers again ("Try again" after a
+# failed render) reuses its Timestamp, so the store and the peer statistics recognise it, and
+# skips saving altogether once the first job got past that step.
+def submit_report_job(prefix: str, report_job: dict):
+    answers = {**st.session_state[f"{prefix}_user_info"], **st.session_state[f"{prefix}_responses"]}
+    completed_topics = report_job["completed_topics"]
+    submission = st.session_state[f"{prefix}_submission"]
+    if (submission is None or submission["answers"] != answers
+            or submission["completed_topics"] != completed_topics):
+        submission = st.session_state[f"{prefix}_submission"] = {
+            "answers": answers,
+            "completed_topics": completed_topics,
+            "user_data": {'Timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"), **answers,
+                          COMPLETED_TOPICS_COLUMN: format_completed_topics(completed_topics)},
+            "saved": False,
+        }
+    user_data = submission["user_data"]
+    st.session_state[f"{prefix}_report"] = None
+    st.session_state[f"{prefix}_report_error"] = None
+    try:
+        writer = get_sheets_writer()
     except Exception as e:
-        st.error(f"An error occurred while saving your data: {e}")
         print(f"Error while saving data: {e}")
-        return False
+        st.session_state[f"{prefix}_report_error"] = f"An error occurred while saving your data: {e}"
+        return
 
-# Generate PDF functions for Strategy Tool
-def generate_pdf(goal, method, tool, kpi, use_cases, partners):
-    pdf_buffer = io.BytesIO()
-    c = canvas.Canvas(pdf_buffer, pagesize=landscape(A4))
-    width, height = landscape(A4)
-
-    # Add the background image to the top 40% of the page
-    background_height = height * 0.4
-    c.drawImage(background_image_path, 0, height - background_height, width=width, height=background_height, mask='auto')
-
-    # Add the logo on the right side below the background image
-    logo_width = 157.5  # Increased by 5%
-    logo_height = 60
-    c.drawImage(logo_path, width - logo_width - 30, height - background_height - logo_height - 10, width=logo_width, height=logo_height, mask='auto')
-
-    # Add the heading on the left side below the logo
-    c.setFont("Helvetica-Bold", 16)
-    c.setFillColor(colors.black)
-    c.drawString(30, height - background_height - logo_height - 40, "Tailored AI Strategy Report")
-
-    # Decrease gap after heading by 5%
-    gap_after_heading = 40 * 0.95
-
-    # Add the statement with chosen inputs and wrap text to stay within page edges
-    c.setFont("Helvetica-Bold", 14)
-    y_position = height - background_height - logo_height - gap_after_heading - 80
-    statement_parts = [
-        ("Our R&D Transformation goal is to ", colors.black),
-        (goal, colors.HexColor('#E96C25')),
-        (", which will be accomplished by ", colors.black),
-        (method, colors.HexColor('#E96C25')),
-        (", through the strategic initiatives in ", colors.black),
-        (tool, colors.HexColor('#E96C25')),
-        (", and success will be evaluated by ", colors.black),
-        (kpi, colors.HexColor('#E96C25')),
-        (".", colors.black)
-    ]
+    questionnaire = QUESTIONNAIRES.get(report_job["kind"])
 
-    x_position = 30
-    max_width = width - 60  # Leave some margin on both sides
-    for text, color in statement_parts:
-        text_width = c.stringWidth(text, "Helvetica-Bold", 14)
-        if x_position + text_width > max_width:
-            y_position -= 20
-            x_position = 30
-        c.setFillColor(color)
-        c.drawString(x_position, y_position, text)
-        x_position += text_width
-
-    # Add recommended use cases and partners
-    y_position -= 40
-    c.setFont("Helvetica", 12)
-    c.setFillColor(colors.black)
-    c.drawString(30, y_position, "Recommended Use Cases:")
-    y_position -= 20
-    c.drawString(30, y_position, ', '.join(use_cases))
-
-    y_position -= 40
-    c.drawString(30, y_position, "Suitable Partners:")
-    y_position -= 20
-    c.drawString(30, y_position, ', '.join(partners))
-
-    c.save()
-    pdf_buffer.seek(0)
-    return pdf_buffer
-
-# Generate PDF functions for ERP Maturity Assessment
-def generate_assessment_pdf(responses, user_info, y_axis_range):
-    pdf_buffer = io.BytesIO()
-    c = canvas.Canvas(pdf_buffer, pagesize=landscape(A4))  # Set landscape orientation
-    width, height = landscape(A4)  # Get dimensions for landscape
-
-    # Define logo dimensions and margins
-    logo_width = 157.5
-    logo_height = 60
-    logo_margin_right = 30
-    logo_margin_top = 20
-
-    # Add the cover page without calling c.showPage()
-    # Add the background image to the top of the cover page
-    background_height = height * 0.4
-    c.drawImage(background_image_path, 0, height - background_height, width=width, height=background_height, mask='auto')
-
-    # Add the logo on the right side below the background image
-    logo_position_y = height - background_height - logo_height - 30
-    c.drawImage(logo_path, width - logo_width - logo_margin_right, logo_position_y, width=logo_width, height=logo_height, mask='auto')
-
-    # Add the main title for the cover page
-    c.setFont("Helvetica-Bold", 24)
-    c.setFillColor(colors.black)
-    c.drawString(30, logo_position_y - 40, "ERP Maturity Assessment Report")
-
-    # Add user information on the cover page
-    y_position = logo_position_y - 80
-    c.setFont("Helvetica", 12)
-    for key, value in user_info.items():
-        c.drawString(30, y_position, f"{key}: {value}")
-        y_position -= 20
-
-    # Generate pages for each completed topic
-    for topic_name in st.session_state.erp_completed_topics:
-        # Find the topic details
-        topic = next((t for t in maturity_questions['topics'] if t['name'] == topic_name), None)
-        if not topic:
-            continue  # Skip if topic not found
-
-        c.showPage()  # Start a new page
-        topic_questions = topic['questions']
-
-        # Add the logo at the top-right corner of each page
-        c.drawImage(logo_path, width - logo_width - logo_margin_right, height - logo_height - logo_margin_top,
-                    width=logo_width, height=logo_height, mask='auto')
-
-        # Add the topic name as the page title
-        c.setFont("Helvetica-Bold", 20)
-        c.setFillColor(colors.black)
-        c.drawString(30, height - 60, f"Topic: {topic_name}")
-
-        # Define question numbers and maturity levels based on the responses
-        question_numbers = [f"Q{i+1}" for i in range(len(topic_questions))]
-        maturity_levels = [responses.get(q['id'], 0) for q in topic_questions]
-
-        # Set up the user session plot
-        plt.figure(figsize=(4, 4))
-        plt.subplots_adjust(left=0.2, right=0.8, bottom=0.3, top=0.8)
-
-        # Set y-axis ticks with user-defined range
-        plt.yticks(range(y_axis_range[0], y_axis_range[1] + 1))
-
-        # Create bar plot with question numbers and maturity levels
-        plt.bar(question_numbers, maturity_levels, color='#E96C25')
-        plt.xlabel("Question Number")
-        plt.ylabel("Maturity Level")
-        plt.title(f"User Session Data - {topic_name}", fontsize=10, pad=20)
-
-        # Save the user session plot to a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_file:
-            plt.savefig(tmp_file.name, format='PNG')
-            user_plot_path = tmp_file.name
-        plt.close()
-
-        # Adjust the y-coordinate for the plot
-        plot_margin_top = 100
-        plot_height = height * 0.5
-        plot_width = width * 0.45
-
-        # Draw the user session plot on the left half of the page
-        c.drawImage(user_plot_path, 30, height - plot_margin_top - plot_height,
-                    width=plot_width, height=plot_height, preserveAspectRatio=True, mask='auto')
-
-        # Remove the temporary file for the plot
-        os.remove(user_plot_path)
-
-        # Placeholder for the right half of the page
-        placeholder_x = width / 2 + 30
-        placeholder_y = height - plot_margin_top - plot_height
-        c.setFillColor(colors.lightgrey)
-        c.rect(placeholder_x, placeholder_y, plot_width, plot_height, fill=1)
-        c.setFillColor(colors.black)
-        c.setFont("Helvetica", 12)
-        c.drawString(placeholder_x + 10, placeholder_y + plot_height - 20, "Placeholder for Historical Data")
-
-        # Add the legend below the plots
-        legend_labels = [f"{question_numbers[i]} - {topic_questions[i]['question']}" for i in range(len(topic_questions))]
-        legend_text = "\n".join(legend_labels)
-
-        # Adjust y_position to place the legend
-        legend_y_position = height - plot_margin_top - plot_height - 40
-        c.setFont("Helvetica", 10)
-        c.setFillColor(colors.black)
-        for line in legend_text.split("\n"):
-            if legend_y_position < 50:  # Ensure the legend fits within the page
-                break
-            c.drawString(30, legend_y_position, line)
-            legend_y_position -= 15
-
-    c.save()
-    pdf_buffer.seek(0)
-    return pdf_buffer
-
-# Generate PDF functions for R&D Maturity Assessment
-def generate_assessment_pdf_rnd(responses, user_info, y_axis_range):
-    pdf_buffer = io.BytesIO()
-    c = canvas.Canvas(pdf_buffer, pagesize=landscape(A4))  # Set landscape orientation
-    width, height = landscape(A4)  # Get dimensions for landscape
-
-    # Define logo dimensions and margins
-    logo_width = 157.5
-    logo_height = 60
-    logo_margin_right = 30
-    logo_margin_top = 20
-
-    # Add the cover page without calling c.showPage()
-    # Add the background image to the top of the cover page
-    background_height = height * 0.4
-    c.drawImage(background_image_path, 0, height - background_height, width=width, height=background_height, mask='auto')
-
-    # Add the logo on the right side below the background image
-    logo_position_y = height - background_height - logo_height - 30
-    c.drawImage(logo_path, width - logo_width - logo_margin_right, logo_position_y, width=logo_width, height=logo_height, mask='auto')
-
-    # Add the main title for the cover page
-    c.setFont("Helvetica-Bold", 24)
-    c.setFillColor(colors.black)
-    c.drawString(30, logo_position_y - 40, "R&D Maturity Assessment Report")
-
-    # Add user information on the cover page
-    y_position = logo_position_y - 80
-    c.setFont("Helvetica", 12)
-    for key, value in user_info.items():
-        c.drawString(30, y_position, f"{key}: {value}")
-        y_position -= 20
-
-    # Generate pages for each completed topic
-    for topic_name in st.session_state.rnd_completed_topics:
-        # Find the topic details
-        topic = next((t for t in maturity_questions_rnd['topics'] if t['name'] == topic_name), None)
-        if not topic:
-            continue  # Skip if topic not found
-
-        c.showPage()  # Start a new page
-        topic_questions = topic['questions']
-
-        # Add the logo at the top-right corner of each page
-        c.drawImage(logo_path, width - logo_width - logo_margin_right, height - logo_height - logo_margin_top,
-                    width=logo_width, height=logo_height, mask='auto')
-
-        # Add the topic name as the page title
-        c.setFont("Helvetica-Bold", 20)
-        c.setFillColor(colors.black)
-        c.drawString(30, height - 60, f"Topic: {topic_name}")
-
-        # Define question numbers and maturity levels based on the responses
-        question_numbers = [f"Q{i+1}" for i in range(len(topic_questions))]
-        maturity_levels = [responses.get(q['id'], 0) for q in topic_questions]
-
-        # Set up the user session plot
-        plt.figure(figsize=(4, 4))
-        plt.subplots_adjust(left=0.2, right=0.8, bottom=0.3, top=0.8)
-
-        # Set y-axis ticks with user-defined range
-        plt.yticks(range(y_axis_range[0], y_axis_range[1] + 1))
-
-        # Create bar plot with question numbers and maturity levels
-        plt.bar(question_numbers, maturity_levels, color='#E96C25')
-        plt.xlabel("Question Number")
-        plt.ylabel("Maturity Level")
-        plt.title(f"User Session Data - {topic_name}", fontsize=10, pad=20)
-
-        # Save the user session plot to a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_file:
-            plt.savefig(tmp_file.name, format='PNG')
-            user_plot_path = tmp_file.name
-        plt.close()
-
-        # Adjust the y-coordinate for the plot
-        plot_margin_top = 100
-        plot_height = height * 0.5
-        plot_width = width * 0.45
-
-        # Draw the user session plot on the left half of the page
-        c.drawImage(user_plot_path, 30, height - plot_margin_top - plot_height,
-                    width=plot_width, height=plot_height, preserveAspectRatio=True, mask='auto')
-
-        # Remove the temporary file for the plot
-        os.remove(user_plot_path)
-
-        # Placeholder for the right half of the page
-        placeholder_x = width / 2 + 30
-        placeholder_y = height - plot_margin_top - plot_height
-        c.setFillColor(colors.lightgrey)
-        c.rect(placeholder_x, placeholder_y, plot_width, plot_height, fill=1)
-        c.setFillColor(colors.black)
-        c.setFont("Helvetica", 12)
-        c.drawString(placeholder_x + 10, placeholder_y + plot_height - 20, "Placeholder for Historical Data")
-
-        # Add the legend below the plots
-        legend_labels = [f"{question_numbers[i]} - {topic_questions[i]['question']}" for i in range(len(topic_questions))]
-        legend_text = "\n".join(legend_labels)
-
-        # Adjust y_position to place the legend
-        legend_y_position = height - plot_margin_top - plot_height - 40
-        c.setFont("Helvetica", 10)
-        c.setFillColor(colors.black)
-        for line in legend_text.split("\n"):
-            if legend_y_position < 50:  # Ensure the legend fits within the page
-                break
-            c.drawString(30, legend_y_position, line)
-            legend_y_position -= 15
+    # Store the submission locally, then mirror it to Google Sheets and count it in the peer
+    # comparison of later reports; the local statistics only take the answers to completed topics
+    def save():
+        RESPONSE_STORE.append(questionnaire, user_data, completed_topics)
+        writer.enqueue(prefix, sheet_row(questionnaire, user_data))
+        RESPONSE_AGGREGATES.record(questionnaire, user_data, completed_topics)
+        # Set from the worker thread on the session's own dict; read by the next submit
+        submission["saved"] = True
 
-    c.save()
-    pdf_buffer.seek(0)
-    return pdf_buffer
+    def render():
+        cached_report_pdf(report_job)
+        return report_job
+
+    steps = [("Rendering your report", render)]
+    if not submission["saved"]:
+        steps.insert(0, ("Saving your answers", save))
+    st.session_state[f"{prefix}_report_job_id"] = get_report_jobs().submit(steps)
 
 # New helper functions for ERP maturity assessment
 def generate_report_and_save():
-    # Generate PDF report only for completed topics
-    pdf_output = generate_assessment_pdf(
+    submit_report_job("erp", create_assessment_report(
         st.session_state.erp_responses,
         st.session_state.erp_user_info,
         (0, 5)
-    )
-
-    # Ensure we have a valid PDF output
-    if pdf_output is None:
-        st.error("Failed to generate the PDF report.")
-        return
-
-    # Save to Google Sheets
-    user_data = {
-        'Timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        **st.session_state.erp_user_info,
-        **st.session_state.erp_responses
-    }
-
-    if add_assessment_data_to_google_sheet(user_data):
-        st.session_state.erp_assessment_pdf = pdf_output
-        st.session_state.erp_assessment_submitted = True
-        # Do not display messages here; we'll show them on the report page
-    else:
-        st.error("Failed to save assessment data.")
+    ))
 
 # New helper functions for R&D maturity assessment
 def generate_report_and_save_rnd():
-    # Generate PDF report only for completed topics
-    pdf_output = generate_assessment_pdf_rnd(
+    submit_report_job("rnd", create_assessment_report_rnd(
         st.session_state.rnd_responses,
         st.session_state.rnd_user_info,
         (0, 5)
-    )
-
-    # Ensure we have a valid PDF output
-    if pdf_output is None:
-        st.error("Failed to generate the PDF report.")
-        return
-
-    # Save to Google Sheets
-    user_data = {
-        'Timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        **st.session_state.rnd_user_info,
-        **st.session_state.rnd_responses
-    }
-
-    if add_assessment_data_to_google_sheet_rnd(user_data):
-        st.session_state.rnd_assessment_pdf = pdf_output
-        st.session_state.rnd_assessment_submitted = True
-        # Do not display messages here; we'll show them on the report page
+    ))
+
+# Progress of a submitted report job, refreshed every second without rerunning the page.
+# Once the job has finished its outcome is stored in the session and the page is rerun.
+@st.fragment(run_every=1)
+def poll_report_job(prefix: str):
+    job_id = st.session_state[f"{prefix}_report_job_id"]
+    status = get_report_jobs().status(job_id)
+    if status is None or status.finished:
+        if status is not None and status.state == DONE:
+            st.session_state[f"{prefix}_report"] = status.result
+            st.session_state[f"{prefix}_assessment_submitted"] = True
+        else:
+            st.session_state[f"{prefix}_report_error"] = (
+                status.error if status is not None else "The report could not be found, please submit again."
+            )
+        get_report_jobs().forget(job_id)
+        st.session_state[f"{prefix}_report_job_id"] = None
+        st.rerun()
+    st.progress(status.progress, text=f"{status.message}...")
+
+# Report page of an assessment: progress while the job runs, then the download or the error
+def display_report_page(prefix: str, file_name: str):
+    if st.session_state[f"{prefix}_report_job_id"]:
+        st.title("Your Assessment Report is being prepared")
+        poll_report_job(prefix)
+    elif st.session_state[f"{prefix}_report"]:
+        st.title("Your Assessment Report is Ready")
+        st.success("Assessment completed! You can now download your report.")
+        report_download_button("Download Assessment Report", st.session_state[f"{prefix}_report"], file_name)
     else:
-        st.error("Failed to save assessment data.")
+        st.error(st.session_state[f"{prefix}_report_error"] or "No report available for download.")
+        if st.button("Try again", key=f"retry_{prefix}"):
+            st.session_state[f"{prefix}_current_page"] = 'contact_info'
+            st.rerun()
 
 def create_topic_tile(topic_name: str, description: str):
     # Create a clickable tile with consistent styling and fixed height
@@ -588,7 +405,7 @@ def display_topic_tiles():
     st.write("Select a topic to begin its assessment:")
 
     # Get all topics
-    topics = maturity_questions['topics']
+    topics = maturity_questions.topics
     num_cols = 3  # Number of columns in the grid
     num_rows = (len(topics) + num_cols - 1) // num_cols  # Calculate the number of rows needed
 
@@ -600,7 +417,7 @@ def display_topic_tiles():
                 topic_idx = row * num_cols + col_idx
                 if topic_idx < len(topics):
                     topic = topics[topic_idx]
-                    topic_name = topic['name']
+                    topic_name = topic.name
                     with cols[col_idx]:
                         # Display the tile
                         st.markdown(
@@ -619,9 +436,8 @@ def display_topic_tiles():
         # After the row, check if the dialog should be displayed
         # and if the selected topic is in this row
         if st.session_state.erp_show_dialog:
-            selected_topic_idx = next((i for i, t in enumerate(topics) if t['name'] == st.session_state.erp_show_dialog), None)
-            selected_row = selected_topic_idx // num_cols
-            if selected_row == row:
+            selected_topic = maturity_questions.topic(st.session_state.erp_show_dialog)
+            if selected_topic is not None and selected_topic.position // num_cols == row:
                 # Display the dialog covering the full width
                 st.markdown(f"""
                     <div style='background-color: #5BD8B8; padding: 20px; border-radius: 10px; margin-bottom: 20px;'>
@@ -649,7 +465,7 @@ def display_topic_tiles_rnd():
     st.write("Select a topic to begin its assessment:")
 
     # Get all topics
-    topics = maturity_questions_rnd['topics']
+    topics = maturity_questions_rnd.topics
     num_cols = 3  # Number of columns in the grid
     num_rows = (len(topics) + num_cols - 1) // num_cols  # Calculate the number of rows needed
 
@@ -661,7 +477,7 @@ def display_topic_tiles_rnd():
                 topic_idx = row * num_cols + col_idx
                 if topic_idx < len(topics):
                     topic = topics[topic_idx]
-                    topic_name = topic['name']
+                    topic_name = topic.name
                     with cols[col_idx]:
                         # Display the tile
                         st.markdown(
@@ -680,9 +496,8 @@ def display_topic_tiles_rnd():
         # After the row, check if the dialog should be displayed
         # and if the selected topic is in this row
         if st.session_state.rnd_show_dialog:
-            selected_topic_idx = next((i for i, t in enumerate(topics) if t['name'] == st.session_state.rnd_show_dialog), None)
-            selected_row = selected_topic_idx // num_cols
-            if selected_row == row:
+            selected_topic = maturity_questions_rnd.topic(st.session_state.rnd_show_dialog)
+            if selected_topic is not None and selected_topic.position // num_cols == row:
                 # Display the dialog covering the full width
                 st.markdown(f"""
                     <div style='background-color: #5BD8B8; padding: 20px; border-radius: 10px; margin-bottom: 20px;'>
@@ -705,14 +520,33 @@ def display_topic_tiles_rnd():
                 # Break the loop since we've displayed the dialog
                 break
 
+# Sliders of one topic with their live maturity captions. As a fragment, moving a slider only
+# re-executes this block instead of the whole page.
+@st.fragment
+def display_topic_questions(questionnaire, topic, responses: dict, key_suffix: str = ""):
+    for question in topic.questions:
+        q_id = question.id
+        # Get previous response if any
+        previous_response = responses.get(q_id, 3)
+        response = st.slider(
+            label=question.text,
+            min_value=1,
+            max_value=5,
+            value=previous_response,
+            step=1,
+            format="%d",
+            key=f"q_{q_id}{key_suffix}"
+        )
+        # Display the maturity level description
+        maturity_description = questionnaire.scale_label(response)
+        st.caption(f"Selected maturity level: {response} - {maturity_description}")
+        responses[q_id] = response
+
 def display_topic_assessment(topic_name: str):
     st.title(f"{topic_name} Assessment")
 
     # Get questions for current topic
-    topic = next(
-        (t for t in maturity_questions['topics'] if t['name'] == topic_name),
-        None
-    )
+    topic = maturity_questions.topic(topic_name)
 
     if not topic:
         st.error(f"No questions found for topic: {topic_name}")
@@ -723,23 +557,7 @@ def display_topic_assessment(topic_name: str):
         st.session_state.erp_responses = {}
 
     st.write("### Assessment Questions")
-    for question in topic['questions']:
-        q_id = question['id']
-        # Get previous response if any
-        previous_response = st.session_state.erp_responses.get(q_id, 3)
-        response = st.slider(
-            label=question['question'],
-            min_value=1,
-            max_value=5,
-            value=previous_response,
-            step=1,
-            format="%d",
-            key=f"q_{q_id}"
-        )
-        # Display the maturity level description
-        maturity_description = maturity_questions['scale'][str(response)]
-        st.caption(f"Selected maturity level: {response} - {maturity_description}")
-        st.session_state.erp_responses[q_id] = response
+    display_topic_questions(maturity_questions, topic, st.session_state.erp_responses)
 
     # Use a button to submit the assessment
     if st.button("Submit Assessment", key=f"submit_{topic_name}"):
@@ -757,10 +575,7 @@ def display_topic_assessment_rnd(topic_name: str):
     st.title(f"{topic_name} Assessment")
 
     # Get questions for current topic
-    topic = next(
-        (t for t in maturity_questions_rnd['topics'] if t['name'] == topic_name),
-        None
-    )
+    topic = maturity_questions_rnd.topic(topic_name)
 
     if not topic:
         st.error(f"No questions found for topic: {topic_name}")
@@ -771,23 +586,7 @@ def display_topic_assessment_rnd(topic_name: str):
         st.session_state.rnd_responses = {}
 
     st.write("### Assessment Questions")
-    for question in topic['questions']:
-        q_id = question['id']
-        # Get previous response if any
-        previous_response = st.session_state.rnd_responses.get(q_id, 3)
-        response = st.slider(
-            label=question['question'],
-            min_value=1,
-            max_value=5,
-            value=previous_response,
-            step=1,
-            format="%d",
-            key=f"q_{q_id}_rnd"
-        )
-        # Display the maturity level description
-        maturity_description = maturity_questions_rnd['scale'][str(response)]
-        st.caption(f"Selected maturity level: {response} - {maturity_description}")
-        st.session_state.rnd_responses[q_id] = response
+    display_topic_questions(maturity_questions_rnd, topic, st.session_state.rnd_responses, "_rnd")
 
     # Use a button to submit the assessment
     if st.button("Submit Assessment", key=f"submit_{topic_name}_rnd"):
@@ -816,9 +615,98 @@ def generate_final_report_rnd():
         generate_report_and_save_rnd()
 
 # Strategy Tool Module
+# Ranked use cases and partners for several goals, tools and KPIs at once, and the
+# goal/method paths that lead to them. A fragment, so changing a filter only reruns the expander.
+@st.fragment
+def display_catalog_explorer():
+    with st.expander("Explore the catalog across several goals"):
+        selection = {
+            "goal": st.multiselect("Goals", catalog_index.values["goal"]),
+            "tool": st.multiselect("Tools", catalog_index.values["tool"]),
+            "kpi": st.multiselect("KPIs", catalog_index.values["kpi"]),
+            "partner": st.multiselect("Partners", catalog_index.values["partner"]),
+        }
+        if not any(selection.values()):
+            st.write("Select goals, tools, KPIs or partners to see matching recommendations.")
+            return
+
+        paths = catalog_index.matching_paths(catalog_index.match(**selection))
+        if not paths:
+            st.warning("No goal and method in the catalog matches all of the selected options.")
+            return
+        col1, col2 = st.columns(2)
+        with col1:
+            st.write("#### Use Cases")
+            for use_case, score in catalog_index.rank("use_case", selection, limit=10):
+                st.write(f"- {use_case} ({score})")
+        with col2:
+            st.write("#### Partners")
+            for partner, score in catalog_index.rank("partner", selection, limit=10):
+                st.write(f"- {partner} ({score})")
+        st.write("#### Reached through")
+        for goal, method in paths:
+            st.write(f"- {goal}: {method}")
+
+# The goal -> method -> tool -> KPI cascade and its recommendations. As a fragment, a changed
+# dropdown only reruns this block; the chosen path is kept in st.session_state.strategy_selection
+# for the contact form below, or None while it is incomplete.
+@st.fragment
+def display_strategy_selector():
+    st.session_state.strategy_selection = None
+
+    # Create a horizontal layout for the sentence and dropdowns
+    st.markdown("<div class='horizontal-container'>", unsafe_allow_html=True)
+
+    # Dropdown for selecting a goal
+    st.markdown("<div class='dropdown-text'>Our R&D Transformation goal is to:</div>", unsafe_allow_html=True)
+    goal = st.selectbox('', list(dynamic_logic_with_use_cases.keys()), label_visibility='collapsed')
+
+    # Static text
+    st.markdown("<div class='dropdown-text'>which will be accomplished by</div>", unsafe_allow_html=True)
+
+    # Dropdown for methods based on goal selection
+    if goal:
+        methods = get_available_options(goal)
+        method = st.selectbox('', methods, label_visibility='collapsed')
+    else:
+        st.warning("Please select a goal.")
+        return
+
+    # Static text
+    st.markdown("<div class='dropdown-text'>through the strategic initiatives in</div>", unsafe_allow_html=True)
+
+    # Dropdown for tools based on method selection
+    if method:
+        tools, use_cases, partners = get_tools_and_use_cases(goal, method)
+        tool = st.selectbox('', tools, label_visibility='collapsed')
+    else:
+        st.warning("Please select a method.")
+        return
+
+    # Static text
+    st.markdown("<div class='dropdown-text'>and success will be evaluated by</div>", unsafe_allow_html=True)
+    if tool:
+        kpi = st.selectbox('', catalog_index.kpis(goal), label_visibility='collapsed')
+    else:
+        st.warning("Please select a tool.")
+        return
+
+    # Close the horizontal layout for dropdowns
+    st.markdown("</div>", unsafe_allow_html=True)
+
+    # Display use cases and partners based on selections
+    st.write(f"### Recommended Use Cases for {goal}:")
+    st.write(f"**Use Cases**: {', '.join(use_cases)}")
+
+    st.write(f"### Suitable Partners:")
+    st.write(f"**Partners**: {', '.join(partners)}")
+
+    st.session_state.strategy_selection = (goal, method, tool, kpi, use_cases, partners)
+
+@METRICS.timed("page_render_seconds", page="strategy_tool")
 def strategy_tool():
     # Load and display the background image
-    st.image(background_image, use_column_width=True)
+    display_web_image("background", "Tailored AI Strategy Tool")
 
     # Streamlit App Custom Styling
     st.markdown(f"""
@@ -873,54 +761,14 @@ def strategy_tool():
     with col1:
         st.markdown("<h1>Tailored AI Strategy Tool</h1>", unsafe_allow_html=True)
     with col2:
-        st.image(logo_path, use_column_width=False, width=300)
-
-    # Create a horizontal layout for the sentence and dropdowns
-    st.markdown("<div class='horizontal-container'>", unsafe_allow_html=True)
+        display_web_image("logo", "EFESO logo", LOGO_WIDTH)
 
-    # Dropdown for selecting a goal
-    st.markdown("<div class='dropdown-text'>Our R&D Transformation goal is to:</div>", unsafe_allow_html=True)
-    goal = st.selectbox('', list(dynamic_logic_with_use_cases.keys()), label_visibility='collapsed')
-
-    # Static text
-    st.markdown("<div class='dropdown-text'>which will be accomplished by</div>", unsafe_allow_html=True)
-
-    # Dropdown for methods based on goal selection
-    if goal:
-        methods = get_available_options(goal)
-        method = st.selectbox('', methods, label_visibility='collapsed')
-    else:
-        st.warning("Please select a goal.")
-        return
-
-    # Static text
-    st.markdown("<div class='dropdown-text'>through the strategic initiatives in</div>", unsafe_allow_html=True)
-
-    # Dropdown for tools based on method selection
-    if method:
-        tools, use_cases, partners = get_tools_and_use_cases(goal, method)
-        tool = st.selectbox('', tools, label_visibility='collapsed')
-    else:
-        st.warning("Please select a method.")
-        return
-
-    # Static text
-    st.markdown("<div class='dropdown-text'>and success will be evaluated by</div>", unsafe_allow_html=True)
-    if tool:
-        kpi = st.selectbox('', dynamic_logic_with_use_cases[goal]['kpis'], label_visibility='collapsed')
-    else:
-        st.warning("Please select a tool.")
+    display_strategy_selector()
+    if st.session_state.strategy_selection is None:
         return
+    goal, method, tool, kpi, use_cases, partners = st.session_state.strategy_selection
 
-    # Close the horizontal layout for dropdowns
-    st.markdown("</div>", unsafe_allow_html=True)
-
-    # Display use cases and partners based on selections
-    st.write(f"### Recommended Use Cases for {goal}:")
-    st.write(f"**Use Cases**: {', '.join(use_cases)}")
-
-    st.write(f"### Suitable Partners:")
-    st.write(f"**Partners**: {', '.join(partners)}")
+    display_catalog_explorer()
 
     # Contact information form
     with st.form("contact_form"):
@@ -953,28 +801,24 @@ def strategy_tool():
             except Exception as e:
                 st.error(f"An error occurred while saving your data: {e}")
                 print(f"Error: {e}")
-            # Generate PDF
-            pdf_output = generate_pdf(goal, method, tool, kpi, use_cases, partners)
-            st.session_state.pdf_output = pdf_output
+            # Keep the report inputs; the PDF is rendered on download
+            st.session_state.strategy_report = create_strategy_report(goal, method, tool, kpi, use_cases, partners)
             st.session_state.form_submitted = True
             st.success("Your report is ready for download.")
         else:
             st.error("Please fill in all the contact information fields before downloading the report.")
 
    # Display the download button if the form has been submitted
-    if st.session_state.form_submitted and st.session_state.pdf_output:
-        st.download_button(
-            label="Click here to download your report",
-            data=st.session_state.pdf_output.getvalue(),  # Extract byte content here
-            file_name="strategy_report.pdf",
-            mime="application/pdf"
-        )
+    if st.session_state.form_submitted and st.session_state.strategy_report:
+        report_download_button("Click here to download your report", st.session_state.strategy_report,
+                               "strategy_report.pdf")
 
 # Modified maturity_assessment function for ERP
+@METRICS.timed("page_render_seconds", page="maturity_assessment")
 def maturity_assessment():
     # Load and display images
-    st.image(background_image, use_column_width=True)
-    st.image(logo_image, use_column_width=False, width=300)
+    display_web_image("background", "Maturity Assessment")
+    display_web_image("logo", "EFESO logo", LOGO_WIDTH)
 
     # Handle different pages in the assessment flow
     if st.session_state.erp_current_page == 'topic_selection':
@@ -1016,24 +860,14 @@ def maturity_assessment():
                 st.error("Please fill in all fields.")
 
     elif st.session_state.erp_current_page == 'report':
-        st.title("Your Assessment Report is Ready")
-        st.success("Assessment completed! You can now download your report.")
-        pdf_output = st.session_state.erp_assessment_pdf  # Use the stored PDF output
-        if pdf_output:
-            st.download_button(
-                label="Download Assessment Report",
-                data=pdf_output.getvalue(),
-                file_name="erp_maturity_assessment_report.pdf",
-                mime="application/pdf"
-            )
-        else:
-            st.error("No report available for download.")
+        display_report_page("erp", "erp_maturity_assessment_report.pdf")
 
 # New R&D maturity assessment function
+@METRICS.timed("page_render_seconds", page="rnd_maturity_assessment")
 def rnd_maturity_assessment():
     # Load and display images
-    st.image(background_image, use_column_width=True)
-    st.image(logo_image, use_column_width=False, width=300)
+    display_web_image("background", "Maturity Assessment")
+    display_web_image("logo", "EFESO logo", LOGO_WIDTH)
 
     # Handle different pages in the assessment flow
     if st.session_state.rnd_current_page == 'topic_selection':
@@ -1075,18 +909,7 @@ def rnd_maturity_assessment():
                 st.error("Please fill in all fields.")
 
     elif st.session_state.rnd_current_page == 'report':
-        st.title("Your Assessment Report is Ready")
-        st.success("Assessment completed! You can now download your report.")
-        pdf_output = st.session_state.rnd_assessment_pdf  # Use the stored PDF output
-        if pdf_output:
-            st.download_button(
-                label="Download Assessment Report",
-                data=pdf_output.getvalue(),
-                file_name="rnd_maturity_assessment_report.pdf",
-                mime="application/pdf"
-            )
-        else:
-            st.error("No report available for download.")
+        display_report_page("rnd", "rnd_maturity_assessment_report.pdf")
 
 # Main application logic
 if app_mode == "Strategy Tool":
@@ -1095,3 +918,8 @@ elif app_mode == "ERP Maturity Assessment":
     maturity_assessment()
 elif app_mode == "R&D Maturity Assessment":
     rnd_maturity_assessment()
+
+# Record this session's state footprint for the per-session memory metric
+script_run_ctx = get_script_run_ctx()
+if script_run_ctx is not None:
+    SESSION_FOOTPRINTS.record(script_run_ctx.session_id, st.session_state)
@@ -0,0 +1,204 @@
+import argparse
+import csv
+import functools
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from questionnaires import QUESTIONNAIRES
+from render_pool import render_report
+from row_encoding import expand_row
+
+logger = logging.getLogger(__name__)
+
+# Report kinds match the Sheets destinations and the questionnaire ids
+REPORT_KINDS = ("strategy", "erp", "rnd")
+USER_INFO_FIELDS = ("Name", "Email", "Company", "Phone")
+
+
+@functools.lru_cache(maxsize=None)
+def question_kinds() -> Dict[str, str]:
+    return {question_id: questionnaire.id
+            for questionnaire in QUESTIONNAIRES.all()
+            for question_id in questionnaire.questions_by_id}
+
+
+# Read exported response rows: a CSV or JSONL export of a response sheet, or the local Sheets spool.
+# Yields (kind or None, row); rows from the spool know their destination, the others are detected later.
+# Compact rows (row_encoding) are expanded to one column per answered question.
+def read_rows(path: str) -> Iterator[Tuple[Optional[str], dict]]:
+    for kind, row in _read_raw_rows(path):
+        yield kind, expand_row(row)
+
+
+def _read_raw_rows(path: str) -> Iterator[Tuple[Optional[str], dict]]:
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        with open(path, 'r', newline='', encoding='utf-8') as file:
+            for row in csv.DictReader(file):
+                yield None, row
+    elif extension in (".jsonl", ".ndjson"):
+        with open(path, 'r', encoding='utf-8') as file:
+            for line in file:
+                if line.strip():
+                    yield None, json.loads(line)
+    elif extension in (".sqlite3", ".sqlite", ".db"):
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            for destination, payload in connection.execute("SELECT destination, payload FROM spool ORDER BY id"):
+                yield destination, json.loads(payload)
+        finally:
+            connection.close()
+    else:
+        raise ValueError(f"Unsupported input format '{extension}', expected .csv, .jsonl or a spool .sqlite3 file.")
+
+
+def detect_kind(row: dict) -> Optional[str]:
+    if 'goal' in row:
+        return "strategy"
+    kinds = question_kinds()
+    for column, value in row.items():
+        if column in kinds and str(value).strip():
+            return kinds[column]
+    return None
+
+
+# Rebuild the report inputs the Streamlit app keeps in session state from one exported row
+def build_job(kind: str, row: dict) -> dict:
+    if kind == "strategy":
+        split = lambda value: [item.strip() for item in str(value).split(',') if item.strip()]
+        return {
+            "kind": kind,
+            "selection": [row['goal'], row['method'], row['tool'], row['kpi'],
+                          split(row.get('use_cases', '')), split(row.get('partners', ''))],
+        }
+
+    questionnaire = QUESTIONNAIRES.get(kind)
+    responses = {}
+    completed_topics = []
+    for topic in questionnaire.topics:
+        answered = False
+        for question in topic.questions:
+            value = str(row.get(question.id, '')).strip()
+            if value:
+                responses[question.id] = int(float(value))
+                answered = True
+        if answered:
+            completed_topics.append(topic.name)
+    return {
+        "kind": kind,
+        "responses": responses,
+        "user_info": {field: row.get(field, '') for field in USER_INFO_FIELDS if row.get(field, '') != ''},
+        "completed_topics": completed_topics,
+    }
+
+
+def job_id(job: dict) -> str:
+    return hashlib.sha1(json.dumps(job, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+
+def output_name(job: dict) -> str:
+    company = job.get("user_info", {}).get("Company", "")
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", company).strip("-")[:40]
+    return "_".join(part for part in (job["kind"], slug, job_id(job)) if part) + ".pdf"
+
+
+# Render one report to disk; runs in a worker process
+def render_job(job: dict, output_path: str) -> int:
+    data = render_report(job)
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, 'wb') as file:
+        file.write(data)
+    os.replace(tmp_path, output_path)
+    return len(data)
+
+
+# Report jobs of the exported rows. Rows that cannot be turned into a job (a non-numeric answer, a
+# missing Strategy Tool column, an undecodable compact row) are logged, skipped and counted as
+# failed in `summary`, so one bad cell does not stop the rest of the export.
+def iter_jobs(paths: List[str], kind: str, summary: Optional[Dict[str, float]] = None) -> Iterator[dict]:
+    for path in paths:
+        for number, (row_kind, row) in enumerate(_read_raw_rows(path), start=1):
+            try:
+                row = expand_row(row)
+                resolved = row_kind or (detect_kind(row) if kind == "auto" else kind)
+                if resolved not in REPORT_KINDS:
+                    logger.warning(f"Skipping row {number} of {path}: cannot tell which report it belongs to.")
+                    continue
+                job = build_job(resolved, row)
+            except (ValueError, KeyError) as e:
+                logger.error(f"Skipping row {number} of {path}: {e!r}")
+                if summary is not None:
+                    summary["failed"] += 1
+                continue
+            if resolved != "strategy" and not job["completed_topics"]:
+                logger.warning(f"Skipping row {number} of {path}: a {resolved} row without answered questions.")
+                continue
+            yield job
+
+
+# Render all jobs across a process pool. At most 2 x workers jobs are in flight, so memory stays
+# bounded however large the export is; reports that already exist in output_dir are skipped,
+# which makes an interrupted run resumable.
+def run(paths: List[str], output_dir: str, kind: str = "auto", workers: Optional[int] = None) -> Dict[str, float]:
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = workers * 2
+    summary = {"rendered": 0, "skipped": 0, "failed": 0, "bytes": 0}
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = {}
+
+        def collect(futures):
+            for future in futures:
+                name = in_flight.pop(future)
+                try:
+                    summary["bytes"] += future.result()
+                    summary["rendered"] += 1
+                except Exception as e:
+                    summary["failed"] += 1
+                    logger.error(f"Rendering {name} failed: {e}")
+
+        for job in iter_jobs(paths, kind, summary):
+            name = output_name(job)
+            output_path = os.path.join(output_dir, name)
+            if os.path.exists(output_path):
+                summary["skipped"] += 1
+                continue
+            in_flight[executor.submit(render_job, job, output_path)] = name
+            if len(in_flight) >= max_in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+        done, _ = wait(in_flight)
+        collect(done)
+
+    summary["seconds"] = time.perf_counter() - start
+    summary["reports_per_second"] = summary["rendered"] / summary["seconds"] if summary["seconds"] else 0.0
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate report PDFs from exported responses.")
+    parser.add_argument("inputs", nargs="+", help="CSV/JSONL exports of the response sheets or a Sheets spool file")
+    parser.add_argument("-o", "--output-dir", default="reports")
+    parser.add_argument("--kind", choices=("auto",) + REPORT_KINDS, default="auto",
+                        help="report type of the rows (default: detect from the columns)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    summary = run(args.inputs, args.output_dir, args.kind, args.workers)
+    logger.info(f"Rendered {summary['rendered']} report(s), skipped {summary['skipped']} existing, "
+                f"{summary['failed']} failed in {summary['seconds']:.1f}s "
+                f"({summary['reports_per_second']:.1f} reports/sec, {summary['bytes'] / 1024 / 1024:.1f} MiB).")
+
+
+if __name__ == "__main__":
+    main()
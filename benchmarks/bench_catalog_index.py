@@ -0,0 +1,99 @@
+# Query latency of the catalog inverted indexes on the real catalog and on synthetic
+# catalogs of growing size, compared with scanning the nested catalog dict.
+#
+#   python benchmarks/bench_catalog_index.py --goals 10 100 1000
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from catalog_index import CatalogIndex
+
+
+# Catalog shaped like dynamic_logic_with_use_cases.json, drawing names from shared pools
+# so that values repeat across goals the way tools and partners do in the real catalog
+def synthetic_catalog(goals: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    pool = lambda prefix, n: [f"{prefix} {i}" for i in range(n)]
+    methods, tools = pool("Method", goals * 2), pool("Tool", max(20, goals // 2))
+    use_cases, partners, kpis = pool("Use case", goals * 3), pool("Partner", max(30, goals // 2)), pool("KPI", 40)
+    catalog = {}
+    for i in range(goals):
+        goal_methods = rng.sample(methods, 3)
+        catalog[f"Goal {i}"] = {
+            "methods": goal_methods,
+            "tools": {method: {"tools": rng.sample(tools, 3), "use_cases": rng.sample(use_cases, 3),
+                               "partners": rng.sample(partners, 3)} for method in goal_methods},
+            "kpis": rng.sample(kpis, 3),
+        }
+    return catalog
+
+
+# The same questions answered by walking the nested dicts: use cases ranked for a set of tools
+# and KPIs, and the goals that lead to a partner
+def scan_rank(catalog: dict, tools, kpis):
+    scores = {}
+    for goal_data in catalog.values():
+        if not set(kpis) & set(goal_data['kpis']):
+            continue
+        for tools_data in goal_data['tools'].values():
+            if set(tools) & set(tools_data['tools']):
+                for use_case in tools_data['use_cases']:
+                    scores[use_case] = scores.get(use_case, 0) + 1
+    return sorted(scores.items(), key=lambda item: -item[1])[:10]
+
+
+def scan_reverse(catalog: dict, partner):
+    return [goal for goal, goal_data in catalog.items()
+            if any(partner in tools_data['partners'] for tools_data in goal_data['tools'].values())]
+
+
+def timed(function, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e6
+
+
+def bench(label: str, catalog: dict, runs: int):
+    start = time.perf_counter()
+    index = CatalogIndex(catalog)
+    build = (time.perf_counter() - start) * 1000
+
+    rng = random.Random(1)
+    tools = rng.sample(index.values["tool"], 2)
+    kpis = rng.sample(index.values["kpi"], 2)
+    partner = index.values["partner"][0]
+    selection = {"tool": tools, "kpi": kpis}
+
+    rank = timed(lambda: index.rank("use_case", selection, limit=10), runs)
+    reverse = timed(lambda: index.facet_values("goal", index.match(partner=partner)), runs)
+    scan = timed(lambda: scan_rank(catalog, tools, kpis), runs)
+    scan_rev = timed(lambda: scan_reverse(catalog, partner), runs)
+    print(f"{label:10s} paths {len(index.paths):6d}  build {build:7.1f} ms  "
+          f"rank {rank:8.1f} us (dict scan {scan:8.1f})  reverse {reverse:8.1f} us (dict scan {scan_rev:8.1f})")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--goals", type=int, nargs="*", default=[10, 100, 1000, 5000],
+                        help="sizes of the synthetic catalogs")
+    args = parser.parse_args()
+
+    with open(os.path.join(ROOT, "dynamic_logic_with_use_cases.json"), 'r') as file:
+        bench("catalog", json.load(file), args.runs)
+    for goals in args.goals:
+        bench(f"{goals} goals", synthetic_catalog(goals), args.runs)
+
+
+if __name__ == "__main__":
+    main()
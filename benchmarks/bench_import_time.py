@@ -0,0 +1,120 @@
+# Cold-start cost of app.py: imports the modules app.py imports (Streamlit itself excluded) in a
+# fresh interpreter under `python -X importtime`, and optionally times the first script run of a
+# fresh AppTest. Reports the median total, the slowest top-level imports, and which heavy
+# dependencies (PDF, charts, Sheets, imaging) got loaded. Those must only be imported behind the
+# features that need them; loading one, or exceeding --budget-ms, makes the command exit with 1.
+#
+#   python benchmarks/bench_import_time.py
+#   python benchmarks/bench_import_time.py --runs 7 --first-run --budget-ms 150
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+APP_PATH = os.path.join(ROOT, "app.py")
+# Packages only the PDF, chart, Sheets and image features need
+HEAVY_MODULES = ("reportlab", "matplotlib", "gspread", "oauth2client", "google.auth", "PIL", "numpy")
+# Already loaded by the Streamlit server before the script runs
+HOST_MODULES = ("streamlit",)
+
+
+# Top-level modules imported by app.py, in order
+def app_imports() -> List[str]:
+    with open(APP_PATH, 'r') as file:
+        tree = ast.parse(file.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modules.append(node.module)
+    return [module for module in dict.fromkeys(modules) if module.split(".")[0] not in HOST_MODULES]
+
+
+def loaded_heavy_modules(loaded: List[str]) -> List[str]:
+    return sorted({heavy for heavy in HEAVY_MODULES for module in loaded
+                   if module == heavy or module.startswith(heavy + ".")})
+
+
+# One fresh interpreter: cumulative import time per top-level module (µs) and the modules the app
+# imports loaded on top of the host
+def measure_imports(modules: List[str]) -> Tuple[Dict[str, int], List[str]]:
+    # Pre-load the host so its own imports are not charged to the app
+    code = (f"import {', '.join(HOST_MODULES)}, sys; host = set(sys.modules); "
+            f"import {', '.join(modules)}; print('\\n'.join(set(sys.modules) - host))")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    timings = {}
+    started = False
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        name = name.rstrip()
+        if not started:
+            if name.strip() == "sys" or name.strip() in HOST_MODULES:
+                started = True
+            continue
+        # Top-level entries are not indented
+        if not name.startswith("  ") and cumulative.strip().isdigit():
+            timings[name.strip()] = int(cumulative)
+    return {module: us for module, us in timings.items() if module not in HOST_MODULES}, result.stdout.split()
+
+
+# Seconds of the first AppTest run in a fresh interpreter, and the heavy modules the script loaded
+def measure_first_run() -> Tuple[float, List[str]]:
+    code = ("import logging, sys, time; logging.disable(logging.CRITICAL); "
+            "from streamlit.testing.v1 import AppTest; host = set(sys.modules); start = time.perf_counter(); "
+            "at = AppTest.from_file('app.py', default_timeout=120).run(); "
+            "print(time.perf_counter() - start); print('\\n'.join(set(sys.modules) - host))")
+    env = dict(os.environ, SHEETS_BACKEND="fake")
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True,
+                            check=True)
+    lines = result.stdout.split()
+    return float(lines[0]), loaded_heavy_modules(lines[1:])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time of app.py's dependencies")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="number of slowest imports to list")
+    parser.add_argument("--first-run", action="store_true", help="also time the first AppTest script run")
+    parser.add_argument("--budget-ms", type=float, default=None, help="fail if the median import total exceeds this")
+    args = parser.parse_args()
+
+    modules = app_imports()
+    runs = [measure_imports(modules) for _ in range(args.runs)]
+    totals = [sum(timings.values()) / 1000 for timings, _ in runs]
+    total = statistics.median(totals)
+    print(f"app.py imports ({len(modules)} modules, Streamlit excluded): median {total:.1f} ms "
+          f"(min {min(totals):.1f}, max {max(totals):.1f}) over {args.runs} runs")
+    per_module = {module: statistics.median(timings.get(module, 0) for timings, _ in runs) / 1000
+                  for module in runs[0][0]}
+    for module, ms in sorted(per_module.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {module:40s} {ms:8.1f} ms")
+
+    failed = False
+    heavy = loaded_heavy_modules(runs[0][1])
+    print(f"heavy dependencies loaded at import: {', '.join(heavy) or 'none'}")
+    failed |= bool(heavy)
+
+    if args.first_run:
+        seconds, first_run_heavy = measure_first_run()
+        print(f"first script run: {seconds * 1000:.0f} ms, heavy dependencies loaded: "
+              f"{', '.join(first_run_heavy) or 'none'}")
+
+    if args.budget_ms is not None and total > args.budget_ms:
+        print(f"Import time {total:.1f} ms exceeds the budget of {args.budget_ms:.0f} ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# Overhead of the metrics layer: cost of a span with instrumentation disabled and enabled, and of
+# a full ERP report render (savefig, c.save and render spans) with and without metrics. Prints
+# the resulting Prometheus export at the end.
+#
+#   python benchmarks/bench_metrics.py --spans 200000 --reports 20
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from metrics import METRICS, cache_collector
+from questionnaires import QUESTIONNAIRES
+from render_pool import RENDER_POOL
+from report_cache import assessment_report_job
+from report_charts import CHART_CACHE
+
+
+def span_cost_ns(count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        with METRICS.span("stage_seconds", stage="bench"):
+            pass
+    return (time.perf_counter() - start) / count * 1e9
+
+
+def report_ms(job: dict, reports: int) -> float:
+    timings = []
+    for _ in range(reports):
+        CHART_CACHE.clear()
+        start = time.perf_counter()
+        RENDER_POOL.render(job)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Metrics instrumentation overhead")
+    parser.add_argument("--spans", type=int, default=200000)
+    parser.add_argument("--reports", type=int, default=20)
+    args = parser.parse_args()
+
+    questionnaire = QUESTIONNAIRES.get("erp")
+    job = assessment_report_job(questionnaire, {question.id: 3 for question in questionnaire.questions_by_id.values()},
+                                {"Name": "Jane Doe"}, questionnaire.topic_names, (0, 5))
+    RENDER_POOL.render(job)
+
+    results = {}
+    for enabled in (False, True):
+        METRICS.enabled = enabled
+        METRICS.clear()
+        results[enabled] = (span_cost_ns(args.spans), report_ms(job, args.reports))
+        print(f"metrics {'enabled ' if enabled else 'disabled'}  span {results[enabled][0]:7.0f} ns  "
+              f"ERP report p50 {results[enabled][1]:7.1f} ms")
+    print(f"report overhead with metrics enabled: {(results[True][1] / results[False][1] - 1) * 100:+.1f}%")
+
+    METRICS.register_collector(cache_collector("chart", CHART_CACHE))
+    print("\n" + "\n".join(line for line in METRICS.render().splitlines() if 'stage="bench"' not in line))
+
+
+if __name__ == "__main__":
+    main()
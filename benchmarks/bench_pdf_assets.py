@@ -0,0 +1,75 @@
+# Compare report-chrome rendering with image file paths (decoded by ReportLab on every report)
+# against the decode-once asset cache in pdf_assets.
+#
+#   python benchmarks/bench_pdf_assets.py --runs 10 --pages 6
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.pdfgen import canvas
+
+from pdf_assets import draw_cached_image
+
+BACKGROUND = os.path.join(ROOT, "Background_Tool.png")
+LOGO = os.path.join(ROOT, "efeso_logo.png")
+
+
+def render(draw, pages: int) -> bytes:
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=landscape(A4))
+    width, height = landscape(A4)
+    background_height = height * 0.4
+    draw(c, BACKGROUND, 0, height - background_height, width, background_height)
+    draw(c, LOGO, width - 187.5, height - background_height - 90, 157.5, 60)
+    for _ in range(pages):
+        c.showPage()
+        draw(c, LOGO, width - 187.5, height - 80, 157.5, 60)
+    c.save()
+    return buffer.getvalue()
+
+
+def draw_from_path(c, path, x, y, width, height):
+    c.drawImage(path, x, y, width=width, height=height, mask="auto")
+
+
+def draw_from_cache(c, path, x, y, width, height):
+    draw_cached_image(c, path, x, y, width=width, height=height)
+
+
+def measure(draw, runs: int, pages: int):
+    timings = []
+    size = 0
+    for _ in range(runs):
+        start = time.process_time()
+        size = len(render(draw, pages))
+        timings.append(time.process_time() - start)
+    return timings, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=6, help="topic pages per report")
+    args = parser.parse_args()
+
+    # The first cached render pays the one-off decode; report it separately
+    start = time.process_time()
+    render(draw_from_cache, args.pages)
+    warmup = time.process_time() - start
+
+    for label, draw in (("file paths", draw_from_path), ("asset cache", draw_from_cache)):
+        timings, size = measure(draw, args.runs, args.pages)
+        print(f"{label:12s} mean {statistics.mean(timings) * 1000:8.1f} ms CPU  "
+              f"min {min(timings) * 1000:8.1f} ms  pdf {size / 1024:8.1f} KiB")
+    print(f"asset cache one-off build: {warmup * 1000:.1f} ms CPU")
+
+
+if __name__ == "__main__":
+    main()
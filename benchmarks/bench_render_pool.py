@@ -0,0 +1,62 @@
+# Reports/sec for concurrent assessment submissions rendered inline on server threads (sharing
+# the GIL) and on the process-pool backend with a growing number of workers.
+#
+#   python benchmarks/bench_render_pool.py --reports 40 --workers 1 2 4 8
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from questionnaires import QUESTIONNAIRES
+from render_pool import RenderPool
+from report_cache import assessment_report_job
+
+
+# Full-length reports with random answers, so per-process chart caches rarely hit
+def make_jobs(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    jobs = []
+    for i in range(count):
+        questionnaire = QUESTIONNAIRES.get(("erp", "rnd")[i % 2])
+        responses = {question_id: rng.randint(1, 5) for question_id in questionnaire.questions_by_id}
+        jobs.append(assessment_report_job(questionnaire, responses, {"Name": f"User {i}"},
+                                          questionnaire.topic_names, (0, 5)))
+    return jobs
+
+
+def throughput(pool: RenderPool, jobs, concurrency: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as sessions:
+        list(sessions.map(pool.render, jobs))
+    return len(jobs) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=40)
+    parser.add_argument("--workers", type=int, nargs="*", default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent submitting sessions (threads)")
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPU(s), {args.reports} reports, {args.sessions} concurrent sessions")
+    inline = RenderPool(backend="inline")
+    inline.render(make_jobs(1, seed=-1)[0])
+    print(f"inline threads      {throughput(inline, make_jobs(args.reports), args.sessions):6.2f} reports/sec")
+
+    for workers in args.workers:
+        pool = RenderPool(workers, backend="process")
+        start = time.perf_counter()
+        pool.start()
+        warm = time.perf_counter() - start
+        rate = throughput(pool, make_jobs(args.reports, seed=workers), args.sessions)
+        pool.shutdown()
+        print(f"process x{workers:<2d}         {rate:6.2f} reports/sec  (pool start and warm-up {warm:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# Per-report latency of the assessment PDF with the vector chart backend versus matplotlib.
+#
+#   python benchmarks/bench_report_charts.py --runs 10 [--cached]
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pdf_templates import ERP_COVER
+from questionnaires import QUESTIONNAIRES
+from report_charts import CHART_BACKENDS, CHART_CACHE
+from report_pdf import render_assessment_pdf
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--cached", action="store_true", help="keep the chart cache warm between runs")
+    parser.add_argument("--questionnaire", default="erp", help="questionnaire id")
+    args = parser.parse_args()
+
+    questionnaire = QUESTIONNAIRES.get(args.questionnaire)
+    topics = questionnaire.topic_names
+    responses = {question.id: (i % 5) + 1
+                 for topic in questionnaire.topics for i, question in enumerate(topic.questions)}
+    user_info = {'Name': 'Benchmark', 'Email': 'bench@example.com', 'Company': 'EFESO', 'Phone': '0'}
+
+    for backend in CHART_BACKENDS:
+        # Warm up imports, fonts and the image asset cache
+        render_assessment_pdf(questionnaire, ERP_COVER, responses, user_info, topics, (0, 5), backend)
+        for topic_count in (1, len(topics)):
+            timings = []
+            size = 0
+            for _ in range(args.runs):
+                if not args.cached:
+                    CHART_CACHE.clear()
+                start = time.perf_counter()
+                pdf = render_assessment_pdf(questionnaire, ERP_COVER, responses, user_info,
+                                            topics[:topic_count], (0, 5), backend)
+                timings.append(time.perf_counter() - start)
+                size = len(pdf.getvalue())
+            print(f"{backend:10s} {topic_count} topic(s)  median {statistics.median(timings) * 1000:7.1f} ms  "
+                  f"max {max(timings) * 1000:7.1f} ms  pdf {size / 1024:7.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
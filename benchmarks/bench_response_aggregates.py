@@ -0,0 +1,91 @@
+# Cost of the peer comparison of an ERP report as the response history grows.
+#
+# Scan: what filling the panel from the response sheet would take, reading every earlier
+# submission (here from a CSV export) and computing the distribution of each question.
+# Aggregates: response_aggregates, where a save updates the per-question histograms and moments
+# and a report reads its numbers from the in-memory snapshot.
+#
+#   python benchmarks/bench_response_aggregates.py --sizes 1000,10000,30000
+import argparse
+import csv
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from questionnaires import QUESTIONNAIRES
+from response_aggregates import QuestionAggregate, ResponseAggregateStore, answered_levels
+
+
+def submission(questionnaire, index: int, rng: random.Random) -> dict:
+    row = {"Timestamp": f"2026-01-01 00:00:00.{index}", "Name": f"Respondent {index}"}
+    row.update({question_id: rng.choice((1, 2, 3, 3, 4, 4, 5)) for question_id in questionnaire.questions_by_id})
+    return row
+
+
+# The same statistics as ResponseAggregateStore.benchmarks, computed by reading the whole export
+def scan_benchmarks(questionnaire, path: str, responses: dict) -> dict:
+    aggregates = {}
+    with open(path, 'r', newline='', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            for question_id, level in answered_levels(questionnaire, row).items():
+                aggregates.setdefault(question_id, QuestionAggregate()).add(level)
+    return {question_id: (aggregate.mean, aggregate.quantile(0.25), aggregate.quantile(0.5),
+                          aggregate.quantile(0.75), aggregate.percentile(responses[question_id]))
+            for question_id, aggregate in aggregates.items()}
+
+
+def median_ms(operation, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        operation()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peer comparison cost by number of earlier responses")
+    parser.add_argument("--sizes", default="1000,10000,30000", help="comma-separated response counts")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    questionnaire = QUESTIONNAIRES.get("erp")
+    responses = {question_id: 3 for question_id in questionnaire.questions_by_id}
+    directory = tempfile.mkdtemp(prefix="response_aggregates_")
+    store = ResponseAggregateStore(os.path.join(directory, "aggregates.sqlite3"))
+    export_path = os.path.join(directory, "export.csv")
+    fields = ["Timestamp", "Name"] + list(questionnaire.questions_by_id)
+    rng = random.Random(args.seed)
+    rows = []
+
+    print(f"ERP report with all {len(questionnaire.topics)} topics ({len(responses)} questions)")
+    print(f"{'responses':>10s}  {'scan read':>12s}  {'aggregate read':>15s}  {'save (record)':>14s}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        # Fill the store up to `size` responses, timing the saves of the last batch
+        saves = []
+        while len(rows) < size:
+            rows.append(submission(questionnaire, len(rows), rng))
+            start = time.perf_counter()
+            store.record(questionnaire, rows[-1])
+            saves.append((time.perf_counter() - start) * 1000)
+        with open(export_path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+
+        scan_ms = median_ms(lambda: scan_benchmarks(questionnaire, export_path, responses), min(args.runs, 3))
+        read_ms = median_ms(lambda: store.benchmarks(questionnaire, responses, questionnaire.topic_names),
+                            args.runs * 20)
+        print(f"{size:10d}  {scan_ms:9.1f} ms  {read_ms:12.3f} ms  {statistics.median(saves[-1000:]):11.3f} ms")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# Analytics queries over the local response store (response_store) with a synthetic history of
+# ERP and R&D submissions: time to import the history, the on-disk snapshot size, the time to load
+# it in a new process, and the median latency of typical group-by queries.
+#
+#   python benchmarks/bench_response_store.py --submissions 300000 --companies 500
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from questionnaires import QUESTIONNAIRES
+from response_store import ResponseStore
+
+
+# Submissions spread over two years; every respondent answers a random subset of the topics
+def history(questionnaires, submissions: int, companies: int, seed: int):
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    for index in range(submissions):
+        questionnaire = questionnaires[index % len(questionnaires)]
+        row = {
+            "Timestamp": (start + timedelta(seconds=rng.randrange(2 * 365 * 86400))).strftime("%Y-%m-%d %H:%M:%S"),
+            "Name": f"Respondent {index}",
+            "Company": f"Company {rng.randrange(companies)}",
+        }
+        for topic in rng.sample(questionnaire.topics, rng.randint(1, len(questionnaire.topics))):
+            row.update({question.id: rng.randint(1, 5) for question in topic.questions})
+        yield questionnaire, row
+
+
+def median_ms(operation, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        operation()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Response store query latency")
+    parser.add_argument("--submissions", type=int, default=300000)
+    parser.add_argument("--companies", type=int, default=500)
+    parser.add_argument("--runs", type=int, default=9)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    erp, rnd = QUESTIONNAIRES.get("erp"), QUESTIONNAIRES.get("rnd")
+    directory = tempfile.mkdtemp(prefix="response_store_")
+    store = ResponseStore(directory)
+    start = time.perf_counter()
+    imported, _ = store.import_rows(history([erp, rnd], args.submissions, args.companies, args.seed))
+    import_s = time.perf_counter() - start
+    size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+    print(f"imported {imported} submissions in {import_s:.1f}s; snapshot {size / 1024 / 1024:.1f} MiB "
+          f"({store.count('erp')} ERP x {len(erp.questions_by_id)} questions, "
+          f"{store.count('rnd')} R&D x {len(rnd.questions_by_id)} questions)")
+
+    start = time.perf_counter()
+    ResponseStore(directory).count("erp")
+    print(f"load ERP table in a new process: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    queries = [
+        ("ERP overall mean", lambda: store.query(erp, columns="overall")),
+        ("ERP topic means by company", lambda: store.query(erp, by="company")),
+        ("ERP topic means by month", lambda: store.query(erp, by="month")),
+        ("ERP question means by company", lambda: store.query(erp, by="company", columns="questions")),
+        ("ERP topics by month, 2026, 10 companies", lambda: store.query(
+            erp, by="month", since=datetime(2026, 1, 1), companies=[f"Company {i}" for i in range(10)])),
+        ("ERP vs R&D overall by company", lambda: (store.query(erp, by="company", columns="overall"),
+                                                    store.query(rnd, by="company", columns="overall"))),
+    ]
+    for label, query in queries:
+        print(f"  {label:42s} {median_ms(query, args.runs):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# Session-state footprint of a finished Strategy, ERP and R&D session when the session keeps
+# the rendered PDFs (as it used to) versus the report jobs it keeps now.
+#
+#   python benchmarks/bench_session_footprint.py --sessions 500
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from questionnaires import QUESTIONNAIRES
+from report_cache import assessment_report_job, cached_report_pdf, catalog_version, strategy_report_job
+from session_metrics import estimate_size
+
+USER_INFO = {"Name": "Jane Doe", "Email": "jane@example.com", "Company": "Example GmbH", "Phone": "0123"}
+
+
+def finished_session() -> dict:
+    with open(os.path.join(ROOT, "dynamic_logic_with_use_cases.json"), 'r') as file:
+        catalog = json.load(file)
+    goal = next(iter(catalog))
+    method = catalog[goal]['methods'][0]
+    tools_data = catalog[goal]['tools'][method]
+    state = {
+        "strategy_report": strategy_report_job(catalog_version(catalog), goal, method, tools_data['tools'][0],
+                                               catalog[goal]['kpis'][0], tools_data['use_cases'],
+                                               tools_data['partners']),
+    }
+    for questionnaire_id in ("erp", "rnd"):
+        questionnaire = QUESTIONNAIRES.get(questionnaire_id)
+        responses = {question_id: 3 for question_id in questionnaire.questions_by_id}
+        state[f"{questionnaire_id}_responses"] = responses
+        state[f"{questionnaire_id}_user_info"] = dict(USER_INFO)
+        state[f"{questionnaire_id}_completed_topics"] = set(questionnaire.topic_names)
+        state[f"{questionnaire_id}_report"] = assessment_report_job(questionnaire, responses, USER_INFO,
+                                                                    questionnaire.topic_names, (0, 5))
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=500, help="idle sessions to extrapolate to")
+    args = parser.parse_args()
+
+    jobs_state = finished_session()
+    start = time.perf_counter()
+    pdfs = {name: io.BytesIO(cached_report_pdf(jobs_state[name]))
+            for name in ("strategy_report", "erp_report", "rnd_report")}
+    render = time.perf_counter() - start
+    # Previously the session held the PDFs in pdf_output / erp_assessment_pdf / rnd_assessment_pdf
+    pdf_state = dict(jobs_state, pdf_output=pdfs["strategy_report"], erp_assessment_pdf=pdfs["erp_report"],
+                     rnd_assessment_pdf=pdfs["rnd_report"])
+    for name in ("strategy_report", "erp_report", "rnd_report"):
+        del pdf_state[name]
+
+    for label, state in (("PDFs in session", pdf_state), ("report jobs", jobs_state)):
+        size = estimate_size(state)
+        print(f"{label:16s} {size / 1024:9.1f} KiB per session  "
+              f"{size * args.sessions / 1024 / 1024:8.1f} MiB for {args.sessions} sessions")
+    print(f"first download renders all three reports in {render * 1000:.0f} ms; repeats come from the caches")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# Worksheet partitioning against the fake Sheets backend: writes a year of ERP submissions through
+# the write-behind queue with monthly and/or size-bounded partitions (some rows arriving late, as
+# after a Sheets outage), then checks that every row was written exactly once, that partitions
+# respect their bounds, and that a one-month export only downloads the partitions of that month.
+# Prints the manifest and the cells downloaded by a partitioned versus a single-sheet read; a
+# failed check makes the command exit with 1.
+#
+#   python benchmarks/bench_sheets_partitions.py --rows 20000 --period month --max-rows 1000
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sheets_client import SheetsClientPool
+from sheets_fake import FakeSheetsBackend
+from sheets_partitions import MANIFEST_TITLE, PartitionRouter, period_of
+from sheets_writer import SheetsWriteBehind
+
+DESTINATION = "erp"
+LEGACY_ROWS = 500
+
+
+def submissions(count: int, seed: int):
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1)
+    rows = []
+    for index in range(count):
+        moment = start + timedelta(seconds=index * 365 * 86400 // count)
+        # One row in twenty is submitted while Sheets is down and flushed a few days later
+        if rng.random() < 0.05:
+            moment -= timedelta(days=rng.randint(1, 5))
+        rows.append({"Timestamp": moment.strftime("%Y-%m-%d %H:%M:%S"), "Name": f"Respondent {index}",
+                     "Company": f"Company {rng.randrange(50)}", "Responses": f"v1.{index:06d}"})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partitioned response worksheets on the fake backend")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--period", choices=("", "month"), default="month")
+    parser.add_argument("--max-rows", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    backend = FakeSheetsBackend().create_app_spreadsheets()
+    pool = SheetsClientPool(client_factory=lambda: backend)
+    # The existing single worksheet, which becomes the legacy partition
+    legacy = pool.worksheet(DESTINATION)
+    legacy.append_rows([["Timestamp", "Name", "Company", "Responses"]] +
+                       [[f"2025-12-{1 + index % 28:02d} 12:00:00", f"Legacy {index}", "Company 0", "v1.legacy"]
+                        for index in range(LEGACY_ROWS)])
+
+    router = PartitionRouter(pool.spreadsheet, period=args.period, max_rows=args.max_rows)
+    writer = SheetsWriteBehind(pool.worksheet, spool_path=os.path.join(tempfile.mkdtemp(), "spool.sqlite3"),
+                               batch_size=args.batch_size, partitions=router)
+    rows = submissions(args.rows, args.seed)
+    start = time.perf_counter()
+    for row in rows:
+        writer.enqueue(DESTINATION, row)
+        if writer.pending_count() >= args.batch_size:
+            writer.flush()
+    writer.flush()
+    elapsed = time.perf_counter() - start
+    print(f"wrote {len(rows)} rows in {elapsed:.1f}s ({backend.calls.get('append_rows', 0)} append_rows, "
+          f"{backend.calls.get('update', 0)} update, {backend.calls.get('col_values', 0)} col_values calls)")
+
+    failures = []
+    spreadsheet = pool.spreadsheet(DESTINATION)
+    partitions = router.partitions(DESTINATION)
+    print(f"\n{MANIFEST_TITLE}:")
+    for partition in partitions:
+        values = spreadsheet.worksheet(partition.worksheet).get_all_values()
+        print(f"  {partition.worksheet:32s} {partition.status:7s} rows {len(values) - 1:6d}  "
+              f"{partition.min_timestamp or '-':19s} .. {partition.max_timestamp or '-'}")
+        if partition.status == "legacy":
+            continue
+        if args.max_rows and len(values) - 1 > args.max_rows:
+            failures.append(f"{partition.worksheet} holds {len(values) - 1} rows, more than {args.max_rows}")
+        if args.period and any(period_of(cells[0], args.period) != partition.period for cells in values[1:]):
+            failures.append(f"{partition.worksheet} holds rows of another {args.period}")
+        if any(cells[0] < partition.min_timestamp for cells in values[1:]):
+            failures.append(f"{partition.worksheet} holds rows before its min_timestamp")
+
+    # Every submission exactly once, the legacy rows untouched
+    written = sorted(row["Responses"] for row in router.read_rows(DESTINATION) if row["Responses"] != "v1.legacy")
+    if written != sorted(row["Responses"] for row in rows):
+        failures.append(f"{len(written)} rows read back, expected each of the {len(rows)} once")
+    if len(legacy.get_all_values()) != LEGACY_ROWS + 1:
+        failures.append("the legacy worksheet was written to")
+
+    # One month, partitioned versus a single sheet holding everything
+    since, until = "2026-06-01 00:00:00", "2026-07-01 00:00:00"
+    before = backend.calls.get("get_all_values", 0)
+    month = list(router.read_rows(DESTINATION, since, until))
+    reads = backend.calls.get("get_all_values", 0) - before
+    scanned = sum(len(spreadsheet.worksheet(partition.worksheet).get_all_values())
+                  for partition in router.partitions(DESTINATION, since, until))
+    expected = sum(1 for row in rows if since <= row["Timestamp"] < until)
+    if len(month) != expected:
+        failures.append(f"June export has {len(month)} rows, expected {expected}")
+    print(f"\nJune export: {len(month)} rows from {reads} of {len(partitions)} partitions, "
+          f"{scanned} rows downloaded instead of {len(rows) + LEGACY_ROWS} for a single sheet")
+
+    for failure in failures:
+        print(f"FAILED: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# Quota-aware Sheets scheduling against the simulated quota server (sheets_fake.FakeQuota): a burst
+# of concurrent submissions to the three destinations (each reads the header row, then appends its
+# row) is sent once with direct calls and once through a SheetsScheduler. Time is scaled down so
+# one quota "minute" lasts --period seconds. Prints the 429s the server answered, the errors that
+# reached the callers, and the per-destination latency; the scheduled run must write every row
+# without surfacing an error, otherwise the command exits with 1.
+#
+#   python benchmarks/bench_sheets_scheduler.py --erp 90 --rnd 30 --strategy 15 --period 6
+#   python benchmarks/bench_sheets_scheduler.py --foreign-rate 2 --error-rate 0.02
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sheets_client import SHEET_DESTINATIONS, SheetsClientPool
+from sheets_fake import FakeQuota, FakeSheetsBackend
+from sheets_scheduler import SheetsScheduler
+
+HEADERS = ["Timestamp", "Name", "Company", "Responses"]
+
+
+# Submissions in arrival order: ERP first, R&D and Strategy a little later, as when a workshop
+# submits the ERP assessment together while other users keep working
+def arrivals(args):
+    plan = []
+    for destination, count, offset in (("erp", args.erp, 0.0), ("rnd", args.rnd, 0.2), ("strategy", args.strategy, 0.4)):
+        plan += [(offset + index * args.spread / max(count, 1), destination, index) for index in range(count)]
+    return sorted(plan)
+
+
+# The in-memory worksheet of a destination, read without going through the (quota-checked) API
+def raw_sheet(backend: FakeSheetsBackend, destination: str):
+    spreadsheet_title, _ = SHEET_DESTINATIONS[destination]
+    spreadsheet = next(s for s in backend._spreadsheets.values() if s.title == spreadsheet_title)
+    return spreadsheet._worksheets[0]
+
+
+def run(args, scheduled: bool) -> dict:
+    # Simulated outages say when to come back (scaled like the period), so writes may be resent too
+    quota = FakeQuota(reads=args.quota, writes=args.quota, period=args.period, error_rate=args.error_rate,
+                      error_retry_after=args.period / 60, seed=5)
+    backend = FakeSheetsBackend(latency=args.latency, quota=quota).create_app_spreadsheets()
+    # Existing header rows, written before the quota applies
+    for destination in SHEET_DESTINATIONS:
+        raw_sheet(backend, destination).rows.append(list(HEADERS))
+    scheduler = None
+    if scheduled:
+        # Backoff scaled like the quota period (1s base, 64s cap per real minute)
+        scheduler = SheetsScheduler(read_quota=args.quota, write_quota=args.quota, period=args.period,
+                                    backoff_base=args.period / 60, backoff_cap=args.period * 64 / 60,
+                                    max_wait=args.period * 20)
+    pool = SheetsClientPool(client_factory=lambda: backend, scheduler=scheduler)
+
+    stopping = threading.Event()
+    other_sheet = backend.create("Other_Tool_Responses").sheet1
+
+    # Another process on the same service account, appending to its own spreadsheet without the scheduler
+    def foreign_load():
+        while not stopping.wait(1 / args.foreign_rate):
+            try:
+                other_sheet.append_row(["foreign"])
+            except Exception:
+                pass
+
+    latencies = {destination: [] for destination in SHEET_DESTINATIONS}
+    errors = []
+    lock = threading.Lock()
+
+    def submit(destination: str, index: int):
+        start = time.perf_counter()
+        try:
+            sheet = pool.worksheet(destination)
+            headers = sheet.row_values(1)
+            sheet.append_row([time.strftime("%Y-%m-%d %H:%M:%S"), f"Respondent {index}", "Company", "v1.x"][:len(headers)])
+        except Exception as e:
+            with lock:
+                errors.append(f"{destination}: {e}")
+            return
+        with lock:
+            latencies[destination].append(time.perf_counter() - start)
+
+    foreign = threading.Thread(target=foreign_load, daemon=True) if args.foreign_rate else None
+    if foreign:
+        foreign.start()
+    threads = []
+    start = time.perf_counter()
+    for at, destination, index in arrivals(args):
+        delay = start + at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        thread = threading.Thread(target=submit, args=(destination, index))
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stopping.set()
+
+    written = {destination: len(raw_sheet(backend, destination).rows) - 1 for destination in SHEET_DESTINATIONS}
+    return {"elapsed": elapsed, "errors": errors, "latencies": latencies, "quota": quota,
+            "scheduler": scheduler.stats() if scheduler else None, "written": written}
+
+
+def report(label: str, result: dict):
+    quota = result["quota"]
+    print(f"{label}: {result['elapsed']:.1f}s, server answered {sum(quota.rejected.values())} x 429 "
+          f"and {quota.errors} x 503, {len(result['errors'])} error(s) reached the callers")
+    for destination, values in result["latencies"].items():
+        if values:
+            print(f"  {destination:9s} {len(values):4d} ok   latency p50 {statistics.median(values):5.2f}s  "
+                  f"max {max(values):5.2f}s")
+    stats = result["scheduler"]
+    if stats:
+        print(f"  scheduler: {stats['requests']} requests, {stats['retries']} retries "
+              f"({stats['rate_limited']} after 429), {stats['coalesced']} coalesced reads, "
+              f"{stats['throttled_seconds']:.0f}s throttled in total, max queue depth {stats['max_queue_depth']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sheets quota scheduler on the simulated quota server")
+    parser.add_argument("--erp", type=int, default=90)
+    parser.add_argument("--rnd", type=int, default=30)
+    parser.add_argument("--strategy", type=int, default=15)
+    parser.add_argument("--spread", type=float, default=1.0, help="seconds over which each burst arrives")
+    parser.add_argument("--quota", type=int, default=60, help="read and write requests per period")
+    parser.add_argument("--period", type=float, default=6.0, help="seconds standing in for the quota minute")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per simulated API call")
+    parser.add_argument("--foreign-rate", type=float, default=0.0, help="unscheduled writes per second")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of calls answered with 503")
+    args = parser.parse_args()
+
+    submissions = args.erp + args.rnd + args.strategy
+    print(f"{submissions} submissions, quota {args.quota} reads and {args.quota} writes per {args.period:g}s\n")
+    report("direct", run(args, scheduled=False))
+    time.sleep(args.period)
+    result = run(args, scheduled=True)
+    report("\nscheduled", result)
+
+    failures = [f"error reached a caller: {error}" for error in result["errors"][:5]]
+    expected = {"erp": args.erp, "rnd": args.rnd, "strategy": args.strategy}
+    failures += [f"{destination} has {count} rows, expected {expected[destination]}"
+                 for destination, count in result["written"].items() if count != expected[destination]]
+    for failure in failures:
+        print(f"FAILED: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
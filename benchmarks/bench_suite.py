@@ -0,0 +1,190 @@
+# Headless benchmark suite for the report and persistence hot paths: Strategy PDFs, ERP and R&D
+# assessment PDFs with 1..N completed topics, and the Sheets write-behind queue against the
+# in-memory fake gspread backend. No Streamlit, no network.
+#
+# Every scenario reports latency percentiles, peak traced memory and output size. Results can be
+# saved as a baseline; later runs are compared against it and regressions beyond the threshold
+# make the command exit with status 1.
+#
+#   python benchmarks/bench_suite.py --save-baseline
+#   python benchmarks/bench_suite.py --threshold 0.15
+#   python benchmarks/bench_suite.py --only erp_pdf --runs 20
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from questionnaires import QUESTIONNAIRES
+from render_pool import render_report
+from report_charts import CHART_CACHE
+from report_cache import assessment_report_job, catalog_version, iter_strategy_selections, strategy_report_job
+from sheets_client import SheetsClientPool
+from sheets_fake import FakeSheetsBackend
+from sheets_writer import SheetsWriteBehind
+
+DEFAULT_BASELINE = os.path.join(ROOT, "local_data", "bench_baseline.json")
+# Metrics compared against the baseline; all of them are "lower is better"
+COMPARED_METRICS = ("p50_ms", "p95_ms", "peak_kib")
+USER_INFO = {"Name": "Jane Doe", "Email": "jane@example.com", "Company": "Example GmbH", "Phone": "0123"}
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+# Run `operation` once for warm-up and `runs` times measured. `operation(i)` returns the output
+# size in bytes. Peak memory is traced on a separate run so tracing does not skew the timings.
+def measure(operation: Callable[[int], int], runs: int) -> Dict[str, float]:
+    operation(-1)
+    timings, size = [], 0
+    for i in range(runs):
+        start = time.perf_counter()
+        size = operation(i)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    operation(runs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "runs": runs,
+        "p50_ms": statistics.median(timings),
+        "p95_ms": percentile(timings, 0.95),
+        "max_ms": max(timings),
+        "peak_kib": peak / 1024,
+        "output_kib": size / 1024,
+    }
+
+
+# Assessment jobs with random answers for the first `topics` topics. The chart cache is cleared
+# before every report, so every chart is rendered (set no CHART_CACHE_DIR for the same reason).
+def assessment_scenario(questionnaire_id: str, topics: int) -> Callable[[int], int]:
+    questionnaire = QUESTIONNAIRES.get(questionnaire_id)
+    completed = questionnaire.topic_names[:topics]
+
+    def operation(i: int) -> int:
+        rng = random.Random(i)
+        responses = {question.id: rng.randint(1, 5)
+                     for topic in questionnaire.topics[:topics] for question in topic.questions}
+        CHART_CACHE.clear()
+        return len(render_report(assessment_report_job(questionnaire, responses, USER_INFO, completed, (0, 5))))
+
+    return operation
+
+
+def strategy_scenario() -> Callable[[int], int]:
+    with open(os.path.join(ROOT, "dynamic_logic_with_use_cases.json"), 'r') as file:
+        catalog = json.load(file)
+    version = catalog_version(catalog)
+    selections = list(iter_strategy_selections(catalog))
+    return lambda i: len(render_report(strategy_report_job(version, *selections[i % len(selections)])))
+
+
+# Enqueue `rows` ERP submissions and flush them to the fake worksheet in one batch
+def sheets_scenario(rows: int, latency: float) -> Callable[[int], int]:
+    questionnaire = QUESTIONNAIRES.get("erp")
+    spool_dir = tempfile.mkdtemp(prefix="bench_suite_")
+
+    def operation(i: int) -> int:
+        backend = FakeSheetsBackend(latency=latency).create_app_spreadsheets()
+        pool = SheetsClientPool(client_factory=lambda: backend)
+        writer = SheetsWriteBehind(pool.worksheet, spool_path=os.path.join(spool_dir, f"spool_{i}.sqlite3"),
+                                   batch_size=rows)
+        for row in range(rows):
+            writer.enqueue("erp", {"Timestamp": f"2024-01-01 00:00:{row % 60:02d}", **USER_INFO,
+                                   **{question_id: 3 for question_id in questionnaire.questions_by_id}})
+        writer.flush()
+        writer._conn.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(writer.spool_path + suffix):
+                os.remove(writer.spool_path + suffix)
+        # Size of the cell data that reached the worksheet
+        return sum(len(str(value)) for row in pool.worksheet("erp").rows for value in row)
+
+    return operation
+
+
+def scenarios(max_topics: Optional[int], sheet_rows: int, sheet_latency: float) -> List[Tuple[str, Callable]]:
+    result = [("strategy_pdf", strategy_scenario())]
+    for questionnaire in QUESTIONNAIRES.all():
+        total = len(questionnaire.topics) if max_topics is None else min(max_topics, len(questionnaire.topics))
+        for topics in sorted({1, max(1, total // 2), total}):
+            result.append((f"{questionnaire.id}_pdf_{topics}_topics", assessment_scenario(questionnaire.id, topics)))
+    result.append((f"sheets_write_behind_{sheet_rows}_rows", sheets_scenario(sheet_rows, sheet_latency)))
+    return result
+
+
+# Scenarios whose metrics grew by more than `threshold` (a fraction) against the baseline
+def regressions(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    found = []
+    for name, metrics in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        for metric in COMPARED_METRICS:
+            before, after = reference.get(metric), metrics[metric]
+            if before and after > before * (1 + threshold):
+                found.append(f"{name} {metric}: {before:.1f} -> {after:.1f} (+{(after / before - 1) * 100:.0f}%)")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report and Sheets benchmark suite")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--max-topics", type=int, default=None, help="largest number of completed topics")
+    parser.add_argument("--sheet-rows", type=int, default=50)
+    parser.add_argument("--sheet-latency", type=float, default=0.0, help="simulated seconds per Sheets call")
+    parser.add_argument("--only", default=None, help="run the scenarios whose name contains this text")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before flagging, e.g. 0.2")
+    args = parser.parse_args()
+
+    results = {}
+    for name, operation in scenarios(args.max_topics, args.sheet_rows, args.sheet_latency):
+        if args.only and args.only not in name:
+            continue
+        metrics = measure(operation, args.runs)
+        results[name] = metrics
+        print(f"{name:32s} p50 {metrics['p50_ms']:8.1f} ms  p95 {metrics['p95_ms']:8.1f} ms  "
+              f"peak {metrics['peak_kib']:8.0f} KiB  output {metrics['output_kib']:7.1f} KiB")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file).get("results", {})
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as file:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "saved_at": time.strftime("%Y-%m-%d %H:%M:%S"), "results": {**baseline, **results}},
+                      file, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    if not baseline:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return
+    found = regressions(results, baseline, args.threshold)
+    if found:
+        print(f"Regressions above {args.threshold * 100:.0f}%:")
+        for line in found:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"No regressions above {args.threshold * 100:.0f}% against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
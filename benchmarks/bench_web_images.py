@@ -0,0 +1,92 @@
+# Bytes and server time of the header images per page view, before and after the web variants.
+#
+# Before: st.image() on the original files. Streamlit decodes the 7680px PNG on every rerun,
+# scales it to its maximum content width and re-encodes it (JPEG quality 90), and does the same
+# for the logo at 300px (PNG), in every session.
+# After: the browser picks a pre-encoded WebP variant from the srcset for its viewport and pixel
+# density; a rerun only sends the <picture> tag. The st.image fallback (static serving off)
+# passes the pre-encoded bytes through unchanged.
+#
+#   python benchmarks/bench_web_images.py --runs 5
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.elements.lib.image_utils import _ensure_image_size_and_format, _validate_image_format_string
+from streamlit.elements.lib.layout_utils import create_layout_config
+
+from web_images import WebImageCache
+
+BACKGROUND = os.path.join(ROOT, "Background_Tool.png")
+LOGO = os.path.join(ROOT, "efeso_logo.png")
+LOGO_WIDTH = 300
+# (label, CSS viewport width, device pixel ratio)
+VIEWPORTS = (("phone", 390, 3), ("laptop", 1440, 1), ("laptop hidpi", 1440, 2), ("desktop", 1920, 1))
+
+
+# What st.image does with a file path on every rerun: returns the bytes sent and the seconds spent
+def streamlit_image(path: str, width) -> tuple:
+    start = time.perf_counter()
+    with open(path, 'rb') as file:
+        data = file.read()
+    layout_config = create_layout_config(width=width, allow_content_width=True)
+    data = _ensure_image_size_and_format(data, layout_config, _validate_image_format_string(data, "auto"))
+    return len(data), time.perf_counter() - start
+
+
+def median_ms(operation, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        operation()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Header image bytes per page view")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    background_bytes, _ = streamlit_image(BACKGROUND, "stretch")
+    logo_bytes, _ = streamlit_image(LOGO, LOGO_WIDTH)
+    before_ms = median_ms(lambda: (streamlit_image(BACKGROUND, "stretch"), streamlit_image(LOGO, LOGO_WIDTH)),
+                          args.runs)
+    before = background_bytes + logo_bytes
+    print(f"before: st.image on the originals ({os.path.getsize(BACKGROUND) // 1024} KiB PNG source)")
+    print(f"  sent per page view  {before / 1024:8.1f} KiB  (background {background_bytes / 1024:.1f}, "
+          f"logo {logo_bytes / 1024:.1f})")
+    print(f"  server time per rerun {before_ms:8.1f} ms")
+
+    cache = WebImageCache(static_dir=tempfile.mkdtemp(prefix="web_images_"))
+    start = time.perf_counter()
+    background = cache.get(BACKGROUND)
+    logo = cache.get(LOGO, widths=(LOGO_WIDTH, 2 * LOGO_WIDTH))
+    encode_s = time.perf_counter() - start
+    html = background.html("background") + logo.html("logo", LOGO_WIDTH)
+    html_ms = median_ms(lambda: background.html("background") + logo.html("logo", LOGO_WIDTH), args.runs)
+    fallback_ms = median_ms(lambda: (
+        _ensure_image_size_and_format(background.best(1280).data, create_layout_config(width="stretch"), "JPEG"),
+        _ensure_image_size_and_format(logo.best(LOGO_WIDTH).data, create_layout_config(width=LOGO_WIDTH), "PNG"),
+    ), args.runs)
+    print(f"\nafter: pre-encoded variants (encoded once in {encode_s:.1f}s, "
+          f"{sum(len(v.data) for v in background.variants + logo.variants) / 1024:.0f} KiB for all variants)")
+    for label, viewport, ratio in VIEWPORTS:
+        chosen = background.best(viewport * ratio, "WEBP")
+        chosen_logo = logo.best(LOGO_WIDTH * ratio, "WEBP")
+        sent = len(chosen.data) + len(chosen_logo.data)
+        print(f"  {label:13s} {viewport}px @{ratio}x  first view {sent / 1024:6.1f} KiB "
+              f"({chosen.width}w + logo {chosen_logo.width}w, {(1 - sent / before) * 100:.0f}% less); "
+              f"later reruns and views: browser cache")
+    print(f"  sent per rerun        {len(html) / 1024:8.1f} KiB of HTML")
+    print(f"  server time per rerun {html_ms:8.3f} ms  (st.image fallback {fallback_ms:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
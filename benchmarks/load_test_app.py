@@ -0,0 +1,327 @@
+# Load test for the Streamlit app: starts `streamlit run app.py` with the in-memory Sheets
+# stand-in (SHEETS_BACKEND=fake) and drives simulated browser sessions through the real flows
+# over the app's websocket, at increasing concurrency. Each session speaks the browser protocol
+# (BackMsg rerun requests with widget states, ForwardMsg deltas) and reads the pages with the
+# element tree of Streamlit's AppTest, so every click is a real script rerun on the server.
+#
+# Flows:
+#   strategy  choose a goal, fill in the contact form, submit, wait for the download button
+#   erp, rnd  open topics, move every slider, submit each topic, generate the report,
+#             fill in the contact form and poll the report page until the download is offered
+#
+# Widgets inside st.fragment blocks rerun only their fragment, as in the browser. For every
+# concurrency level it reports full and fragment reruns, rerun latency percentiles per flow,
+# failed sessions, and the server's CPU time and RSS growth, e.g.
+#
+#   python benchmarks/load_test_app.py --concurrency 1 4 16 --topics 2
+#   python benchmarks/load_test_app.py --url http://staging:8501   (existing server, no RSS)
+import argparse
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from streamlit.testing.v1.element_tree import ElementTree, parse_tree_from_messages
+from websockets.sync.client import connect
+
+from questionnaires import QUESTIONNAIRES
+
+APP_PATH = os.path.join(ROOT, "app.py")
+APP_MODES = {"erp": "ERP Maturity Assessment", "rnd": "R&D Maturity Assessment"}
+CONTACT_FORMS = {"strategy": "contact_form", "erp": "contact_form", "rnd": "contact_form_rnd"}
+CONTACT = ("Load Test", "load@example.com", "Example GmbH", "0123")
+RERUN_TIMEOUT = 60.0
+REPORT_TIMEOUT = 120.0
+
+
+class SessionFailed(Exception):
+    pass
+
+
+# One simulated browser tab. Like the frontend, it sends the values of the widgets it has changed
+# with every rerun (the server keeps the rest) plus a one-off trigger for the button it clicks,
+# and a widget inside a fragment only reruns that fragment. Widgets are found by key or position
+# in the element tree parsed from the page's deltas.
+class Session:
+    def __init__(self, websocket, flow: str, seed: int):
+        self.flow = flow
+        self.rng = random.Random(seed)
+        self.latencies: List[float] = []
+        self.fragment_reruns = 0
+        self.tree: Optional[ElementTree] = None
+        self._values: Dict[str, WidgetState] = {}
+        # Current page as delta path -> message; fragment runs replace only their own deltas
+        self._page: Dict[tuple, ForwardMsg] = {}
+        self._fragments: Dict[str, str] = {}
+        self._websocket = websocket
+
+    # Request a rerun and wait until the server finished it (and any st.rerun() it triggered)
+    def _rerun(self, trigger: Optional[WidgetState] = None, fragment_id: str = ""):
+        back_msg = BackMsg()
+        back_msg.rerun_script.query_string = ""
+        back_msg.rerun_script.fragment_id = fragment_id
+        back_msg.rerun_script.widget_states.widgets.extend(self._values.values())
+        if trigger is not None:
+            back_msg.rerun_script.widget_states.widgets.append(trigger)
+        self._websocket.send(back_msg.SerializeToString())
+
+        page = dict(self._page) if fragment_id else {}
+        deadline = time.monotonic() + RERUN_TIMEOUT
+        while True:
+            message = ForwardMsg()
+            message.ParseFromString(self._websocket.recv(timeout=max(0.1, deadline - time.monotonic())))
+            kind = message.WhichOneof("type")
+            if kind == "new_session" and not message.new_session.fragment_ids_this_run:
+                # A full script run (also after st.rerun()); only its deltas are shown
+                page = {}
+            elif kind == "delta":
+                page[tuple(message.metadata.delta_path)] = message
+                self._track_fragment(message.delta)
+            elif kind == "script_finished" and message.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                break
+        self._page = page
+        self.tree = parse_tree_from_messages(list(page.values()))
+
+    def _track_fragment(self, delta):
+        if not delta.fragment_id or not delta.HasField("new_element"):
+            return
+        element = getattr(delta.new_element, delta.new_element.WhichOneof("type"))
+        if "id" in element.DESCRIPTOR.fields_by_name:
+            self._fragments[element.id] = delta.fragment_id
+
+    # One timed rerun of the page, or of the fragment holding `widget_id`; fails the session if
+    # the script raised
+    def run(self, trigger: Optional[WidgetState] = None, widget_id: Optional[str] = None):
+        fragment_id = self._fragments.get(widget_id, "")
+        start = time.perf_counter()
+        self._rerun(trigger, fragment_id)
+        self.latencies.append((time.perf_counter() - start) * 1000)
+        self.fragment_reruns += bool(fragment_id)
+        if self.tree.exception:
+            raise SessionFailed(self.tree.exception[0].message)
+
+    def set_value(self, widget, **value):
+        state = WidgetState(id=widget.id, **value)
+        self._values[widget.id] = state
+        self.run(widget_id=widget.id)
+
+    def click(self, key: str):
+        button_id = self.tree.button(key=key).id
+        self.run(WidgetState(id=button_id, trigger_value=True), button_id)
+
+    def fill_contact_form(self):
+        # Form fields are only sent with the submit click, as in the browser
+        for text_input, value in zip(self.tree.main.text_input, CONTACT):
+            self._values[text_input.id] = WidgetState(id=text_input.id, string_value=value)
+        self.click(f"FormSubmitter:{CONTACT_FORMS[self.flow]}-Submit")
+
+    def wait_for_download(self):
+        deadline = time.monotonic() + REPORT_TIMEOUT
+        while not self.tree.get("download_button"):
+            if self.tree.error:
+                raise SessionFailed(self.tree.error[0].value)
+            if time.monotonic() > deadline:
+                raise SessionFailed("no download button")
+            time.sleep(0.5)
+            self.run()
+
+
+def strategy_flow(session: Session, topics: int):
+    session.run()
+    goal = session.tree.main.selectbox[0]
+    session.set_value(goal, string_value=session.rng.choice(goal.options))
+    session.fill_contact_form()
+    session.wait_for_download()
+
+
+def assessment_flow(session: Session, topics: int):
+    suffix = "" if session.flow == "erp" else "_rnd"
+    questionnaire = QUESTIONNAIRES.get(session.flow)
+    session.run()
+    session.set_value(session.tree.sidebar.selectbox[0], string_value=APP_MODES[session.flow])
+    for topic in session.rng.sample(questionnaire.topic_names, min(topics, len(questionnaire.topics))):
+        session.click(f"btn_{topic}{suffix}")
+        session.click(f"start_{topic}")
+        # "Start Assessment" only switches pages on the next rerun, as in the browser
+        session.run()
+        for slider in list(session.tree.slider):
+            session.set_value(slider, double_array_value={"data": [session.rng.randint(1, 5)]})
+        session.click(f"submit_{topic}{suffix}")
+        session.click(f"back_{topic}{suffix}")
+    session.click(f"generate_report{suffix}")
+    session.fill_contact_form()
+    session.wait_for_download()
+
+
+FLOWS = {"strategy": strategy_flow, "erp": assessment_flow, "rnd": assessment_flow}
+
+
+def run_session(url: str, flow: str, seed: int, topics: int) -> Dict:
+    start = time.perf_counter()
+    error = None
+    session = None
+    try:
+        with connect(url.replace("http", "ws", 1).rstrip("/") + "/_stcore/stream",
+                     subprotocols=["streamlit"], max_size=None) as websocket:
+            session = Session(websocket, flow, seed)
+            FLOWS[flow](session, topics)
+    except SessionFailed as e:
+        error = str(e)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        traceback.print_exc()
+    return {"flow": flow, "latencies": session.latencies if session else [],
+            "fragment_reruns": session.fragment_reruns if session else 0,
+            "seconds": time.perf_counter() - start, "error": error}
+
+
+def rss_mib(pid: Optional[int]) -> Optional[float]:
+    if pid is None:
+        return None
+    try:
+        with open(f"/proc/{pid}/status", "r") as file:
+            for line in file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+# User plus system CPU seconds used by the process so far
+def cpu_seconds(pid: Optional[int]) -> Optional[float]:
+    if pid is None:
+        return None
+    try:
+        with open(f"/proc/{pid}/stat", "r") as file:
+            fields = file.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# `streamlit run app.py` on a free port, writing Sheets rows to the fake backend and the spool and
+# local response data to a temporary directory
+def start_server() -> subprocess.Popen:
+    port = free_port()
+    data_dir = tempfile.mkdtemp(prefix="load_test_")
+    env = dict(os.environ, SHEETS_BACKEND="fake", SHEETS_SPOOL_PATH=os.path.join(data_dir, "spool.sqlite3"),
+               RESPONSE_AGGREGATES_PATH=os.path.join(data_dir, "response_aggregates.sqlite3"),
+               RESPONSE_STORE_DIR=os.path.join(data_dir, "response_store"))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", APP_PATH, "--server.headless", "true",
+         "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    server.url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{server.url}/_stcore/health", timeout=1):
+                return server
+        except OSError:
+            if server.poll() is not None:
+                raise RuntimeError("streamlit exited during start-up")
+            time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError("streamlit did not become healthy within 60s")
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def run_level(url: str, pid: Optional[int], concurrency: int, sessions: int, flows: List[str], topics: int,
+              seed: int):
+    rss_before = rss_mib(pid)
+    cpu_before = cpu_seconds(pid)
+    peak = [rss_before or 0.0]
+    sampling = threading.Event()
+
+    def sample_rss():
+        while not sampling.wait(0.5):
+            peak[0] = max(peak[0], rss_mib(pid) or 0.0)
+
+    sampler = threading.Thread(target=sample_rss, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(
+            lambda i: run_session(url, flows[i % len(flows)], seed + i, topics), range(sessions)
+        ))
+    elapsed = time.perf_counter() - start
+    sampling.set()
+    sampler.join()
+    rss_after = rss_mib(pid)
+    cpu_after = cpu_seconds(pid)
+
+    server = "server RSS and CPU unknown"
+    if rss_before is not None and rss_after is not None:
+        server = (f"server CPU {cpu_after - cpu_before:.1f}s ({(cpu_after - cpu_before) / sessions:.2f}s per session), "
+                  f"RSS {rss_before:.0f} -> {rss_after:.0f} MiB "
+                  f"(+{rss_after - rss_before:.0f}, peak {max(peak[0], rss_after):.0f})")
+    print(f"\nconcurrency {concurrency}: {sessions} sessions in {elapsed:.1f}s, {server}")
+    for flow in flows:
+        flow_results = [result for result in results if result["flow"] == flow]
+        if not flow_results:
+            continue
+        latencies = [latency for result in flow_results for latency in result["latencies"]]
+        errors = [result["error"] for result in flow_results if result["error"]]
+        fragment_reruns = sum(result["fragment_reruns"] for result in flow_results)
+        print(f"  {flow:8s} sessions {len(flow_results):3d}  reruns {len(latencies):4d} "
+              f"(fragment {fragment_reruns:4d})  "
+              f"rerun p50 {percentile(latencies, 0.5):6.0f} ms  p95 {percentile(latencies, 0.95):6.0f} ms  "
+              f"max {max(latencies, default=0):6.0f} ms  "
+              f"session mean {statistics.mean(result['seconds'] for result in flow_results):5.1f}s  "
+              f"errors {len(errors)}")
+        for error in sorted(set(errors))[:3]:
+            print(f"    error: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for app.py")
+    parser.add_argument("--url", default=None, help="test a running server instead of starting one")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--sessions", type=int, default=None, help="sessions per level (default: 2 x concurrency)")
+    parser.add_argument("--flows", nargs="+", choices=list(FLOWS), default=list(FLOWS))
+    parser.add_argument("--topics", type=int, default=2, help="topics answered per assessment session")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = None if args.url else start_server()
+    url = args.url or server.url
+    print(f"Testing {url}" + (f" (local server, pid {server.pid}, fake Sheets backend)" if server else ""))
+    try:
+        for concurrency in args.concurrency:
+            run_level(url, server.pid if server else None, concurrency, args.sessions or concurrency * 2,
+                      args.flows, args.topics, args.seed)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
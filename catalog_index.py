@@ -0,0 +1,144 @@
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Facets of a catalog path; a path is one goal/method combination with its tools, use cases,
+# partners and the goal's KPIs
+FACETS = ("goal", "method", "tool", "use_case", "partner", "kpi")
+
+
+def _iter_bits(mask: int):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+# Precomputed inverted indexes over the Strategy Tool catalog (dynamic_logic_with_use_cases.json).
+#
+# Every goal/method path gets an integer id, every facet value gets an integer id, and each value
+# maps to a bitset (a Python int) of the paths it occurs in. A query ORs the bitsets of the values
+# selected within a facet and ANDs the facets together, so multi-facet and reverse queries cost a
+# handful of big-int operations however large the catalog grows. Each path also keeps the value ids
+# it contains per facet, which makes ranking proportional to the number of matching paths.
+class CatalogIndex:
+    def __init__(self, catalog: dict):
+        self.values: Dict[str, List[str]] = {facet: [] for facet in FACETS}
+        self._value_ids: Dict[str, Dict[str, int]] = {facet: {} for facet in FACETS}
+        self._bitsets: Dict[str, List[int]] = {facet: [] for facet in FACETS}
+        self.paths: List[Tuple[str, str]] = []
+        self._path_values: List[Dict[str, Tuple[int, ...]]] = []
+        self._methods: Dict[str, List[str]] = {}
+        self._kpis: Dict[str, List[str]] = {}
+        self._path_ids: Dict[Tuple[str, str], int] = {}
+
+        for goal, goal_data in catalog.items():
+            self._methods[goal] = list(goal_data['methods'])
+            self._kpis[goal] = list(goal_data['kpis'])
+            for method in goal_data['methods']:
+                tools_data = goal_data['tools'].get(method)
+                if tools_data is None:
+                    logger.warning(f"Method '{method}' of goal '{goal}' has no tools in the catalog.")
+                    continue
+                self._add_path(goal, method, {
+                    "goal": [goal],
+                    "method": [method],
+                    "tool": tools_data['tools'],
+                    "use_case": tools_data['use_cases'],
+                    "partner": tools_data['partners'],
+                    "kpi": goal_data['kpis'],
+                })
+        self.all_paths = (1 << len(self.paths)) - 1
+
+    def _add_path(self, goal: str, method: str, facet_values: Dict[str, Sequence[str]]):
+        path_id = len(self.paths)
+        self.paths.append((goal, method))
+        self._path_ids[(goal, method)] = path_id
+        bit = 1 << path_id
+        ids = {}
+        for facet, values in facet_values.items():
+            value_ids = []
+            for value in values:
+                value_id = self._value_ids[facet].get(value)
+                if value_id is None:
+                    value_id = len(self.values[facet])
+                    self._value_ids[facet][value] = value_id
+                    self.values[facet].append(value)
+                    self._bitsets[facet].append(0)
+                self._bitsets[facet][value_id] |= bit
+                value_ids.append(value_id)
+            ids[facet] = tuple(value_ids)
+        self._path_values.append(ids)
+
+    # Bitset of the paths matching the selection: any of the values within a facet, all facets together.
+    # Unknown values match nothing; facets left out (or empty) do not restrict the result.
+    def match(self, **selection: Iterable[str]) -> int:
+        mask = self.all_paths
+        for facet, values in selection.items():
+            if facet not in self._bitsets:
+                raise ValueError(f"Unknown catalog facet '{facet}', expected one of {', '.join(FACETS)}.")
+            values = [values] if isinstance(values, str) else list(values or ())
+            if not values:
+                continue
+            facet_mask = 0
+            for value in values:
+                value_id = self._value_ids[facet].get(value)
+                if value_id is not None:
+                    facet_mask |= self._bitsets[facet][value_id]
+            mask &= facet_mask
+            if not mask:
+                break
+        return mask
+
+    def matching_paths(self, mask: int) -> List[Tuple[str, str]]:
+        return [self.paths[path_id] for path_id in _iter_bits(mask)]
+
+    # Distinct values of a facet occurring in the matched paths, in catalog order,
+    # e.g. facet_values("goal", match(partner="Siemens")) lists the goals that lead to Siemens
+    def facet_values(self, facet: str, mask: int) -> List[str]:
+        value_ids = set()
+        for path_id in _iter_bits(mask):
+            value_ids.update(self._path_values[path_id][facet])
+        return [self.values[facet][value_id] for value_id in sorted(value_ids)]
+
+    # Values of a facet ranked by how well the paths they occur in match the selection.
+    # A path scores one point per selected value it contains, so paths satisfying several of the
+    # selected goals, tools or KPIs weigh more; ties keep catalog order.
+    def rank(self, facet: str, selection: Dict[str, Iterable[str]],
+             limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        mask = self.match(**selection)
+        selected_ids = {
+            selected_facet: {self._value_ids[selected_facet][value]
+                             for value in ([values] if isinstance(values, str) else values or ())
+                             if value in self._value_ids[selected_facet]}
+            for selected_facet, values in selection.items()
+        }
+        scores: Dict[int, int] = {}
+        for path_id in _iter_bits(mask):
+            path_values = self._path_values[path_id]
+            weight = 1 + sum(len(ids.intersection(path_values[selected_facet]))
+                             for selected_facet, ids in selected_ids.items())
+            for value_id in path_values[facet]:
+                scores[value_id] = scores.get(value_id, 0) + weight
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [(self.values[facet][value_id], score) for value_id, score in ranked]
+
+    # Single-path lookups used by the Strategy Tool dropdowns
+    def methods(self, goal: str) -> List[str]:
+        return self._methods.get(goal, [])
+
+    def kpis(self, goal: str) -> List[str]:
+        return self._kpis.get(goal, [])
+
+    def tools_and_use_cases(self, goal: str, method: str) -> Optional[Tuple[List[str], List[str], List[str]]]:
+        path_id = self._path_ids.get((goal, method))
+        if path_id is None:
+            return None
+        path_values = self._path_values[path_id]
+        return tuple(
+            [self.values[facet][value_id] for value_id in path_values[facet]]
+            for facet in ("tool", "use_case", "partner")
+        )
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get("CHART_CACHE_SIZE", "512"))
+# Set CHART_CACHE_DIR to keep rendered charts on disk across restarts
+DEFAULT_DISK_DIR = os.environ.get("CHART_CACHE_DIR") or None
+# Total size of the chart files in CHART_CACHE_DIR; the least recently used ones are removed beyond it
+DEFAULT_DISK_MAX_BYTES = int(os.environ.get("CHART_CACHE_DISK_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+# A topic chart in its rendered form: PDF content-stream operators for the vector backend
+# (with the internal font names they reference) or PNG bytes for the matplotlib backend.
+class RenderedChart:
+    __slots__ = ("backend", "digest", "size", "data", "fonts")
+
+    def __init__(self, backend: str, digest: str, size: float, data: Union[str, bytes],
+                 fonts: Optional[Dict[str, str]] = None):
+        self.backend = backend
+        self.digest = digest
+        self.size = size
+        self.data = data
+        self.fonts = fonts or {}
+
+
+def chart_digest(key: Hashable) -> str:
+    return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+
+
+# Bounded LRU of rendered charts keyed by (questionnaire, topic, responses, y-axis range, backend, size).
+#
+# A topic chart only depends on its answer vector, and a few hundred vectors cover nearly all real
+# submissions, so most reports are assembled from cached charts. With disk_dir set, every rendered
+# chart is also written to disk and looked up there on a memory miss, so popular charts survive
+# restarts. A chart file is a JSON header line (backend, size, fonts) followed by the raw chart
+# data, never unpickled, so a shared cache directory cannot run code; the directory is bounded by
+# disk_max_bytes, removing the files that were used least recently (reads refresh their mtime).
+# Counters are exposed through stats() for monitoring.
+class ChartCache:
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, disk_dir: Optional[str] = DEFAULT_DISK_DIR,
+                 disk_max_bytes: int = DEFAULT_DISK_MAX_BYTES):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        # Bytes of the chart files, counted on the first write and kept up to date by this process
+        self._disk_bytes: Optional[int] = None
+        self._entries: "OrderedDict[Hashable, RenderedChart]" = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_render(self, key: Hashable, render: Callable[[str], RenderedChart]) -> RenderedChart:
+        with self._lock:
+            chart = self._entries.get(key)
+            if chart is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return chart
+
+        digest = chart_digest(key)
+        chart = self._read_disk(digest)
+        if chart is not None:
+            with self._lock:
+                self.disk_hits += 1
+        else:
+            chart = render(digest)
+            with self._lock:
+                self.misses += 1
+            self._write_disk(chart)
+
+        with self._lock:
+            self._entries[key] = chart
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return chart
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def _disk_path(self, digest: str) -> str:
+        return os.path.join(self.disk_dir, f"{digest}.chart")
+
+    def _read_disk(self, digest: str) -> Optional[RenderedChart]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(digest)
+        try:
+            with open(path, "rb") as file:
+                header, _, payload = file.read().partition(b"\n")
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Could not read cached chart {path}: {e}")
+            return None
+        try:
+            meta = json.loads(header)
+            backend, size, fonts = meta["backend"], float(meta["size"]), meta["fonts"]
+            if not isinstance(backend, str) or not isinstance(fonts, dict) or \
+                    not all(isinstance(name, str) and isinstance(value, str) for name, value in fonts.items()):
+                raise ValueError("unexpected header fields")
+            data = payload if meta["binary"] else payload.decode("utf-8")
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable cached chart {path}: {e}")
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return RenderedChart(backend, digest, size, data, fonts)
+
+    def _write_disk(self, chart: RenderedChart):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(chart.digest)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        binary = isinstance(chart.data, bytes)
+        header = json.dumps({"backend": chart.backend, "size": chart.size, "fonts": chart.fonts, "binary": binary})
+        content = header.encode("utf-8") + b"\n" + (chart.data if binary else chart.data.encode("utf-8"))
+        try:
+            with open(tmp_path, "wb") as file:
+                file.write(content)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write cached chart {path}: {e}")
+            return
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+            else:
+                self._disk_bytes += len(content)
+            if self._disk_bytes > self.disk_max_bytes:
+                self._prune_disk()
+
+    # (path, bytes, mtime) of the chart files in disk_dir
+    def _disk_files(self):
+        files = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith(".chart"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((entry.path, stat.st_size, stat.st_mtime))
+        return files
+
+    # Remove the least recently used chart files until the directory is 10% below disk_max_bytes, so
+    # the next writes do not prune again; the directory is rescanned, as other processes may share
+    # it. Called with the lock held.
+    def _prune_disk(self):
+        files = sorted(self._disk_files(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for path, size, _ in files:
+            if total <= self.disk_max_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not remove cached chart {path}: {e}")
+                continue
+            total -= size
+            removed += 1
+        self._disk_bytes = total
+        if removed:
+            logger.info(f"Removed {removed} least recently used chart(s) from {self.disk_dir}.")
+
+
+# Process-wide cache of rendered topic charts
+CHART_CACHE = ChartCache()
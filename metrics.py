@@ -0,0 +1,246 @@
+import bisect
+import functools
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Instrumentation is off unless METRICS_ENABLED=1; disabled spans cost one attribute check
+DEFAULT_METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "0") == "1"
+# Local endpoint (http://127.0.0.1:<port>/metrics) and/or file the Prometheus text is exported to
+DEFAULT_METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))
+DEFAULT_METRICS_FILE = os.environ.get("METRICS_FILE", "")
+DEFAULT_METRICS_FILE_INTERVAL = float(os.environ.get("METRICS_FILE_INTERVAL", "15"))
+METRIC_PREFIX = "strategy_tool_"
+# Histogram bucket upper bounds in seconds, from cached lookups to cold Sheets calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Span:
+    __slots__ = ("registry", "name", "labels", "start")
+
+    def __init__(self, registry: "MetricsRegistry", name: str, labels: Labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name, time.perf_counter() - self.start, self.labels)
+        # Streamlit's rerun/stop signals are BaseExceptions and not failures
+        if exc_type is not None and issubclass(exc_type, Exception):
+            self.registry.inc(f"{self.name}_failures_total", 1, self.labels)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NO_SPAN = _NoSpan()
+
+
+# Process-wide histograms, counters and gauges in Prometheus text format.
+#
+# Code paths are timed with span(name, **labels) blocks or the @timed(name, **labels) decorator;
+# both record into the histogram `name` (seconds) and count exceptions in `<name>_failures_total`.
+# Values owned by other modules (cache hit counters, session footprints) are not pushed: collectors
+# registered with register_collector() are asked for them when the metrics are exported.
+class MetricsRegistry:
+    def __init__(self, enabled: bool = DEFAULT_METRICS_ENABLED, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, dict, float]]]] = []
+
+    def span(self, name: str, **labels):
+        if not self.enabled:
+            return NO_SPAN
+        return _Span(self, name, tuple(sorted(labels.items())))
+
+    def timed(self, name: str, **labels):
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with self.span(name, **labels):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def observe(self, name: str, value: float, labels: Labels = ()):
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(labels)
+            if histogram is None:
+                histogram = series[labels] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1, labels: Labels = ()):
+        if not self.enabled:
+            return
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0) + amount
+
+    # `collector()` yields (name, type, labels, value) samples, type being "counter" or "gauge"
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, str, dict, float]]]):
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {METRIC_PREFIX}{name} histogram")
+                for labels, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(self.buckets + (float("inf"),), histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{METRIC_PREFIX}{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                    lines.append(f"{METRIC_PREFIX}{name}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+                    lines.append(f"{METRIC_PREFIX}{name}_count{_format_labels(labels)} {histogram.count}")
+            samples = {name: ("counter", dict(series)) for name, series in self._counters.items()}
+            collectors = list(self._collectors)
+
+        for collector in collectors:
+            try:
+                for name, kind, labels, value in collector():
+                    samples.setdefault(name, (kind, {}))[1][tuple(sorted(labels.items()))] = value
+            except Exception as e:
+                logger.error(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+        for name, (kind, series) in sorted(samples.items()):
+            lines.append(f"# TYPE {METRIC_PREFIX}{name} {kind}")
+            for labels, value in sorted(series.items()):
+                lines.append(f"{METRIC_PREFIX}{name}{_format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as file:
+            file.write(self.render())
+        os.replace(temp_path, path)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+# Samples for a cache exposing stats() with hits/disk_hits/misses (ChartCache, ReportCache)
+def cache_collector(cache_name: str, cache) -> Callable[[], List[Tuple[str, str, dict, float]]]:
+    def collect():
+        stats = cache.stats()
+        labels = {"cache": cache_name}
+        return [
+            ("cache_lookups_total", "counter", {**labels, "result": "hit"}, stats["hits"]),
+            ("cache_lookups_total", "counter", {**labels, "result": "disk_hit"}, stats["disk_hits"]),
+            ("cache_lookups_total", "counter", {**labels, "result": "miss"}, stats["misses"]),
+            ("cache_hit_ratio", "gauge", labels, stats["hit_rate"]),
+        ]
+    collect.__name__ = f"cache_collector_{cache_name}"
+    return collect
+
+
+# Serve the registry at http://127.0.0.1:<port>/metrics from a daemon thread
+def start_http_exporter(registry: "MetricsRegistry", port: int):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info(f"Serving metrics on http://127.0.0.1:{server.server_address[1]}/metrics.")
+    return server
+
+
+# Rewrite the metrics file every `interval` seconds from a daemon thread
+def start_file_exporter(registry: "MetricsRegistry", path: str,
+                        interval: float = DEFAULT_METRICS_FILE_INTERVAL) -> threading.Thread:
+    def run():
+        while True:
+            try:
+                registry.write_file(path)
+            except OSError as e:
+                logger.error(f"Writing metrics to {path} failed: {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name="metrics-file", daemon=True)
+    thread.start()
+    logger.info(f"Writing metrics to {path} every {interval:.0f}s.")
+    return thread
+
+
+# Start the exporters configured through METRICS_PORT / METRICS_FILE (when metrics are enabled)
+def start_exporters(registry: Optional["MetricsRegistry"] = None, port: int = DEFAULT_METRICS_PORT,
+                    path: str = DEFAULT_METRICS_FILE):
+    registry = registry or METRICS
+    if not registry.enabled:
+        return
+    if port:
+        start_http_exporter(registry, port)
+    if path:
+        start_file_exporter(registry, path)
+
+
+METRICS = MetricsRegistry()
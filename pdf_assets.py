@@ -0,0 +1,102 @@
+import copy
+import hashlib
+import io
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from PIL import Image
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfdoc
+
+# Resolution images are resampled to for the size they are drawn at on the page
+DEFAULT_DPI = 150
+JPEG_QUALITY = 85
+
+
+# A decoded, resampled and PDF-encoded image, ready to be referenced by any number of reports.
+# The image XObject (and its soft mask for transparent images) is built once; drawing it only
+# registers a shallow copy with the target document, so no decode or compression happens per report.
+class ImageAsset:
+    __slots__ = ("name", "pixel_size", "xobject", "smask")
+
+    def __init__(self, name: str, pixel_size: Tuple[int, int], xobject, smask=None):
+        self.name = name
+        self.pixel_size = pixel_size
+        self.xobject = xobject
+        self.smask = smask
+
+
+_assets: Dict[tuple, ImageAsset] = {}
+_assets_lock = threading.Lock()
+
+
+def _build_asset(path: str, width: float, height: float, dpi: int) -> ImageAsset:
+    name = hashlib.md5(f"{os.path.abspath(path)}|{width:.2f}x{height:.2f}@{dpi}".encode("utf-8")).hexdigest()
+    target_size = (max(1, round(width / 72 * dpi)), max(1, round(height / 72 * dpi)))
+
+    with Image.open(path) as source:
+        has_alpha = source.mode in ("RGBA", "LA") or (source.mode == "P" and "transparency" in source.info)
+        image = source.convert("RGBA" if has_alpha else "RGB")
+    # Only ever downsample; the box on the page is filled the same way drawImage would stretch it
+    if image.size[0] > target_size[0] or image.size[1] > target_size[1]:
+        image = image.resize(target_size, Image.LANCZOS)
+
+    if has_alpha:
+        xobject = pdfdoc.PDFImageXObject(name, ImageReader(image), mask="auto")
+    else:
+        # Opaque images are stored as JPEG, which ReportLab embeds as-is (DCTDecode)
+        encoded = io.BytesIO()
+        image.save(encoded, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+        encoded.seek(0)
+        xobject = pdfdoc.PDFImageXObject(name, ImageReader(encoded))
+    smask = getattr(xobject, "_smask", None)
+    if smask is not None:
+        del xobject._smask
+    return ImageAsset(name, image.size, xobject, smask)
+
+
+# Return the cached asset for an image drawn at width x height points, building it on first use
+def get_image_asset(path: str, width: float, height: float, dpi: int = DEFAULT_DPI) -> ImageAsset:
+    key = (os.path.abspath(path), os.path.getmtime(path), round(width, 2), round(height, 2), dpi)
+    asset = _assets.get(key)
+    if asset is None:
+        with _assets_lock:
+            asset = _assets.get(key)
+            if asset is None:
+                asset = _build_asset(path, width, height, dpi)
+                _assets[key] = asset
+    return asset
+
+
+# Equivalent of canvas.drawImage(..., mask='auto') for a pre-encoded asset
+def draw_image_asset(c, asset: ImageAsset, x: float, y: float, width: float, height: float):
+    doc = c._doc
+    reg_name = doc.getXObjectName(asset.name)
+    if doc.idToObject.get(reg_name) is None:
+        xobject = copy.copy(asset.xobject)
+        c._setXObjects(xobject)
+        doc.Reference(xobject, reg_name)
+        doc.addForm(asset.name, xobject)
+        if asset.smask is not None:
+            smask = copy.copy(asset.smask)
+            mask_reg_name = doc.getXObjectName(smask.name)
+            if doc.idToObject.get(mask_reg_name) is None:
+                c._setXObjects(smask)
+                xobject.smask = doc.Reference(smask, mask_reg_name)
+            else:
+                xobject.smask = pdfdoc.PDFObjectReference(mask_reg_name)
+
+    c._currentPageHasImages = 1
+    c.saveState()
+    c.translate(x, y)
+    c.scale(width, height)
+    c._code.append(f"/{reg_name} Do")
+    c.restoreState()
+    c._formsinuse.append(asset.name)
+
+
+# Draw an image file through the asset cache; drop-in for c.drawImage(path, x, y, width=, height=, mask='auto')
+def draw_cached_image(c, path: str, x: float, y: float, width: float, height: float, dpi: Optional[int] = None):
+    asset = get_image_asset(path, width, height, dpi or DEFAULT_DPI)
+    draw_image_asset(c, asset, x, y, width, height)
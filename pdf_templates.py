@@ -0,0 +1,89 @@
+import os
+from typing import Callable
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import landscape, A4
+
+from pdf_assets import draw_cached_image
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKGROUND_IMAGE_PATH = os.path.join(BASE_DIR, "Background_Tool.png")
+LOGO_PATH = os.path.join(BASE_DIR, "efeso_logo.png")
+
+PAGE_SIZE = landscape(A4)
+
+# Shared layout measurements of the report pages
+BACKGROUND_HEIGHT_RATIO = 0.4
+LOGO_WIDTH = 157.5
+LOGO_HEIGHT = 60
+LOGO_MARGIN_RIGHT = 30
+LOGO_MARGIN_TOP = 20
+MARGIN_LEFT = 30
+
+
+# Static page content defined once per document as a PDF form XObject.
+#
+# The first apply() on a canvas records the drawing operations into a named form; every
+# later page only references it with a single "Do" operator, so the chrome is stored once
+# per report no matter how many pages use it.
+class PageTemplate:
+    def __init__(self, name: str, draw: Callable):
+        self.name = name
+        self.draw = draw
+
+    def apply(self, c):
+        if not c.hasForm(self.name):
+            width, height = c._pagesize
+            c.beginForm(self.name)
+            self.draw(c, width, height)
+            c.endForm()
+        c.doForm(self.name)
+
+
+def cover_logo_y(height: float, gap: float) -> float:
+    return height - height * BACKGROUND_HEIGHT_RATIO - LOGO_HEIGHT - gap
+
+
+def _draw_banner(c, width: float, height: float, logo_gap: float):
+    # Background image across the top of the page, logo right-aligned below it
+    background_height = height * BACKGROUND_HEIGHT_RATIO
+    draw_cached_image(c, BACKGROUND_IMAGE_PATH, 0, height - background_height, width=width, height=background_height)
+    draw_cached_image(c, LOGO_PATH, width - LOGO_WIDTH - LOGO_MARGIN_RIGHT, cover_logo_y(height, logo_gap),
+                      width=LOGO_WIDTH, height=LOGO_HEIGHT)
+
+
+# Cover page of the maturity assessment reports: banner, logo and report title
+def assessment_cover_template(name: str, title: str) -> PageTemplate:
+    def draw(c, width, height):
+        _draw_banner(c, width, height, logo_gap=30)
+        c.setFont("Helvetica-Bold", 24)
+        c.setFillColor(colors.black)
+        c.drawString(MARGIN_LEFT, cover_logo_y(height, 30) - 40, title)
+
+    return PageTemplate(name, draw)
+
+
+# Header of the Strategy Tool report: banner, logo and heading
+def strategy_cover_template() -> PageTemplate:
+    def draw(c, width, height):
+        _draw_banner(c, width, height, logo_gap=10)
+        c.setFont("Helvetica-Bold", 16)
+        c.setFillColor(colors.black)
+        c.drawString(MARGIN_LEFT, cover_logo_y(height, 10) - 30, "Tailored AI Strategy Report")
+
+    return PageTemplate("StrategyCover", draw)
+
+
+# Frame shared by every topic page: the logo in the top-right corner
+def _draw_topic_frame(c, width, height):
+    draw_cached_image(c, LOGO_PATH, width - LOGO_WIDTH - LOGO_MARGIN_RIGHT, height - LOGO_HEIGHT - LOGO_MARGIN_TOP,
+                      width=LOGO_WIDTH, height=LOGO_HEIGHT)
+
+
+TOPIC_FRAME = PageTemplate("TopicFrame", _draw_topic_frame)
+ERP_COVER = assessment_cover_template("ErpCover", "ERP Maturity Assessment Report")
+RND_COVER = assessment_cover_template("RndCover", "R&D Maturity Assessment Report")
+STRATEGY_COVER = strategy_cover_template()
+
+# Cover of each assessment report by questionnaire id
+ASSESSMENT_COVERS = {"erp": ERP_COVER, "rnd": RND_COVER}
@@ -0,0 +1,166 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from types import MappingProxyType
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+QUESTIONNAIRE_DIR = os.environ.get("QUESTIONNAIRE_DIR", BASE_DIR)
+QUESTIONNAIRE_PATTERN = "maturity_questions*.json"
+
+# Ids of the questionnaires that predate the naming convention; any other
+# maturity_questions_<Name>.json file is registered as "<name>"
+KNOWN_IDS = {
+    "maturity_questions.json": "erp",
+    "maturity_questions_RnD.json": "rnd",
+}
+
+# How often (seconds) a questionnaire file is checked for changes
+RELOAD_CHECK_INTERVAL = 1.0
+
+
+class Question:
+    __slots__ = ("id", "text", "number", "topic_name")
+
+    def __init__(self, question_id: str, text: str, number: str, topic_name: str):
+        self.id = question_id
+        self.text = text
+        self.number = number
+        self.topic_name = topic_name
+
+
+class Topic:
+    __slots__ = ("name", "abbreviation", "position", "questions")
+
+    def __init__(self, name: str, abbreviation: str, position: int, questions: Tuple[Question, ...]):
+        self.name = name
+        self.abbreviation = abbreviation
+        self.position = position
+        self.questions = questions
+
+
+# Immutable, indexed form of a questionnaire JSON file: topics in file order plus lookups of
+# topics by name, questions by id and scale labels by level
+class Questionnaire:
+    __slots__ = ("id", "path", "mtime", "topics", "topics_by_name", "questions_by_id", "scale")
+
+    def __init__(self, questionnaire_id: str, path: str, mtime: float, data: dict):
+        topics = []
+        for position, topic in enumerate(data['topics']):
+            questions = tuple(
+                Question(question['id'], question['question'], f"Q{i + 1}", topic['name'])
+                for i, question in enumerate(topic['questions'])
+            )
+            topics.append(Topic(topic['name'], topic.get('abbreviation', topic['name']), position, questions))
+
+        self.id = questionnaire_id
+        self.path = path
+        self.mtime = mtime
+        self.topics: Tuple[Topic, ...] = tuple(topics)
+        self.topics_by_name = MappingProxyType({topic.name: topic for topic in self.topics})
+        self.questions_by_id = MappingProxyType(
+            {question.id: question for topic in self.topics for question in topic.questions}
+        )
+        self.scale = MappingProxyType({int(level): label for level, label in data['scale'].items()})
+
+    def topic(self, name: str) -> Optional[Topic]:
+        return self.topics_by_name.get(name)
+
+    def question(self, question_id: str) -> Optional[Question]:
+        return self.questions_by_id.get(question_id)
+
+    def scale_label(self, level: int) -> str:
+        return self.scale[int(level)]
+
+    @property
+    def topic_names(self) -> List[str]:
+        return [topic.name for topic in self.topics]
+
+
+def questionnaire_id_for(path: str) -> str:
+    filename = os.path.basename(path)
+    if filename in KNOWN_IDS:
+        return KNOWN_IDS[filename]
+    stem = os.path.splitext(filename)[0]
+    return stem[len("maturity_questions_"):].lower() if stem.startswith("maturity_questions_") else stem.lower()
+
+
+def compile_questionnaire(path: str) -> Questionnaire:
+    mtime = os.path.getmtime(path)
+    with open(path, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+    return Questionnaire(questionnaire_id_for(path), path, mtime, data)
+
+
+# Discovers the questionnaire files and keeps their compiled models.
+#
+# A file is recompiled when its modification time changes (checked at most every
+# RELOAD_CHECK_INTERVAL seconds), so content editors can update questions on a running
+# server. A file that fails to parse is logged and the last good version keeps being served.
+class QuestionnaireRegistry:
+    def __init__(self, directory: str = QUESTIONNAIRE_DIR, pattern: str = QUESTIONNAIRE_PATTERN,
+                 check_interval: float = RELOAD_CHECK_INTERVAL):
+        self.directory = directory
+        self.pattern = pattern
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._questionnaires: Dict[str, Questionnaire] = {}
+        # Modification times of files that failed to parse, so they are not re-read every check
+        self._failed: Dict[str, float] = {}
+        self._last_check = 0.0
+        self.reloads = 0
+
+    def get(self, questionnaire_id: str) -> Questionnaire:
+        self._refresh()
+        try:
+            return self._questionnaires[questionnaire_id]
+        except KeyError:
+            raise KeyError(f"No questionnaire '{questionnaire_id}' in {self.directory}") from None
+
+    def ids(self) -> List[str]:
+        self._refresh()
+        return sorted(self._questionnaires)
+
+    def all(self) -> List[Questionnaire]:
+        self._refresh()
+        return [self._questionnaires[questionnaire_id] for questionnaire_id in sorted(self._questionnaires)]
+
+    def _refresh(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_check < self.check_interval:
+            return
+        with self._lock:
+            if not force and now - self._last_check < self.check_interval:
+                return
+            questionnaires = dict(self._questionnaires)
+            paths = sorted(glob.glob(os.path.join(self.directory, self.pattern)))
+            seen = set()
+            for path in paths:
+                questionnaire_id = questionnaire_id_for(path)
+                seen.add(questionnaire_id)
+                current = questionnaires.get(questionnaire_id)
+                mtime = None
+                try:
+                    mtime = os.path.getmtime(path)
+                    if (current is not None and current.mtime == mtime) or self._failed.get(path) == mtime:
+                        continue
+                    questionnaires[questionnaire_id] = compile_questionnaire(path)
+                    self._failed.pop(path, None)
+                    if current is not None:
+                        self.reloads += 1
+                        logger.info(f"Reloaded questionnaire '{questionnaire_id}' from {path}.")
+                except (OSError, ValueError, KeyError, TypeError) as e:
+                    self._failed[path] = mtime
+                    logger.error(f"Could not load questionnaire {path}, keeping the previous version: {e}")
+            for questionnaire_id in set(questionnaires) - seen:
+                del questionnaires[questionnaire_id]
+            self._questionnaires = questionnaires
+            self._last_check = now
+
+
+QUESTIONNAIRES = QuestionnaireRegistry()
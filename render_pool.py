@@ -0,0 +1,131 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+RENDER_BACKENDS = ("inline", "process")
+# "inline" renders in the calling thread; "process" sends report jobs to a pool of worker processes
+DEFAULT_RENDER_BACKEND = os.environ.get("REPORT_RENDER_BACKEND", "inline")
+DEFAULT_RENDER_WORKERS = int(os.environ.get("REPORT_RENDER_WORKERS", "0")) or os.cpu_count() or 1
+# Seconds a render may take in a worker process; below REPORT_JOB_TIMEOUT (120), so a hung worker
+# fails the report job's thread instead of blocking it forever
+DEFAULT_RENDER_TIMEOUT = float(os.environ.get("REPORT_RENDER_TIMEOUT", "90"))
+# Y-axis range of report jobs that do not carry one (the batch generator's jobs)
+DEFAULT_Y_AXIS_RANGE = (0, 5)
+
+
+# Render a report job (see report_cache.strategy_report_job / assessment_report_job) to PDF bytes.
+# Jobs are plain dicts, so the same function runs in this process or in a worker process.
+def render_report(job: dict) -> bytes:
+    if job["kind"] == "strategy":
+        from report_pdf import render_strategy_pdf
+
+        return render_strategy_pdf(*job["selection"]).getvalue()
+
+    from pdf_templates import ASSESSMENT_COVERS
+    from questionnaires import QUESTIONNAIRES
+    from report_pdf import render_assessment_pdf
+
+    return render_assessment_pdf(QUESTIONNAIRES.get(job["kind"]), ASSESSMENT_COVERS[job["kind"]],
+                                 job["responses"], job["user_info"], job["completed_topics"],
+                                 tuple(job.get("y_axis_range", DEFAULT_Y_AXIS_RANGE)),
+                                 benchmarks=job.get("benchmarks")).getvalue()
+
+
+# Load the PDF stack and build the per-process caches (fonts, decoded cover and logo images,
+# compiled questionnaires) by rendering one small report of each kind
+def warm_up():
+    from questionnaires import QUESTIONNAIRES
+
+    start = time.perf_counter()
+    for questionnaire in QUESTIONNAIRES.all():
+        topic = questionnaire.topics[0]
+        render_report({
+            "kind": questionnaire.id,
+            "responses": {question.id: 1 for question in topic.questions},
+            "user_info": {},
+            "completed_topics": [topic.name],
+        })
+    render_report({"kind": "strategy", "selection": ["", "", "", "", [], []]})
+    logger.info(f"Render worker {os.getpid()} warmed up in {(time.perf_counter() - start) * 1000:.0f} ms.")
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+# Persistent pool of pre-warmed worker processes for report rendering.
+#
+# ReportLab and matplotlib work is pure Python CPU time, so renders from concurrent sessions
+# serialize on the GIL of the server process; in worker processes they run on separate cores.
+# Workers are started with "spawn" (forking a threaded server is unsafe) and warm themselves up
+# once, so no request pays for imports or image decoding. A worker that dies (out of memory, a
+# crash) breaks a ProcessPoolExecutor for good, so the pool is then rebuilt and the job retried once.
+class RenderPool:
+    def __init__(self, workers: int = DEFAULT_RENDER_WORKERS, backend: str = DEFAULT_RENDER_BACKEND):
+        if backend not in RENDER_BACKENDS:
+            raise ValueError(f"Unknown render backend '{backend}', expected one of {', '.join(RENDER_BACKENDS)}.")
+        self.workers = workers
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def start(self) -> "RenderPool":
+        if self.backend == "inline":
+            return self
+        with self._lock:
+            if self._executor is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=warm_up,
+                )
+                atexit.register(self.shutdown)
+                # Start every worker now instead of on the first reports
+                for future in [self._executor.submit(_ping) for _ in range(self.workers)]:
+                    future.result()
+        return self
+
+    # Raises TimeoutError when the worker took longer than `timeout` seconds (both attempts together)
+    def render(self, job: dict, timeout: Optional[float] = DEFAULT_RENDER_TIMEOUT) -> bytes:
+        from concurrent.futures.process import BrokenProcessPool
+
+        with METRICS.span("stage_seconds", stage="report_render", backend=self.backend):
+            if self.backend == "inline":
+                return render_report(job)
+            deadline = None if timeout is None else time.monotonic() + timeout
+            for attempt in range(2):
+                executor = self.start()._executor
+                try:
+                    future = executor.submit(render_report, job)
+                    return future.result(timeout=None if deadline is None else max(deadline - time.monotonic(), 0))
+                except BrokenProcessPool:
+                    self._discard(executor)
+                    if attempt:
+                        raise
+                    logger.warning("A render worker died; restarting the render pool and retrying the report.")
+
+    # Drop a broken executor; the next start() builds a new one (unless another thread already did)
+    def _discard(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+
+RENDER_POOL = RenderPool()
@@ -0,0 +1,239 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from render_pool import RENDER_POOL
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = int(os.environ.get("REPORT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+DEFAULT_DISK_DIR = os.environ.get("REPORT_CACHE_DIR", os.path.join("local_data", "report_cache"))
+DEFAULT_ASSESSMENT_MAX_BYTES = int(os.environ.get("ASSESSMENT_REPORT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Bump when a report layout changes so cached PDFs are not served for the old layout
+STRATEGY_REPORT_LAYOUT_VERSION = 1
+ASSESSMENT_REPORT_LAYOUT_VERSION = 2
+
+
+# Content-addressed store of finished report PDFs.
+#
+# Keys are hashes of everything a report depends on, so an entry never goes stale; a new
+# catalog or layout simply produces new keys. The memory tier is an LRU bounded by the total
+# size of the stored PDFs, backed by a directory of <key>.pdf files that survives restarts.
+class ReportCache:
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, disk_dir: Optional[str] = DEFAULT_DISK_DIR):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+        data = self._read_disk(key)
+        if data is not None:
+            with self._lock:
+                self.disk_hits += 1
+            self._remember(key, data)
+        return data
+
+    def put(self, key: str, data: bytes):
+        self._write_disk(key, data)
+        self._remember(key, data)
+
+    def get_or_render(self, key: str, render: Callable[[], bytes]) -> bytes:
+        data = self.get(key)
+        if data is None:
+            data = render()
+            with self._lock:
+                self.misses += 1
+            self.put(key, data)
+        return data
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            if key in self._entries:
+                return True
+        return bool(self.disk_dir) and os.path.exists(self._disk_path(key))
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def _remember(self, key: str, data: bytes):
+        # Reports larger than the whole memory budget are only kept on disk
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= len(previous)
+            self._entries[key] = data
+            self.current_bytes += len(data)
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+                self.evictions += 1
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.pdf")
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "rb") as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Could not read cached report {key}: {e}")
+            return None
+
+    def _write_disk(self, key: str, data: bytes):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as file:
+                file.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write cached report {key}: {e}")
+
+
+def content_key(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+# Stable fingerprint of the Strategy Tool catalog (dynamic_logic_with_use_cases.json)
+def catalog_version(catalog: dict) -> str:
+    return content_key(catalog)[:16]
+
+
+def strategy_report_key(catalog_version: str, goal, method, tool, kpi, use_cases, partners) -> str:
+    return content_key("strategy", STRATEGY_REPORT_LAYOUT_VERSION, catalog_version,
+                       goal, method, tool, kpi, list(use_cases), list(partners))
+
+
+# Every goal/method/tool/KPI combination the Strategy Tool can submit, with its use cases and partners
+def iter_strategy_selections(catalog: dict) -> Iterator[Tuple]:
+    for goal, goal_data in catalog.items():
+        for method in goal_data['methods']:
+            tools_data = goal_data['tools'].get(method)
+            if tools_data is None:
+                continue
+            for tool in tools_data['tools']:
+                for kpi in goal_data['kpis']:
+                    yield goal, method, tool, kpi, tools_data['use_cases'], tools_data['partners']
+
+
+STRATEGY_REPORT_CACHE = ReportCache()
+
+
+# Strategy Tool PDF for a selection, served from the cache when it was rendered before
+def cached_strategy_pdf(catalog_version: str, goal, method, tool, kpi, use_cases, partners,
+                        cache: ReportCache = STRATEGY_REPORT_CACHE) -> bytes:
+    job = strategy_report_job(catalog_version, goal, method, tool, kpi, use_cases, partners)
+    return cache.get_or_render(job["key"], lambda: RENDER_POOL.render(job))
+
+
+# Render every valid Strategy Tool selection that is not cached yet
+def prewarm_strategy_reports(catalog: dict, cache: ReportCache = STRATEGY_REPORT_CACHE) -> Tuple[int, int]:
+    version = catalog_version(catalog)
+    rendered = skipped = 0
+    for selection in iter_strategy_selections(catalog):
+        if strategy_report_key(version, *selection) in cache:
+            skipped += 1
+            continue
+        cached_strategy_pdf(version, *selection, cache=cache)
+        rendered += 1
+    return rendered, skipped
+
+
+# Assessment reports carry the respondent's contact details, so they are only cached in memory
+ASSESSMENT_REPORT_CACHE = ReportCache(DEFAULT_ASSESSMENT_MAX_BYTES, disk_dir=None)
+
+
+# Report jobs are what a session keeps instead of the PDF: the compact inputs of the report and
+# its content key. The bytes are produced from the job when the download is requested.
+def strategy_report_job(catalog_version: str, goal, method, tool, kpi, use_cases, partners) -> dict:
+    return {
+        "kind": "strategy",
+        "key": strategy_report_key(catalog_version, goal, method, tool, kpi, use_cases, partners),
+        "catalog_version": catalog_version,
+        "selection": [goal, method, tool, kpi, list(use_cases), list(partners)],
+    }
+
+
+def assessment_report_job(questionnaire, responses: dict, user_info: dict, completed_topics,
+                          y_axis_range: Tuple[int, int], benchmarks: Optional[dict] = None) -> dict:
+    # Topics in questionnaire order, so the key does not depend on the order they were completed in
+    completed_topics = [name for name in questionnaire.topic_names if name in set(completed_topics)]
+    job = {
+        "kind": questionnaire.id,
+        "responses": dict(responses),
+        "user_info": dict(user_info),
+        "completed_topics": completed_topics,
+        "y_axis_range": list(y_axis_range),
+        # Peer statistics per question (response_aggregates) as they were when the report was requested
+        "benchmarks": dict(benchmarks or {}),
+    }
+    job["key"] = content_key("assessment", ASSESSMENT_REPORT_LAYOUT_VERSION, questionnaire.mtime, job)
+    return job
+
+
+# PDF bytes of a report job, rendered on first request and served from the shared caches afterwards
+def cached_report_pdf(job: dict) -> bytes:
+    if job["kind"] == "strategy":
+        return cached_strategy_pdf(job["catalog_version"], *job["selection"])
+    return ASSESSMENT_REPORT_CACHE.get_or_render(job["key"], lambda: RENDER_POOL.render(job))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Strategy Tool report cache")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    prewarm = subcommands.add_parser("prewarm", help="render every goal/method/tool/KPI combination ahead of time")
+    prewarm.add_argument("--catalog", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                           "dynamic_logic_with_use_cases.json"))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with open(args.catalog, 'r') as file:
+        catalog = json.load(file)
+    start = time.perf_counter()
+    rendered, skipped = prewarm_strategy_reports(catalog)
+    elapsed = time.perf_counter() - start
+    logger.info(f"Rendered {rendered} Strategy report(s), {skipped} already cached, in {elapsed:.1f}s "
+                f"(catalog {catalog_version(catalog)}, cache dir {STRATEGY_REPORT_CACHE.disk_dir}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import io
+import os
+import re
+from typing import List, Optional, Sequence, Tuple
+
+from reportlab.graphics import renderPDF
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.shapes import Drawing, Group, String
+from reportlab.lib import colors
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from chart_cache import CHART_CACHE, ChartCache, RenderedChart, chart_digest
+from metrics import METRICS
+
+CHART_BACKENDS = ("vector", "matplotlib")
+# Backend used when a report does not ask for one explicitly
+DEFAULT_CHART_BACKEND = os.environ.get("REPORT_CHART_BACKEND", "vector")
+
+BAR_COLOR = '#E96C25'
+# The charts were designed as a 4x4 inch matplotlib figure; text sizes scale from it
+FIGURE_SIZE = 4 * 72
+FONT_SIZE = 10
+# Bump when the chart drawing changes so cached charts (in memory and in CHART_CACHE_DIR) are not reused
+CHART_LAYOUT_VERSION = 1
+
+# Font selection operator in a PDF content stream, e.g. "/F1 10 Tf"
+FONT_OPERATOR = re.compile(r"/F\d+(?= [\d.]+ Tf)")
+
+
+def _check_backend(backend: Optional[str]) -> str:
+    backend = backend or DEFAULT_CHART_BACKEND
+    if backend not in CHART_BACKENDS:
+        raise ValueError(f"Unknown chart backend '{backend}', expected one of {', '.join(CHART_BACKENDS)}.")
+    return backend
+
+
+# Vector version of the topic maturity chart, laid out like the matplotlib figure
+# (axes at 20-80% of the width and 30-80% of the height, title above the axes)
+def build_topic_chart(topic_name: str, question_numbers: Sequence[str], maturity_levels: Sequence[int],
+                      y_axis_range: Tuple[int, int], size: float) -> Drawing:
+    scale = size / FIGURE_SIZE
+    font_size = FONT_SIZE * scale
+    drawing = Drawing(size, size)
+
+    chart = VerticalBarChart()
+    chart.x = size * 0.2
+    chart.y = size * 0.3
+    chart.width = size * 0.6
+    chart.height = size * 0.5
+    chart.data = [list(maturity_levels)]
+    chart.bars[0].fillColor = colors.HexColor(BAR_COLOR)
+    chart.bars[0].strokeColor = None
+    chart.barSpacing = 0
+    chart.groupSpacing = size * 0.02
+    chart.categoryAxis.categoryNames = list(question_numbers)
+    chart.categoryAxis.labels.fontName = "Helvetica"
+    chart.categoryAxis.labels.fontSize = font_size
+    chart.categoryAxis.labels.dy = -2 * scale
+    chart.valueAxis.valueMin = y_axis_range[0]
+    chart.valueAxis.valueMax = y_axis_range[1]
+    chart.valueAxis.valueStep = 1
+    chart.valueAxis.labels.fontName = "Helvetica"
+    chart.valueAxis.labels.fontSize = font_size
+    chart.valueAxis.tickLeft = 3 * scale
+    chart.valueAxis.labels.dx = -5 * scale
+    drawing.add(chart)
+
+    drawing.add(String(size * 0.5, size * 0.8 + 20 * scale, f"User Session Data - {topic_name}",
+                       fontName="Helvetica", fontSize=font_size, textAnchor="middle"))
+    drawing.add(String(size * 0.5, size * 0.3 - 28 * scale, "Question Number",
+                       fontName="Helvetica", fontSize=font_size, textAnchor="middle"))
+    # Y-axis label, rotated 90 degrees around its anchor left of the axis
+    y_label = Group(String(0, 0, "Maturity Level", fontName="Helvetica", fontSize=font_size, textAnchor="middle"))
+    y_label.transform = (0, 1, -1, 0, size * 0.2 - 24 * scale, size * 0.55)
+    drawing.add(y_label)
+    return drawing
+
+
+# PNG of the topic chart rendered with matplotlib's object API (no pyplot state, no temp files)
+def render_topic_chart_png(topic_name: str, question_numbers: Sequence[str], maturity_levels: Sequence[int],
+                           y_axis_range: Tuple[int, int]) -> bytes:
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=(4, 4))
+    FigureCanvasAgg(figure)
+    figure.subplots_adjust(left=0.2, right=0.8, bottom=0.3, top=0.8)
+    axes = figure.add_subplot()
+    axes.set_yticks(range(y_axis_range[0], y_axis_range[1] + 1))
+    axes.bar(question_numbers, maturity_levels, color=BAR_COLOR)
+    axes.set_xlabel("Question Number")
+    axes.set_ylabel("Maturity Level")
+    axes.set_title(f"User Session Data - {topic_name}", fontsize=10, pad=20)
+    png = io.BytesIO()
+    with METRICS.span("stage_seconds", stage="chart_savefig"):
+        figure.savefig(png, format='PNG')
+    return png.getvalue()
+
+
+# Render the vector chart once into PDF operators that can be replayed in any report
+def _render_vector_chart(digest: str, topic_name, question_numbers, maturity_levels, y_axis_range,
+                         size: float) -> RenderedChart:
+    drawing = build_topic_chart(topic_name, question_numbers, maturity_levels, y_axis_range, size)
+    scratch = canvas.Canvas(io.BytesIO(), pagesize=(size, size))
+    start = len(scratch._code)
+    renderPDF.draw(drawing, scratch, 0, 0)
+    operators = "\n".join(scratch._code[start:])
+    return RenderedChart("vector", digest, size, operators, dict(scratch._doc.fontMapping))
+
+
+def _render_matplotlib_chart(digest: str, topic_name, question_numbers, maturity_levels, y_axis_range,
+                             size: float) -> RenderedChart:
+    png = render_topic_chart_png(topic_name, question_numbers, maturity_levels, y_axis_range)
+    return RenderedChart("matplotlib", digest, size, png)
+
+
+# Chart operators with their font references renamed to this document's internal font names
+def _document_operators(c, chart: RenderedChart) -> str:
+    mapping = {internal: c._doc.getInternalFontName(font) for font, internal in chart.fonts.items()}
+    if all(internal == target for internal, target in mapping.items()):
+        return chart.data
+    return FONT_OPERATOR.sub(lambda match: mapping.get(match.group(0), match.group(0)), chart.data)
+
+
+# Place a rendered chart centred in the box
+def _draw_rendered_chart(c, chart: RenderedChart, x: float, y: float, width: float, height: float):
+    if chart.backend == "matplotlib":
+        c.drawImage(ImageReader(io.BytesIO(chart.data)), x, y, width=width, height=height,
+                    preserveAspectRatio=True, mask='auto')
+        return
+
+    # Each distinct chart becomes one form per document, so repeated answer vectors are stored once
+    form_name = f"Chart{chart.digest}"
+    if not c.hasForm(form_name):
+        # Long titles may run past the square chart, so the form is not clipped horizontally
+        c.beginForm(form_name, -chart.size, 0, 2 * chart.size, chart.size)
+        c._code.append(_document_operators(c, chart))
+        c.endForm()
+    c.saveState()
+    c.translate(x + (width - chart.size) / 2, y + (height - chart.size) / 2)
+    c.doForm(form_name)
+    c.restoreState()
+
+
+# Draw a topic's maturity chart into the box (x, y, width, height), centred and kept square.
+# Rendered charts are memoized in `cache` by layout version, questionnaire, topic, question labels,
+# answers and axis range.
+def draw_topic_chart(c, topic_name: str, question_numbers: List[str], maturity_levels: List[int],
+                     y_axis_range: Tuple[int, int], x: float, y: float, width: float, height: float,
+                     backend: Optional[str] = None, questionnaire_id: str = "",
+                     cache: Optional[ChartCache] = CHART_CACHE):
+    backend = _check_backend(backend)
+    size = min(width, height)
+    render = _render_matplotlib_chart if backend == "matplotlib" else _render_vector_chart
+    chart_args = (topic_name, question_numbers, maturity_levels, y_axis_range, size)
+
+    key = (CHART_LAYOUT_VERSION, questionnaire_id, topic_name, tuple(question_numbers), tuple(maturity_levels),
+           tuple(y_axis_range), backend, round(size, 2))
+    if cache is None:
+        chart = render(chart_digest(key), *chart_args)
+    else:
+        chart = cache.get_or_render(key, lambda digest: render(digest, *chart_args))
+
+    _draw_rendered_chart(c, chart, x, y, width, height)
@@ -0,0 +1,120 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = int(os.environ.get("REPORT_WORKERS", "4"))
+# Seconds after which a job that has not finished is reported as failed
+DEFAULT_JOB_TIMEOUT = float(os.environ.get("REPORT_JOB_TIMEOUT", "120"))
+# Seconds a finished job is kept for its session to pick up the result
+FINISHED_JOB_RETENTION = 3600
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+# State of one submitted job as seen by the polling page
+class JobStatus:
+    __slots__ = ("id", "state", "step", "steps", "message", "result", "error", "submitted_at", "step_started_at",
+                 "finished_at")
+
+    def __init__(self, job_id: str, steps: int):
+        self.id = job_id
+        self.state = QUEUED
+        self.step = 0
+        self.steps = steps
+        self.message = "Waiting for a free worker"
+        self.result = None
+        self.error = None
+        self.submitted_at = time.monotonic()
+        self.step_started_at = None
+        self.finished_at = None
+
+    @property
+    def progress(self) -> float:
+        return 1.0 if self.state == DONE else self.step / self.steps if self.steps else 0.0
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (DONE, FAILED)
+
+
+# Shared pool running report generation and persistence outside the Streamlit script run.
+#
+# A job is a list of (message, callable) steps run in order on a worker thread; the result of the
+# last step becomes the job result. submit() returns at once with a job id that the page polls
+# through status(). A failing step fails the job with its error, and a step still running after
+# `timeout` seconds fails the job so the page never waits forever (time spent queued for a worker
+# does not count). The step itself cannot be stopped and runs on, but later steps are skipped.
+class ReportJobPool:
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, timeout: float = DEFAULT_JOB_TIMEOUT,
+                 retention: float = FINISHED_JOB_RETENTION):
+        self.timeout = timeout
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report-job")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, JobStatus] = {}
+
+    def submit(self, steps: List[Tuple[str, Callable[[], Any]]]) -> str:
+        status = JobStatus(uuid.uuid4().hex, len(steps))
+        with self._lock:
+            self._prune()
+            self._jobs[status.id] = status
+        self._executor.submit(self._run, status, steps)
+        return status.id
+
+    def status(self, job_id: str) -> Optional[JobStatus]:
+        with self._lock:
+            status = self._jobs.get(job_id)
+            if (status is not None and status.state == RUNNING
+                    and time.monotonic() - status.step_started_at > self.timeout):
+                self._finish(status, FAILED, error=f"'{status.message}' did not finish within {self.timeout:.0f} seconds.")
+            return status
+
+    def forget(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, status: JobStatus, steps: List[Tuple[str, Callable[[], Any]]]):
+        result = None
+        for index, (message, step) in enumerate(steps):
+            with self._lock:
+                if status.finished:
+                    return
+                status.state = RUNNING
+                status.step = index
+                status.message = message
+                status.step_started_at = time.monotonic()
+            try:
+                result = step()
+            except Exception as e:
+                logger.error(f"Report job {status.id} failed while '{message}': {e}")
+                with self._lock:
+                    if not status.finished:
+                        self._finish(status, FAILED, error=str(e))
+                return
+        with self._lock:
+            if not status.finished:
+                status.step = status.steps
+                self._finish(status, DONE, result=result)
+
+    def _finish(self, status: JobStatus, state: str, result=None, error: Optional[str] = None):
+        status.state = state
+        status.result = result
+        status.error = error
+        status.message = "Done" if state == DONE else "Failed"
+        status.finished_at = time.monotonic()
+
+    def _prune(self):
+        now = time.monotonic()
+        expired = [job_id for job_id, status in self._jobs.items()
+                   if status.finished and now - status.finished_at > self.retention]
+        for job_id in expired:
+            del self._jobs[job_id]
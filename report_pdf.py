@@ -0,0 +1,213 @@
+import io
+from typing import Iterable, Optional
+
+from reportlab.lib import colors
+from reportlab.pdfgen import canvas
+
+from metrics import METRICS
+from pdf_templates import PAGE_SIZE, MARGIN_LEFT, STRATEGY_COVER, TOPIC_FRAME, cover_logo_y
+from questionnaires import Questionnaire, Topic
+from report_charts import BAR_COLOR, draw_topic_chart
+
+
+# Strategy Tool report: the selected goal, method, tool and KPI with the matching use cases and partners
+def render_strategy_pdf(goal, method, tool, kpi, use_cases, partners):
+    pdf_buffer = io.BytesIO()
+    c = canvas.Canvas(pdf_buffer, pagesize=PAGE_SIZE)
+    width, height = PAGE_SIZE
+
+    STRATEGY_COVER.apply(c)
+
+    # Decrease gap after heading by 5%
+    gap_after_heading = 40 * 0.95
+
+    # Add the statement with chosen inputs and wrap text to stay within page edges
+    c.setFont("Helvetica-Bold", 14)
+    y_position = cover_logo_y(height, 10) - gap_after_heading - 70
+    statement_parts = [
+        ("Our R&D Transformation goal is to ", colors.black),
+        (goal, colors.HexColor('#E96C25')),
+        (", which will be accomplished by ", colors.black),
+        (method, colors.HexColor('#E96C25')),
+        (", through the strategic initiatives in ", colors.black),
+        (tool, colors.HexColor('#E96C25')),
+        (", and success will be evaluated by ", colors.black),
+        (kpi, colors.HexColor('#E96C25')),
+        (".", colors.black)
+    ]
+
+    x_position = MARGIN_LEFT
+    max_width = width - 60  # Leave some margin on both sides
+    for text, color in statement_parts:
+        text_width = c.stringWidth(text, "Helvetica-Bold", 14)
+        if x_position + text_width > max_width:
+            y_position -= 20
+            x_position = MARGIN_LEFT
+        c.setFillColor(color)
+        c.drawString(x_position, y_position, text)
+        x_position += text_width
+
+    # Add recommended use cases and partners
+    y_position -= 40
+    c.setFont("Helvetica", 12)
+    c.setFillColor(colors.black)
+    c.drawString(MARGIN_LEFT, y_position, "Recommended Use Cases:")
+    y_position -= 20
+    c.drawString(MARGIN_LEFT, y_position, ', '.join(use_cases))
+
+    y_position -= 40
+    c.drawString(MARGIN_LEFT, y_position, "Suitable Partners:")
+    y_position -= 20
+    c.drawString(MARGIN_LEFT, y_position, ', '.join(partners))
+
+    with METRICS.span("stage_seconds", stage="pdf_save", report="strategy"):
+        c.save()
+    pdf_buffer.seek(0)
+    return pdf_buffer
+
+
+# Maturity assessment report (ERP or R&D): a cover page with the user information followed by
+# one page per completed topic, in questionnaire order
+def render_assessment_pdf(questionnaire: Questionnaire, cover_template, responses, user_info,
+                          completed_topics: Iterable[str], y_axis_range, chart_backend: Optional[str] = None,
+                          benchmarks: Optional[dict] = None):
+    pdf_buffer = io.BytesIO()
+    c = canvas.Canvas(pdf_buffer, pagesize=PAGE_SIZE)
+    width, height = PAGE_SIZE
+
+    # Cover page: banner, logo and title come from the shared template
+    cover_template.apply(c)
+
+    # Add user information on the cover page
+    y_position = cover_logo_y(height, 30) - 80
+    c.setFont("Helvetica", 12)
+    c.setFillColor(colors.black)
+    for key, value in user_info.items():
+        c.drawString(MARGIN_LEFT, y_position, f"{key}: {value}")
+        y_position -= 20
+
+    # Generate pages for each completed topic
+    completed_topics = set(completed_topics)
+    for topic in questionnaire.topics:
+        if topic.name not in completed_topics:
+            continue
+
+        c.showPage()  # Start a new page
+        TOPIC_FRAME.apply(c)
+        draw_topic_page(c, topic, responses, y_axis_range, chart_backend, questionnaire.id, benchmarks)
+
+    with METRICS.span("stage_seconds", stage="pdf_save", report=questionnaire.id):
+        c.save()
+    pdf_buffer.seek(0)
+    return pdf_buffer
+
+
+# Body of a topic page: title, the user's maturity chart, the peer comparison panel and the question legend
+def draw_topic_page(c, topic: Topic, responses, y_axis_range, chart_backend: Optional[str] = None,
+                    questionnaire_id: str = "", benchmarks: Optional[dict] = None):
+    width, height = PAGE_SIZE
+    topic_name = topic.name
+    topic_questions = topic.questions
+
+    # Add the topic name as the page title
+    c.setFont("Helvetica-Bold", 20)
+    c.setFillColor(colors.black)
+    c.drawString(MARGIN_LEFT, height - 60, f"Topic: {topic_name}")
+
+    # Define question numbers and maturity levels based on the responses
+    question_numbers = [q.number for q in topic_questions]
+    maturity_levels = [responses.get(q.id, 0) for q in topic_questions]
+
+    # Adjust the y-coordinate for the plot
+    plot_margin_top = 100
+    plot_height = height * 0.5
+    plot_width = width * 0.45
+
+    # Draw the user session plot on the left half of the page
+    draw_topic_chart(c, topic_name, question_numbers, maturity_levels, y_axis_range,
+                     MARGIN_LEFT, height - plot_margin_top - plot_height, plot_width, plot_height,
+                     backend=chart_backend, questionnaire_id=questionnaire_id)
+
+    # Distribution of the earlier answers on the right half of the page
+    draw_peer_comparison(c, topic, responses, benchmarks or {}, y_axis_range,
+                         width / 2 + 30, height - plot_margin_top - plot_height, plot_width, plot_height)
+
+    # Add the legend below the plots
+    legend_y_position = height - plot_margin_top - plot_height - 40
+    c.setFont("Helvetica", 10)
+    c.setFillColor(colors.black)
+    for question in topic_questions:
+        if legend_y_position < 50:  # Ensure the legend fits within the page
+            break
+        c.drawString(MARGIN_LEFT, legend_y_position, f"{question.number} - {question.text}")
+        legend_y_position -= 15
+
+
+# Peer comparison panel: per question, the middle half of the earlier answers (box from the lower
+# to the upper quartile), their median and mean, and where this respondent's answer falls
+def draw_peer_comparison(c, topic: Topic, responses, benchmarks: dict, y_axis_range, x, y, panel_width, panel_height):
+    c.setFillColor(colors.HexColor('#F4F4F4'))
+    c.setStrokeColor(colors.lightgrey)
+    c.rect(x, y, panel_width, panel_height, fill=1)
+    c.setFillColor(colors.black)
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(x + 10, y + panel_height - 20, "Peer Comparison")
+
+    rows = [(question, benchmarks.get(question.id)) for question in topic.questions]
+    peers = [benchmark["n"] for _, benchmark in rows if benchmark]
+    c.setFont("Helvetica", 9)
+    if not peers:
+        c.drawString(x + 10, y + panel_height - 36, "Not enough earlier responses to this topic yet.")
+        return
+    c.drawString(x + 10, y + panel_height - 36, f"Based on {min(peers)} earlier responses" if min(peers) == max(peers)
+                 else f"Based on {min(peers)}-{max(peers)} earlier responses per question")
+
+    # Scale of the answer levels, with the question labels on the left and the percentiles on the right
+    low, high = y_axis_range
+    scale_x = x + 40
+    scale_width = panel_width - 100
+    position = lambda level: scale_x + (level - low) / (high - low) * scale_width
+    top = y + panel_height - 50
+    bottom = y + 45
+    row_height = min(45, (top - bottom) / len(rows))
+
+    c.setStrokeColor(colors.lightgrey)
+    c.setFont("Helvetica", 8)
+    for level in range(int(low), int(high) + 1):
+        c.line(position(level), bottom, position(level), top)
+        c.drawCentredString(position(level), bottom - 10, str(level))
+
+    for index, (question, benchmark) in enumerate(rows):
+        center = top - (index + 0.5) * row_height
+        c.setFillColor(colors.black)
+        c.setFont("Helvetica", 9)
+        c.drawString(x + 10, center - 3, question.number)
+        if not benchmark:
+            c.setFillColor(colors.grey)
+            c.drawString(scale_x + 4, center - 3, "Not enough earlier answers")
+            continue
+        box_height = min(14, row_height * 0.5)
+        box_left = position(benchmark["q1"])
+        box_width = max(position(benchmark["q3"]) - box_left, 3)
+        c.setFillColor(colors.HexColor('#F8D3BC'))
+        c.setStrokeColor(colors.HexColor(BAR_COLOR))
+        c.rect(box_left, center - box_height / 2, box_width, box_height, fill=1)
+        c.setLineWidth(2)
+        c.line(position(benchmark["median"]), center - box_height / 2, position(benchmark["median"]), center + box_height / 2)
+        c.setLineWidth(1)
+        c.setFillColor(colors.dimgrey)
+        c.setStrokeColor(colors.dimgrey)
+        mean_x = position(benchmark["mean"])
+        c.lines([(mean_x, center - 4, mean_x + 4, center), (mean_x + 4, center, mean_x, center + 4),
+                 (mean_x, center + 4, mean_x - 4, center), (mean_x - 4, center, mean_x, center - 4)])
+        c.setFillColor(colors.HexColor(BAR_COLOR))
+        c.setStrokeColor(colors.black)
+        c.circle(position(responses.get(question.id, low)), center, 4, fill=1)
+        c.setFillColor(colors.black)
+        c.drawString(scale_x + scale_width + 12, center - 3, f"P{benchmark['percentile']}")
+
+    # Legend
+    c.setFont("Helvetica", 8)
+    c.setFillColor(colors.black)
+    c.drawString(x + 10, y + 20, "Box: middle 50% of the earlier answers, bar: median, diamond: mean")
+    c.drawString(x + 10, y + 10, "Dot: your answer, P: your percentile among the earlier answers")
@@ -0,0 +1,352 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AGGREGATES_PATH = os.environ.get("RESPONSE_AGGREGATES_PATH",
+                                         os.path.join("local_data", "response_aggregates.sqlite3"))
+# Peer statistics are only shown once a question has this many earlier answers, so a report never
+# describes a handful of identifiable respondents
+DEFAULT_MIN_PEERS = int(os.environ.get("RESPONSE_AGGREGATES_MIN_PEERS", "5"))
+# Column of the saved submission rows naming the topics the respondent completed, joined by "; "
+COMPLETED_TOPICS_COLUMN = "Completed Topics"
+COMPLETED_TOPICS_SEPARATOR = "; "
+
+
+# Running distribution of the answers to one question: a histogram of the levels plus the count,
+# sum and sum of squares. Every statistic is computed from these in O(levels).
+class QuestionAggregate:
+    __slots__ = ("levels", "count", "total", "total_squares")
+
+    def __init__(self):
+        self.levels: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.total_squares = 0.0
+
+    def add(self, level: int):
+        self.levels[level] = self.levels.get(level, 0) + 1
+        self.count += 1
+        self.total += level
+        self.total_squares += level * level
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def stdev(self) -> float:
+        if self.count < 2:
+            return 0.0
+        variance = (self.total_squares - self.total * self.total / self.count) / (self.count - 1)
+        return max(variance, 0.0) ** 0.5
+
+    # Level below or at which a `fraction` of the answers lie
+    def quantile(self, fraction: float) -> int:
+        target = fraction * self.count
+        cumulative = 0
+        levels = sorted(self.levels)
+        for level in levels:
+            cumulative += self.levels[level]
+            if cumulative >= target:
+                return level
+        return levels[-1]
+
+    # Percentile rank of `level` among the answers, counting ties as half below
+    def percentile(self, level: int) -> float:
+        below = sum(count for other, count in self.levels.items() if other < level)
+        return 100.0 * (below + 0.5 * self.levels.get(level, 0)) / self.count
+
+
+# Stable id of a submission row, the same for the row the app saves and for that row read back from
+# a CSV/JSONL export or the Sheets spool (values are compared as text, empty cells are ignored)
+def submission_id(questionnaire_id: str, row: dict) -> str:
+    fields = {str(key): str(value).strip() for key, value in row.items() if str(value).strip()}
+    return hashlib.sha256(json.dumps([questionnaire_id, fields], sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def format_completed_topics(topics: Iterable[str]) -> str:
+    return COMPLETED_TOPICS_SEPARATOR.join(sorted(topics))
+
+
+# Completed topics recorded in a submission row, or None for rows saved before the column existed
+# (their answers are all counted, as there is no telling the completed topics apart)
+def completed_topics_of(row: dict) -> Optional[List[str]]:
+    value = str(row.get(COMPLETED_TOPICS_COLUMN, "")).strip()
+    if not value:
+        return None
+    return [topic.strip() for topic in value.split(COMPLETED_TOPICS_SEPARATOR.strip()) if topic.strip()]
+
+
+# Answers of a submission row to the questions of `questionnaire`, as integer levels. With `topics`
+# only the questions of those topics count (the app's sessions hold slider defaults for every topic
+# the respondent opened, but only the completed ones are submitted answers).
+def answered_levels(questionnaire, row: dict, topics: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    if topics is None:
+        question_ids = list(questionnaire.questions_by_id)
+    else:
+        topics = set(topics)
+        question_ids = [question.id for topic in questionnaire.topics if topic.name in topics
+                        for question in topic.questions]
+    levels = {}
+    for question_id in question_ids:
+        value = str(row.get(question_id, "")).strip()
+        if value:
+            try:
+                levels[question_id] = int(float(value))
+            except ValueError:
+                logger.warning(f"Ignoring the non-numeric answer '{value}' to {question_id}.")
+    return levels
+
+
+# Population aggregates of the assessment answers, for the peer comparison in the reports.
+#
+# Each saved submission updates the histogram and running moments of the questions it answers
+# (one UPSERT per answer), so the cost of a save does not depend on how many responses exist.
+# The aggregates live in a local SQLite file and in an in-memory snapshot that reports read
+# without touching the database; commits made by other processes (a rebuild, a second server)
+# are noticed through SQLite's data_version and reload the snapshot. Submissions are recorded
+# under a content id, so replaying a row that was already counted changes nothing, and the
+# whole store can be rebuilt from the exported response history with `rebuild`, which counts the
+# topics in the rows' Completed Topics column like `record` does.
+class ResponseAggregateStore:
+    def __init__(self, path: str = DEFAULT_AGGREGATES_PATH, min_peers: int = DEFAULT_MIN_PEERS):
+        self.path = path
+        self.min_peers = min_peers
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._data_version = None
+        self._questions: Dict[Tuple[str, str], QuestionAggregate] = {}
+
+    # Count a saved submission (only its completed_topics, when given). Returns False when it was
+    # counted before or could not be stored; the aggregates can be rebuilt from the response
+    # history, so a failure is logged and not raised.
+    def record(self, questionnaire, row: dict, completed_topics: Optional[Iterable[str]] = None) -> bool:
+        levels = answered_levels(questionnaire, row, completed_topics)
+        if not levels:
+            return False
+        try:
+            with METRICS.span("stage_seconds", stage="aggregates_record"), self._lock:
+                self._refresh()
+                if not self._apply(questionnaire.id, submission_id(questionnaire.id, row), levels):
+                    return False
+                for question_id, level in levels.items():
+                    self._questions.setdefault((questionnaire.id, question_id), QuestionAggregate()).add(level)
+                return True
+        except sqlite3.Error as e:
+            logger.error(f"Could not record a {questionnaire.id} submission in {self.path}: {e}")
+            return False
+
+    def aggregate(self, questionnaire_id: str, question_id: str) -> Optional[QuestionAggregate]:
+        with self._lock:
+            self._refresh()
+            return self._questions.get((questionnaire_id, question_id))
+
+    # Peer statistics for the questions of the completed topics that the respondent answered:
+    # {question id: {"n", "mean", "stdev", "q1", "median", "q3", "percentile"}}. Questions with
+    # fewer than min_peers earlier answers are left out.
+    def benchmarks(self, questionnaire, responses: dict, completed_topics: Iterable[str]) -> Dict[str, dict]:
+        completed_topics = set(completed_topics)
+        try:
+            with self._lock:
+                self._refresh()
+                benchmarks = {}
+                for topic in questionnaire.topics:
+                    if topic.name not in completed_topics:
+                        continue
+                    for question in topic.questions:
+                        aggregate = self._questions.get((questionnaire.id, question.id))
+                        if question.id not in responses or aggregate is None or aggregate.count < self.min_peers:
+                            continue
+                        benchmarks[question.id] = {
+                            "n": aggregate.count,
+                            "mean": round(aggregate.mean, 2),
+                            "stdev": round(aggregate.stdev, 2),
+                            "q1": aggregate.quantile(0.25),
+                            "median": aggregate.quantile(0.5),
+                            "q3": aggregate.quantile(0.75),
+                            "percentile": round(aggregate.percentile(int(responses[question.id]))),
+                        }
+                return benchmarks
+        except sqlite3.Error as e:
+            logger.error(f"Could not read the response aggregates from {self.path}: {e}")
+            return {}
+
+    # Replace the aggregates with the ones of `rows` ((questionnaire, row) pairs) in one transaction
+    def rebuild(self, rows: Iterable[Tuple[object, dict]]) -> Tuple[int, int]:
+        recorded = duplicates = 0
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM submissions")
+                conn.execute("DELETE FROM question_moments")
+                conn.execute("DELETE FROM question_levels")
+                for questionnaire, row in rows:
+                    levels = answered_levels(questionnaire, row, completed_topics_of(row))
+                    if not levels:
+                        continue
+                    if self._insert(conn, questionnaire.id, submission_id(questionnaire.id, row), levels):
+                        recorded += 1
+                    else:
+                        duplicates += 1
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self._load()
+        return recorded, duplicates
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                self._data_version = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS submissions ("
+                "submission_id TEXT PRIMARY KEY, "
+                "questionnaire_id TEXT NOT NULL, "
+                "recorded_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS question_moments ("
+                "questionnaire_id TEXT NOT NULL, "
+                "question_id TEXT NOT NULL, "
+                "count INTEGER NOT NULL, "
+                "total REAL NOT NULL, "
+                "total_squares REAL NOT NULL, "
+                "PRIMARY KEY (questionnaire_id, question_id))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS question_levels ("
+                "questionnaire_id TEXT NOT NULL, "
+                "question_id TEXT NOT NULL, "
+                "level INTEGER NOT NULL, "
+                "count INTEGER NOT NULL, "
+                "PRIMARY KEY (questionnaire_id, question_id, level))"
+            )
+            self._conn = conn
+        return self._conn
+
+    # Reload the snapshot if this is the first read or another connection committed since the last one
+    def _refresh(self):
+        data_version = self._connect().execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            self._load()
+            self._data_version = data_version
+
+    def _load(self):
+        questions: Dict[Tuple[str, str], QuestionAggregate] = {}
+        conn = self._connect()
+        for questionnaire_id, question_id, count, total, total_squares in conn.execute(
+                "SELECT questionnaire_id, question_id, count, total, total_squares FROM question_moments"):
+            aggregate = questions[(questionnaire_id, question_id)] = QuestionAggregate()
+            aggregate.count, aggregate.total, aggregate.total_squares = count, total, total_squares
+        for questionnaire_id, question_id, level, count in conn.execute(
+                "SELECT questionnaire_id, question_id, level, count FROM question_levels"):
+            aggregate = questions.get((questionnaire_id, question_id))
+            if aggregate is not None:
+                aggregate.levels[level] = count
+        self._questions = questions
+
+    def _apply(self, questionnaire_id: str, submission: str, levels: Dict[str, int]) -> bool:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            inserted = self._insert(conn, questionnaire_id, submission, levels)
+            conn.execute("COMMIT" if inserted else "ROLLBACK")
+            return inserted
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, questionnaire_id: str, submission: str, levels: Dict[str, int]) -> bool:
+        cursor = conn.execute("INSERT OR IGNORE INTO submissions VALUES (?, ?, ?)",
+                              (submission, questionnaire_id, time.time()))
+        if cursor.rowcount == 0:
+            return False
+        conn.executemany(
+            "INSERT INTO question_moments VALUES (?, ?, 1, ?, ?) "
+            "ON CONFLICT (questionnaire_id, question_id) DO UPDATE SET "
+            "count = count + 1, total = total + excluded.total, total_squares = total_squares + excluded.total_squares",
+            [(questionnaire_id, question_id, level, level * level) for question_id, level in levels.items()],
+        )
+        conn.executemany(
+            "INSERT INTO question_levels VALUES (?, ?, ?, 1) "
+            "ON CONFLICT (questionnaire_id, question_id, level) DO UPDATE SET count = count + 1",
+            [(questionnaire_id, question_id, level) for question_id, level in levels.items()],
+        )
+        return True
+
+
+RESPONSE_AGGREGATES = ResponseAggregateStore()
+
+
+# Assessment rows of exported response history, with their questionnaires
+def iter_history(paths: List[str]) -> Iterable[Tuple[object, dict]]:
+    from batch_reports import detect_kind, read_rows
+    from questionnaires import QUESTIONNAIRES
+
+    for path in paths:
+        for kind, row in read_rows(path):
+            kind = kind or detect_kind(row)
+            if kind in QUESTIONNAIRES.ids():
+                yield QUESTIONNAIRES.get(kind), row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Population aggregates of the assessment answers")
+    parser.add_argument("--path", default=DEFAULT_AGGREGATES_PATH)
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    rebuild = subcommands.add_parser("rebuild", help="recompute the aggregates from exported responses")
+    rebuild.add_argument("inputs", nargs="+", help="CSV/JSONL exports of the response sheets or a Sheets spool file")
+    show = subcommands.add_parser("show", help="print the distribution of every question")
+    show.add_argument("questionnaire", help="questionnaire id, e.g. erp or rnd")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    store = ResponseAggregateStore(args.path)
+    if args.command == "rebuild":
+        start = time.perf_counter()
+        recorded, duplicates = store.rebuild(iter_history(args.inputs))
+        logger.info(f"Rebuilt {args.path} from {recorded} submission(s) ({duplicates} duplicate row(s) skipped) "
+                    f"in {time.perf_counter() - start:.1f}s.")
+    else:
+        from questionnaires import QUESTIONNAIRES
+
+        questionnaire = QUESTIONNAIRES.get(args.questionnaire)
+        for topic in questionnaire.topics:
+            print(topic.name)
+            for question in topic.questions:
+                aggregate = store.aggregate(questionnaire.id, question.id)
+                if aggregate is None:
+                    print(f"  {question.number:4s} no answers")
+                    continue
+                histogram = " ".join(f"{level}:{aggregate.levels[level]}" for level in sorted(aggregate.levels))
+                print(f"  {question.number:4s} n={aggregate.count:<6d} mean={aggregate.mean:.2f} "
+                      f"sd={aggregate.stdev:.2f} quartiles={aggregate.quantile(0.25)}/{aggregate.quantile(0.5)}/"
+                      f"{aggregate.quantile(0.75)}  {histogram}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
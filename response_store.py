@@ -0,0 +1,490 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from metrics import METRICS
+from response_aggregates import answered_levels, completed_topics_of, submission_id
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_DIR = os.environ.get("RESPONSE_STORE_DIR", os.path.join("local_data", "response_store"))
+# Appended submissions are folded into the snapshot file once this many are in the log
+DEFAULT_COMPACT_ROWS = int(os.environ.get("RESPONSE_STORE_COMPACT_ROWS", "1000"))
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Grouping keys of ResponseStore.query
+GROUP_BY = ("company", "month", "year")
+# Result columns of ResponseStore.query
+COLUMN_SETS = ("overall", "topics", "questions")
+
+
+# Submission times are the server's wall-clock "Timestamp" of the Sheets row. They are stored as if
+# they were UTC, so month and year groups match the timestamps in the sheet on any server.
+def wall_clock_seconds(moment: datetime) -> float:
+    return moment.replace(tzinfo=timezone.utc).timestamp()
+
+
+def parse_timestamp(value) -> float:
+    try:
+        return wall_clock_seconds(datetime.strptime(str(value).strip(), TIMESTAMP_FORMAT))
+    except ValueError:
+        return wall_clock_seconds(datetime.now())
+
+
+# Submissions of one questionnaire in columnar form: a respondents x questions uint8 matrix of
+# answer levels (0 = not answered) plus submission time, dictionary-encoded company and a 64-bit
+# submission id per row. Arrays grow by doubling; rows [0, rows) are valid.
+class ResponseTable:
+    def __init__(self, questionnaire_id: str):
+        import numpy as np
+
+        self.questionnaire_id = questionnaire_id
+        self.question_ids: List[str] = []
+        self.companies: List[str] = []
+        self.rows = 0
+        self.levels = np.zeros((0, 0), dtype=np.uint8)
+        self.submitted_at = np.zeros(0, dtype=np.float64)
+        self.company = np.zeros(0, dtype=np.int32)
+        self.submission = np.zeros(0, dtype=np.uint64)
+        self._columns: Dict[str, int] = {}
+        self._company_codes: Dict[str, int] = {}
+        self._submissions = set()
+
+    def __contains__(self, submission: int) -> bool:
+        return submission in self._submissions
+
+    def append(self, submission: int, submitted_at: float, company: str, levels: Dict[str, int]) -> bool:
+        if submission in self._submissions:
+            return False
+        # Questions added to the questionnaire later become new columns, unanswered in older rows
+        for question_id in levels:
+            if question_id not in self._columns:
+                self._add_column(question_id)
+        self._reserve(self.rows + 1)
+        row = self.rows
+        for question_id, level in levels.items():
+            self.levels[row, self._columns[question_id]] = min(max(level, 0), 255)
+        self.submitted_at[row] = submitted_at
+        self.company[row] = self._company_code(company)
+        self.submission[row] = submission
+        self._submissions.add(submission)
+        self.rows += 1
+        return True
+
+    # Consistent views of the valid rows; appends never write into them and growth reallocates,
+    # so they can be read without holding the store lock
+    def view(self) -> Tuple:
+        return (self.levels[:self.rows], self.submitted_at[:self.rows], self.company[:self.rows],
+                list(self.question_ids), list(self.companies))
+
+    def arrays(self) -> Dict[str, object]:
+        import numpy as np
+
+        return {
+            "question_ids": np.array(self.question_ids, dtype=str),
+            "companies": np.array(self.companies, dtype=str),
+            "levels": self.levels[:self.rows],
+            "submitted_at": self.submitted_at[:self.rows],
+            "company": self.company[:self.rows],
+            "submission": self.submission[:self.rows],
+        }
+
+    @classmethod
+    def from_arrays(cls, questionnaire_id: str, arrays) -> "ResponseTable":
+        table = cls(questionnaire_id)
+        table.question_ids = [str(question_id) for question_id in arrays["question_ids"]]
+        table.companies = [str(company) for company in arrays["companies"]]
+        table._columns = {question_id: i for i, question_id in enumerate(table.question_ids)}
+        table._company_codes = {company: i for i, company in enumerate(table.companies)}
+        table.levels = arrays["levels"].copy()
+        table.submitted_at = arrays["submitted_at"].copy()
+        table.company = arrays["company"].copy()
+        table.submission = arrays["submission"].copy()
+        table.rows = len(table.submission)
+        table._submissions = set(table.submission.tolist())
+        return table
+
+    def _company_code(self, company: str) -> int:
+        code = self._company_codes.get(company)
+        if code is None:
+            code = self._company_codes[company] = len(self.companies)
+            self.companies.append(company)
+        return code
+
+    def _add_column(self, question_id: str):
+        import numpy as np
+
+        self._columns[question_id] = len(self.question_ids)
+        self.question_ids.append(question_id)
+        levels = np.zeros((len(self.submitted_at), len(self.question_ids)), dtype=np.uint8)
+        levels[:, :-1] = self.levels
+        self.levels = levels
+
+    def _reserve(self, rows: int):
+        import numpy as np
+
+        capacity = len(self.submitted_at)
+        if rows <= capacity:
+            return
+        capacity = max(rows, capacity * 2, 1024)
+        levels = np.zeros((capacity, len(self.question_ids)), dtype=np.uint8)
+        levels[:self.rows] = self.levels[:self.rows]
+        self.levels = levels
+        for name in ("submitted_at", "company", "submission"):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.rows] = column[:self.rows]
+            setattr(self, name, grown)
+
+
+# Grouped aggregates returned by ResponseStore.query: one row per group, one column per topic,
+# question or the overall score. means[i, j] is the mean answered level (NaN without answers),
+# answers[i, j] the number of answers behind it and respondents[i] the submissions in the group.
+class QueryResult:
+    def __init__(self, by: Optional[str], groups: list, columns: List[str], respondents, answers, means):
+        self.by = by
+        self.groups = groups
+        self.columns = columns
+        self.respondents = respondents
+        self.answers = answers
+        self.means = means
+
+    def records(self) -> List[dict]:
+        records = []
+        for i, group in enumerate(self.groups):
+            record = {self.by or "group": group, "respondents": int(self.respondents[i])}
+            for j, column in enumerate(self.columns):
+                record[column] = None if self.answers[i, j] == 0 else round(float(self.means[i, j]), 3)
+            records.append(record)
+        return records
+
+
+# Local columnar store of every saved assessment submission; Google Sheets mirrors it downstream.
+#
+# Each questionnaire has a ResponseTable held in memory. A submission is written to
+# <id>.log.jsonl first (flushed and fsynced) and then added to the table; once compact_rows
+# submissions are in the log, the table is written to the <id>.npz snapshot and the log is
+# truncated. Loading reads the snapshot and replays the log, skipping submissions the snapshot
+# already holds, so a crash between writing the snapshot and truncating the log loses or
+# duplicates nothing.
+#
+# Several processes may share the directory (app servers, the `import` CLI). Every access takes a
+# lock on <id>.lock and first catches up with the files: a snapshot replaced by another process is
+# reloaded, otherwise the log is read on from the offset seen last. A compaction therefore always
+# writes a table holding everything on disk.
+# Queries work on NumPy views of the table: filters are boolean masks and group-by aggregates are
+# column sums over the slices of the rows sorted by group, so the work per query is a few passes
+# over the uint8 matrix, with no Python code per submission.
+class ResponseStore:
+    def __init__(self, directory: str = DEFAULT_STORE_DIR, compact_rows: int = DEFAULT_COMPACT_ROWS):
+        self.directory = directory
+        self.compact_rows = compact_rows
+        self._lock = threading.Lock()
+        self._tables: Dict[str, ResponseTable] = {}
+        # Per questionnaire: entries in the log, bytes of the log read, identity of the snapshot read
+        self._logged: Dict[str, int] = {}
+        self._log_offsets: Dict[str, int] = {}
+        self._snapshots: Dict[str, Optional[Tuple[int, int, int]]] = {}
+
+    # Store a saved submission row (the dict queued for Sheets), only the answers to completed_topics
+    # when given. Returns False if it was stored before.
+    def append(self, questionnaire, row: dict, completed_topics: Optional[Iterable[str]] = None) -> bool:
+        levels = answered_levels(questionnaire, row, completed_topics)
+        if not levels:
+            return False
+        submission = int(submission_id(questionnaire.id, row)[:16], 16)
+        submitted_at = parse_timestamp(row.get("Timestamp", ""))
+        company = str(row.get("Company", "")).strip()
+        with METRICS.span("stage_seconds", stage="response_store_append"), self._lock, \
+                self._file_lock(questionnaire.id, exclusive=True):
+            table = self._table(questionnaire.id)
+            if submission in table:
+                return False
+            # Logged before it is added to the table, so a failed write leaves nothing behind to retry against
+            self._write_log(questionnaire.id, [{"submission": f"{submission:016x}", "submitted_at": submitted_at,
+                                                "company": company, "levels": levels}])
+            self._replay_log(questionnaire.id, table)
+            if self._logged[questionnaire.id] >= self.compact_rows:
+                self._compact(questionnaire.id)
+            return True
+
+    # Store many history rows ((questionnaire, row) pairs, e.g. a Sheets export), writing one snapshot
+    # per questionnaire at the end; like `append`, only the answers to the topics in a row's Completed
+    # Topics column are stored. Returns the number of new and already stored submissions.
+    def import_rows(self, rows: Iterable[Tuple[object, dict]]) -> Tuple[int, int]:
+        entries: Dict[str, List[dict]] = {}
+        questionnaires = {}
+        for questionnaire, row in rows:
+            levels = answered_levels(questionnaire, row, completed_topics_of(row))
+            if levels:
+                questionnaires[questionnaire.id] = questionnaire
+                entries.setdefault(questionnaire.id, []).append({
+                    "submission": f"{int(submission_id(questionnaire.id, row)[:16], 16):016x}",
+                    "submitted_at": parse_timestamp(row.get("Timestamp", "")),
+                    "company": str(row.get("Company", "")).strip(), "levels": levels})
+        imported = duplicates = 0
+        with self._lock:
+            for questionnaire_id, candidates in entries.items():
+                with self._file_lock(questionnaire_id, exclusive=True):
+                    table = self._table(questionnaire_id)
+                    new, seen = [], set()
+                    for entry in candidates:
+                        if entry["submission"] in seen or int(entry["submission"], 16) in table:
+                            duplicates += 1
+                            continue
+                        seen.add(entry["submission"])
+                        new.append(entry)
+                    if not new:
+                        continue
+                    self._write_log(questionnaire_id, new)
+                    self._replay_log(questionnaire_id, table)
+                    imported += len(new)
+                    self._compact(questionnaire_id)
+        return imported, duplicates
+
+    def count(self, questionnaire_id: str) -> int:
+        with self._lock, self._file_lock(questionnaire_id, exclusive=False):
+            return self._table(questionnaire_id).rows
+
+    # Mean answered level per group and column over the submissions matching the filters. `by` is
+    # None (all submissions), "company", "month" or "year"; `columns` is "overall", "topics" (mean
+    # over the topic's questions) or "questions". since/until bound the submission time and
+    # `companies` restricts the query to those companies.
+    def query(self, questionnaire, by: Optional[str] = None, columns: str = "topics",
+              since: Optional[datetime] = None, until: Optional[datetime] = None,
+              companies: Optional[Sequence[str]] = None) -> QueryResult:
+        import numpy as np
+
+        if by is not None and by not in GROUP_BY:
+            raise ValueError(f"Unknown group '{by}', expected one of {', '.join(GROUP_BY)}.")
+        if columns not in COLUMN_SETS:
+            raise ValueError(f"Unknown columns '{columns}', expected one of {', '.join(COLUMN_SETS)}.")
+        with self._lock, self._file_lock(questionnaire.id, exclusive=False):
+            levels, submitted_at, company, question_ids, company_names = self._table(questionnaire.id).view()
+
+        with METRICS.span("stage_seconds", stage="response_store_query"):
+            mask = np.ones(len(submitted_at), dtype=bool)
+            if since is not None:
+                mask &= submitted_at >= wall_clock_seconds(since)
+            if until is not None:
+                mask &= submitted_at < wall_clock_seconds(until)
+            if companies is not None:
+                codes = [i for i, name in enumerate(company_names) if name in set(companies)]
+                mask &= np.isin(company, codes)
+            if not mask.all():
+                levels, submitted_at, company = levels[mask], submitted_at[mask], company[mask]
+
+            # Membership of the question columns in the result columns
+            positions = {question_id: i for i, question_id in enumerate(question_ids)}
+            if columns == "questions":
+                names = list(questionnaire.questions_by_id)
+                members = [[question_id] for question_id in names]
+            elif columns == "topics":
+                names = questionnaire.topic_names
+                members = [[question.id for question in topic.questions] for topic in questionnaire.topics]
+            else:
+                names = ["overall"]
+                members = [list(questionnaire.questions_by_id)]
+            membership = np.zeros((len(question_ids), len(names)), dtype=np.int64)
+            for j, member in enumerate(members):
+                membership[[positions[question_id] for question_id in member if question_id in positions], j] = 1
+
+            # Sum and count the answers per group and question, then per result column
+            if by is None:
+                groups = ["all"]
+                respondents = np.array([len(levels)])
+                question_sums = levels.sum(axis=0, dtype=np.int64)[None, :]
+                question_counts = np.count_nonzero(levels, axis=0)[None, :]
+            else:
+                if by == "company":
+                    keys = company
+                else:
+                    unit = "datetime64[M]" if by == "month" else "datetime64[Y]"
+                    keys = submitted_at.astype("datetime64[s]").astype(unit)
+                unique_keys, inverse, respondents = np.unique(keys, return_inverse=True, return_counts=True)
+                if by == "company":
+                    # Company codes are in order of first submission; list the companies by name
+                    by_name = np.argsort([company_names[code] for code in unique_keys], kind="stable")
+                    unique_keys, respondents = unique_keys[by_name], respondents[by_name]
+                    inverse = np.argsort(by_name)[inverse]
+                    groups = [company_names[code] for code in unique_keys]
+                else:
+                    groups = [str(key) for key in unique_keys]
+                # Rows sorted by group, so each group is one contiguous slice (summing slices along
+                # axis 0 is several times faster than np.add.reduceat on a uint8 matrix)
+                ordered = levels[np.argsort(inverse, kind="stable")]
+                ends = np.cumsum(respondents)
+                question_sums = np.zeros((len(groups), len(question_ids)), dtype=np.int64)
+                question_counts = np.zeros((len(groups), len(question_ids)), dtype=np.int64)
+                for i, (start, end) in enumerate(zip(ends - respondents, ends)):
+                    question_sums[i] = ordered[start:end].sum(axis=0, dtype=np.uint32)
+                    question_counts[i] = np.count_nonzero(ordered[start:end], axis=0)
+            group_sums = question_sums @ membership
+            group_counts = question_counts @ membership
+
+            with np.errstate(invalid="ignore", divide="ignore"):
+                means = np.where(group_counts > 0, group_sums / np.maximum(group_counts, 1), np.nan)
+        return QueryResult(by, groups, list(names), respondents, group_counts, means)
+
+    def compact(self):
+        with self._lock:
+            for questionnaire_id in list(self._tables):
+                with self._file_lock(questionnaire_id, exclusive=True):
+                    self._table(questionnaire_id)
+                    if self._logged.get(questionnaire_id):
+                        self._compact(questionnaire_id)
+
+    def _snapshot_path(self, questionnaire_id: str) -> str:
+        return os.path.join(self.directory, f"{questionnaire_id}.npz")
+
+    def _log_path(self, questionnaire_id: str) -> str:
+        return os.path.join(self.directory, f"{questionnaire_id}.log.jsonl")
+
+    # Lock shared by all processes using the directory; without fcntl (Windows) only threads are serialized
+    @contextmanager
+    def _file_lock(self, questionnaire_id: str, exclusive: bool):
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, f"{questionnaire_id}.lock"), 'a') as file:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+    # The table, brought up to date with the files; called with the file lock held
+    def _table(self, questionnaire_id: str) -> ResponseTable:
+        snapshot = self._snapshot_identity(questionnaire_id)
+        table = self._tables.get(questionnaire_id)
+        if table is None or snapshot != self._snapshots.get(questionnaire_id):
+            table = self._tables[questionnaire_id] = self._load_snapshot(questionnaire_id)
+            self._snapshots[questionnaire_id] = snapshot
+            self._logged[questionnaire_id] = self._log_offsets[questionnaire_id] = 0
+        self._replay_log(questionnaire_id, table)
+        return table
+
+    def _snapshot_identity(self, questionnaire_id: str) -> Optional[Tuple[int, int, int]]:
+        try:
+            info = os.stat(self._snapshot_path(questionnaire_id))
+        except FileNotFoundError:
+            return None
+        return info.st_ino, info.st_mtime_ns, info.st_size
+
+    def _load_snapshot(self, questionnaire_id: str) -> ResponseTable:
+        import numpy as np
+
+        snapshot_path = self._snapshot_path(questionnaire_id)
+        if not os.path.exists(snapshot_path):
+            return ResponseTable(questionnaire_id)
+        with np.load(snapshot_path) as arrays:
+            table = ResponseTable.from_arrays(questionnaire_id, arrays)
+        logger.info(f"Loaded {table.rows} '{questionnaire_id}' submission(s) from {self.directory}.")
+        return table
+
+    # Add the log entries written since the last read, by this or another process
+    def _replay_log(self, questionnaire_id: str, table: ResponseTable):
+        offset = self._log_offsets.get(questionnaire_id, 0)
+        try:
+            with open(self._log_path(questionnaire_id), 'rb') as file:
+                file.seek(offset)
+                data = file.read()
+        except FileNotFoundError:
+            return
+        # Only complete lines; a torn line left by a crash mid-write is ended by the next write and skipped
+        complete = data[:data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping an unreadable line in {self._log_path(questionnaire_id)}.")
+                continue
+            table.append(int(entry["submission"], 16), entry["submitted_at"], entry["company"], entry["levels"])
+            self._logged[questionnaire_id] = self._logged.get(questionnaire_id, 0) + 1
+        self._log_offsets[questionnaire_id] = offset + len(complete)
+
+    # Append entries to the log; they reach the table through _replay_log
+    def _write_log(self, questionnaire_id: str, entries: List[dict]):
+        os.makedirs(self.directory, exist_ok=True)
+        data = "".join(json.dumps(entry) + "\n" for entry in entries).encode("utf-8")
+        with open(self._log_path(questionnaire_id), 'ab+') as file:
+            if file.seek(0, os.SEEK_END) > 0:
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b"\n":
+                    data = b"\n" + data
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+
+    # Write the whole table to the snapshot, then drop the log it now contains; called with the
+    # exclusive file lock held and the table up to date, so nothing written by others is lost
+    def _compact(self, questionnaire_id: str):
+        import numpy as np
+
+        os.makedirs(self.directory, exist_ok=True)
+        snapshot_path = self._snapshot_path(questionnaire_id)
+        temp_path = f"{snapshot_path}.{os.getpid()}.tmp.npz"
+        with METRICS.span("stage_seconds", stage="response_store_compact"):
+            np.savez(temp_path, **self._tables[questionnaire_id].arrays())
+            with open(temp_path, 'rb') as file:
+                os.fsync(file.fileno())
+            os.replace(temp_path, snapshot_path)
+            with open(self._log_path(questionnaire_id), 'w'):
+                pass
+        self._snapshots[questionnaire_id] = self._snapshot_identity(questionnaire_id)
+        self._logged[questionnaire_id] = self._log_offsets[questionnaire_id] = 0
+
+
+RESPONSE_STORE = ResponseStore()
+
+
+def main():
+    from response_aggregates import iter_history
+    from questionnaires import QUESTIONNAIRES
+
+    parser = argparse.ArgumentParser(description="Local columnar store of the assessment submissions")
+    parser.add_argument("--dir", default=DEFAULT_STORE_DIR)
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    load = subcommands.add_parser("import", help="add exported responses (submissions already stored are skipped)")
+    load.add_argument("inputs", nargs="+", help="CSV/JSONL exports of the response sheets or a Sheets spool file")
+    query = subcommands.add_parser("query", help="mean maturity per group")
+    query.add_argument("questionnaires", nargs="+", help="questionnaire ids, e.g. erp rnd")
+    query.add_argument("--by", choices=GROUP_BY, default=None)
+    query.add_argument("--columns", choices=COLUMN_SETS, default="topics")
+    query.add_argument("--since", type=datetime.fromisoformat, default=None, help="e.g. 2026-01-01")
+    query.add_argument("--until", type=datetime.fromisoformat, default=None)
+    query.add_argument("--company", action="append", default=None, help="restrict to a company (repeatable)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    store = ResponseStore(args.dir)
+    if args.command == "import":
+        start = time.perf_counter()
+        imported, duplicates = store.import_rows(iter_history(args.inputs))
+        logger.info(f"Imported {imported} submission(s) into {args.dir} ({duplicates} already stored) "
+                    f"in {time.perf_counter() - start:.1f}s.")
+        return
+
+    for questionnaire_id in args.questionnaires:
+        questionnaire = QUESTIONNAIRES.get(questionnaire_id)
+        start = time.perf_counter()
+        result = store.query(questionnaire, args.by, args.columns, args.since, args.until, args.company)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"{questionnaire_id}: {store.count(questionnaire_id)} submission(s), query {elapsed_ms:.1f} ms")
+        for record in result.records():
+            print("  " + ", ".join(f"{key}={value}" for key, value in record.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+import argparse
+import base64
+import csv
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ROW_FORMATS = ("wide", "compact")
+# Format of the assessment rows written to Google Sheets
+DEFAULT_ROW_FORMAT = os.environ.get("SHEETS_ROW_FORMAT", "wide")
+# Question layouts referenced by compact rows, one <questionnaire>-<digest>.json file per layout
+SCHEMA_DIR = os.environ.get("ROW_SCHEMA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "row_schemas"))
+
+# Columns of a compact row besides the submission fields
+SCHEMA_COLUMN = "Schema"
+RESPONSES_COLUMN = "Responses"
+ENCODING_VERSION = "v1"
+# Answers are stored in 3 bits: 0 means not answered, 1-7 are levels
+BITS_PER_ANSWER = 3
+MAX_LEVEL = 2 ** BITS_PER_ANSWER - 1
+# Rows written per update call when a worksheet is migrated
+MIGRATION_CHUNK_ROWS = 2000
+
+
+# Question layout of a questionnaire version: topics in order, each with its question ids in
+# order. Compact rows store answers by position, so they name the layout they were encoded with.
+class RowSchema:
+    __slots__ = ("questionnaire_id", "topics", "digest")
+
+    def __init__(self, questionnaire_id: str, topics: List[Tuple[str, List[str]]]):
+        self.questionnaire_id = questionnaire_id
+        self.topics = [(name, list(question_ids)) for name, question_ids in topics]
+        self.digest = hashlib.sha256(json.dumps(self.topics).encode("utf-8")).hexdigest()[:10]
+
+    @classmethod
+    def of(cls, questionnaire) -> "RowSchema":
+        return cls(questionnaire.id, [(topic.name, [question.id for question in topic.questions])
+                                      for topic in questionnaire.topics])
+
+    @property
+    def ref(self) -> str:
+        return f"{self.questionnaire_id}:{self.digest}"
+
+    @property
+    def question_ids(self) -> List[str]:
+        return [question_id for _, question_ids in self.topics for question_id in question_ids]
+
+    def to_json(self) -> dict:
+        return {"questionnaire": self.questionnaire_id, "topics": self.topics}
+
+
+# Schemas by reference: the ones of the loaded questionnaires plus the files in SCHEMA_DIR.
+#
+# Encoding a row saves its schema file if it is not there yet, so every layout that was ever
+# written can be decoded. Files of edited questionnaires should be committed along with the
+# questionnaire change, so batch tools on other machines find them.
+class RowSchemaRegistry:
+    def __init__(self, directory: str = SCHEMA_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._schemas: Dict[str, RowSchema] = {}
+        # Schema of each loaded questionnaire version, by (id, mtime)
+        self._current: Dict[Tuple[str, float], RowSchema] = {}
+
+    def for_questionnaire(self, questionnaire) -> RowSchema:
+        key = (questionnaire.id, questionnaire.mtime)
+        with self._lock:
+            schema = self._current.get(key)
+            if schema is None:
+                schema = self._current[key] = RowSchema.of(questionnaire)
+                self._schemas[schema.ref] = schema
+                self._save(schema)
+            return schema
+
+    def get(self, ref: str) -> RowSchema:
+        with self._lock:
+            schema = self._schemas.get(ref)
+            if schema is not None:
+                return schema
+        from questionnaires import QUESTIONNAIRES
+
+        for questionnaire in QUESTIONNAIRES.all():
+            if self.for_questionnaire(questionnaire).ref == ref:
+                return self._schemas[ref]
+        try:
+            with open(self._path(ref), 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            raise ValueError(f"Unknown row schema '{ref}': no questionnaire or {self._path(ref)} matches it.") from None
+        schema = RowSchema(data["questionnaire"], data["topics"])
+        if schema.ref != ref:
+            raise ValueError(f"Row schema file {self._path(ref)} does not match its name.")
+        with self._lock:
+            self._schemas[ref] = schema
+        return schema
+
+    def _path(self, ref: str) -> str:
+        return os.path.join(self.directory, f"{ref.replace(':', '-')}.json")
+
+    def _save(self, schema: RowSchema):
+        path = self._path(schema.ref)
+        if os.path.exists(path):
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                json.dump(schema.to_json(), file, indent=2)
+            os.replace(temp_path, path)
+            logger.info(f"Saved row schema {schema.ref} to {path}.")
+        except OSError as e:
+            logger.error(f"Could not save row schema {schema.ref} to {path}: {e}")
+
+
+ROW_SCHEMAS = RowSchemaRegistry()
+
+
+# Pack the answers: a bitmap of the topics with at least one answer, then 3 bits per question of
+# those topics (0 = not answered), little-endian, as unpadded URL-safe base64 behind the version
+def encode_answers(schema: RowSchema, answers: Dict[str, int]) -> str:
+    bitmap = 0
+    bits = 0
+    position = 0
+    for index, (_, question_ids) in enumerate(schema.topics):
+        if not any(question_id in answers for question_id in question_ids):
+            continue
+        bitmap |= 1 << index
+        for question_id in question_ids:
+            level = answers.get(question_id, 0)
+            if question_id in answers and not 1 <= level <= MAX_LEVEL:
+                raise ValueError(f"Answer {level} to '{question_id}' does not fit the compact encoding.")
+            bits |= level << position
+            position += BITS_PER_ANSWER
+    payload = bitmap.to_bytes((len(schema.topics) + 7) // 8, "little") + bits.to_bytes((position + 7) // 8, "little")
+    return f"{ENCODING_VERSION}.{base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')}"
+
+
+def decode_answers(schema: RowSchema, encoded: str) -> Dict[str, int]:
+    version, _, text = encoded.partition(".")
+    if version != ENCODING_VERSION:
+        raise ValueError(f"Unsupported response encoding '{version}'.")
+    payload = base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+    bitmap_size = (len(schema.topics) + 7) // 8
+    bitmap = int.from_bytes(payload[:bitmap_size], "little")
+    bits = int.from_bytes(payload[bitmap_size:], "little")
+    answers = {}
+    for index, (_, question_ids) in enumerate(schema.topics):
+        if not bitmap >> index & 1:
+            continue
+        for question_id in question_ids:
+            level = bits & MAX_LEVEL
+            bits >>= BITS_PER_ANSWER
+            if level:
+                answers[question_id] = level
+    return answers
+
+
+# Compact form of a wide row: the answers to the schema's questions become the Schema and
+# Responses columns; every other non-empty column (user info, timestamp, answers to questions the
+# schema does not have) is kept as it is, so the row decodes back to the same values.
+def encode_row(questionnaire, row: dict, schemas: RowSchemaRegistry = ROW_SCHEMAS) -> dict:
+    schema = schemas.for_questionnaire(questionnaire)
+    question_ids = set(schema.question_ids)
+    answers = {}
+    compact = {}
+    for column, value in row.items():
+        text = str(value).strip()
+        if column in question_ids:
+            if text:
+                level = float(text)
+                if level != int(level):
+                    raise ValueError(f"Answer {text} to '{column}' is not a whole level.")
+                answers[column] = int(level)
+        elif text:
+            compact[column] = value
+    compact[SCHEMA_COLUMN] = schema.ref
+    compact[RESPONSES_COLUMN] = encode_answers(schema, answers)
+    return compact
+
+
+def is_compact(row: dict) -> bool:
+    return str(row.get(RESPONSES_COLUMN, "")).startswith(f"{ENCODING_VERSION}.") and bool(row.get(SCHEMA_COLUMN))
+
+
+# Wide form of a row: compact rows get one column per answered question back, other rows are returned as they are
+def expand_row(row: dict, schemas: RowSchemaRegistry = ROW_SCHEMAS) -> dict:
+    if not is_compact(row):
+        return row
+    answers = decode_answers(schemas.get(str(row[SCHEMA_COLUMN])), str(row[RESPONSES_COLUMN]))
+    expanded = {column: value for column, value in row.items() if column not in (SCHEMA_COLUMN, RESPONSES_COLUMN)}
+    expanded.update(answers)
+    return expanded
+
+
+# The row to write to the Sheets destination of an assessment in the configured format
+def sheet_row(questionnaire, row: dict, row_format: str = DEFAULT_ROW_FORMAT) -> dict:
+    if row_format not in ROW_FORMATS:
+        raise ValueError(f"Unknown row format '{row_format}', expected one of {', '.join(ROW_FORMATS)}.")
+    return encode_row(questionnaire, row) if row_format == "compact" else row
+
+
+# Compact rows of a wide sheet (header row first). Rows that are compact already, empty or
+# cannot be encoded are kept as they are; returns the header, the rows and the number converted.
+def migrate_values(questionnaire, values: List[List[str]]) -> Tuple[List[str], List[dict], int]:
+    if not values:
+        return [], [], 0
+    headers = values[0]
+    schema_columns = set(ROW_SCHEMAS.for_questionnaire(questionnaire).question_ids)
+    rows = []
+    migrated = 0
+    for number, cells in enumerate(values[1:], start=2):
+        row = {header: value for header, value in zip(headers, cells) if header}
+        if is_compact(row) or not any(str(row.get(column, "")).strip() for column in schema_columns):
+            rows.append({column: value for column, value in row.items() if str(value).strip()})
+            continue
+        try:
+            rows.append(encode_row(questionnaire, row))
+            migrated += 1
+        except ValueError as e:
+            logger.warning(f"Keeping row {number} wide: {e}")
+            rows.append({column: value for column, value in row.items() if str(value).strip()})
+    return compact_headers(headers, rows), rows, migrated
+
+
+# Header row for migrated rows: the original columns that still hold values, in their order, then the compact columns
+def compact_headers(headers: Iterable[str], rows: List[dict]) -> List[str]:
+    used = set(column for row in rows for column in row)
+    columns = [header for header in headers if header in used and header not in (SCHEMA_COLUMN, RESPONSES_COLUMN)]
+    columns += [column for row in rows for column in row if column not in columns
+                and column not in (SCHEMA_COLUMN, RESPONSES_COLUMN)]
+    return list(dict.fromkeys(columns)) + [SCHEMA_COLUMN, RESPONSES_COLUMN]
+
+
+# Copy a wide worksheet into a new worksheet of compact rows. The source is left untouched; once
+# the copy is checked, rename the worksheets so the destination's title points to the compact
+# one and set SHEETS_ROW_FORMAT=compact. Returns the new worksheet and (rows, migrated, cells before, cells after).
+def migrate_worksheet(questionnaire, spreadsheet, source, target_title: str,
+                      chunk_rows: int = MIGRATION_CHUNK_ROWS) -> Tuple[object, Tuple[int, int, int, int]]:
+    from gspread.utils import rowcol_to_a1
+
+    values = source.get_all_values()
+    headers, rows, migrated = migrate_values(questionnaire, values)
+    table = [headers] + [[row.get(header, "") for header in headers] for row in rows]
+    target = spreadsheet.add_worksheet(target_title, rows=len(table) + 1, cols=max(len(headers), 1))
+    for start in range(0, len(table), chunk_rows):
+        target.update(values=table[start:start + chunk_rows], range_name=rowcol_to_a1(start + 1, 1))
+    cells_before = len(values) * (len(values[0]) if values else 0)
+    return target, (len(rows), migrated, cells_before, len(table) * len(headers))
+
+
+def read_history(path: str) -> Iterable[dict]:
+    from batch_reports import read_rows
+
+    for _, row in read_rows(path):
+        yield row
+
+
+# Write the rows of a CSV/JSONL export in compact form to a CSV/JSONL file
+def migrate_file(questionnaire, input_path: str, output_path: str) -> Tuple[int, int]:
+    rows = list(read_history(input_path))
+    headers = list(dict.fromkeys(column for row in rows for column in row))
+    _, migrated_rows, migrated = migrate_values(questionnaire, [headers] + [[row.get(header, "") for header in headers]
+                                                                          for row in rows])
+    output_headers = compact_headers(headers, migrated_rows)
+    if os.path.splitext(output_path)[1].lower() in (".jsonl", ".ndjson"):
+        with open(output_path, 'w', encoding='utf-8') as file:
+            for row in migrated_rows:
+                file.write(json.dumps(row) + "\n")
+    else:
+        with open(output_path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=output_headers)
+            writer.writeheader()
+            writer.writerows(migrated_rows)
+    return len(migrated_rows), migrated
+
+
+def main():
+    from questionnaires import QUESTIONNAIRES
+
+    parser = argparse.ArgumentParser(description="Compact encoding of the assessment rows")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    migrate_export = subcommands.add_parser("migrate-file", help="convert an exported response sheet")
+    migrate_export.add_argument("questionnaire", help="questionnaire id of the export, e.g. erp or rnd")
+    migrate_export.add_argument("input", help="CSV/JSONL export of the response sheet")
+    migrate_export.add_argument("output", help="CSV/JSONL file to write")
+    migrate_sheet = subcommands.add_parser("migrate-sheet", help="copy a response worksheet into compact rows")
+    migrate_sheet.add_argument("destination", help="Sheets destination, e.g. erp or rnd")
+    migrate_sheet.add_argument("--service-account", required=True, help="service account key file (JSON)")
+    migrate_sheet.add_argument("--spreadsheet-key", default=None)
+    migrate_sheet.add_argument("--target", default=None, help="title of the new worksheet (default: <title>_compact)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "migrate-file":
+        rows, migrated = migrate_file(QUESTIONNAIRES.get(args.questionnaire), args.input, args.output)
+        logger.info(f"Wrote {rows} row(s) to {args.output}, {migrated} converted to the compact format.")
+        return
+
+    from sheets_client import SheetsClientPool
+    from sheets_scheduler import SHEETS_SCHEDULER
+
+    with open(args.service_account, 'r') as file:
+        service_account_info = json.load(file)
+    keys = {args.destination: args.spreadsheet_key} if args.spreadsheet_key else None
+    pool = SheetsClientPool(service_account_info, spreadsheet_keys=keys, scheduler=SHEETS_SCHEDULER)
+    source = pool.worksheet(args.destination)
+    target_title = args.target or f"{source.title}_compact"
+    target, (rows, migrated, cells_before, cells_after) = migrate_worksheet(
+        QUESTIONNAIRES.get(args.destination), pool.spreadsheet(args.destination), source, target_title)
+    logger.info(f"Copied {rows} row(s) of '{source.title}' to '{target.title}', {migrated} converted; "
+                f"{cells_before} cells before, {cells_after} after. Check the copy, rename the worksheets so the "
+                f"app writes to it, and set SHEETS_ROW_FORMAT=compact.")
+
+
+if __name__ == "__main__":
+    main()
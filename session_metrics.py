@@ -0,0 +1,59 @@
+import io
+import sys
+import threading
+import time
+from typing import Dict, Mapping
+
+# Sessions that have not run a script for this long (seconds) are dropped from the metric
+SESSION_MAX_AGE = 3600
+
+
+# Approximate memory held by a value: sys.getsizeof of the value and everything it contains,
+# counting the buffer of BytesIO objects (getsizeof only sees the wrapper)
+def estimate_size(value, _seen=None) -> int:
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, io.BytesIO):
+        size += value.getbuffer().nbytes
+    elif isinstance(value, Mapping):
+        size += sum(estimate_size(key, _seen) + estimate_size(item, _seen) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _seen) for item in value)
+    elif hasattr(value, "__dict__") and not isinstance(value, type):
+        size += estimate_size(vars(value), _seen)
+    return size
+
+
+# Latest session-state footprint of each live browser session
+class SessionFootprints:
+    def __init__(self, max_age: float = SESSION_MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, tuple] = {}
+
+    def record(self, session_id: str, state: Mapping) -> int:
+        size = estimate_size({key: state[key] for key in list(state.keys())})
+        now = time.monotonic()
+        with self._lock:
+            self._sessions[session_id] = (size, now)
+            for stale in [sid for sid, (_, seen) in self._sessions.items() if now - seen > self.max_age]:
+                del self._sessions[stale]
+        return size
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            sizes = [size for size, _ in self._sessions.values()]
+        return {
+            "sessions": len(sizes),
+            "total_bytes": sum(sizes),
+            "max_bytes": max(sizes, default=0),
+            "mean_bytes": sum(sizes) / len(sizes) if sizes else 0.0,
+        }
+
+
+SESSION_FOOTPRINTS = SessionFootprints()
@@ -0,0 +1,123 @@
+import logging
+import threading
+from typing import Callable, Dict, Mapping, Optional
+
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+
+# Destinations the app writes to: (spreadsheet title, worksheet title or None for sheet1)
+SHEET_DESTINATIONS = {
+    "strategy": ("client_inputs_strategytoolrnd", None),
+    "erp": ("Maturity_Assessment_Responses", "AssessmentData"),
+    "rnd": ("RnD_Maturity_Assessment_Responses", "AssessmentData"),
+}
+
+# HTTP status codes that mean the cached client's credentials are no longer accepted
+AUTH_ERROR_STATUS = (401, 403)
+
+
+# Build an authorized gspread client from the service account info in the Streamlit secrets.
+# gspread wraps the credentials in a google-auth session, which refreshes the access token
+# by itself when it expires, so one client can be kept for the lifetime of the process.
+def authorize_service_account(service_account_info: Mapping):
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+
+    with METRICS.span("stage_seconds", stage="sheets_authorize"):
+        credentials = ServiceAccountCredentials.from_json_keyfile_dict(dict(service_account_info), SCOPE)
+        return gspread.authorize(credentials)
+
+
+# Process-wide connection layer for Google Sheets.
+#
+# Holds one authorized client and resolves each destination's spreadsheet/worksheet only once.
+# Spreadsheets are opened by key when one is configured (st.secrets["sheet_keys"]); otherwise the
+# first open is by title and the resolved key is remembered, so later re-opens skip the Drive
+# title search. All methods are safe to call from the Streamlit script threads and the
+# background writer at the same time. With a sheets_scheduler.SheetsScheduler, the spreadsheets
+# and worksheets handed out make their API calls through it, within the account's quotas.
+class SheetsClientPool:
+    def __init__(self, service_account_info: Optional[Mapping] = None,
+                 client_factory: Optional[Callable[[], object]] = None,
+                 spreadsheet_keys: Optional[Mapping[str, str]] = None,
+                 destinations: Optional[Mapping] = None, scheduler=None):
+        if client_factory is None:
+            if service_account_info is None:
+                raise ValueError("Either service_account_info or client_factory is required.")
+            client_factory = lambda: authorize_service_account(service_account_info)
+        self.client_factory = client_factory
+        self.destinations = dict(destinations or SHEET_DESTINATIONS)
+        self.scheduler = scheduler
+        self._keys: Dict[str, str] = dict(spreadsheet_keys or {})
+        self._lock = threading.RLock()
+        self._client = None
+        self._spreadsheets: Dict[str, object] = {}
+        self._worksheets: Dict[str, object] = {}
+        self.stats = {"authorizations": 0, "spreadsheet_opens": 0, "worksheet_lookups": 0}
+
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = self.client_factory()
+                self.stats["authorizations"] += 1
+            return self._client
+
+    def spreadsheet(self, destination: str):
+        with self._lock:
+            spreadsheet = self._spreadsheets.get(destination)
+            if spreadsheet is None:
+                spreadsheet_title, _ = self.destinations[destination]
+                client = self.client()
+                if self.scheduler is not None:
+                    # Opening, and every call on the spreadsheet and its worksheets, counts for `destination`
+                    client = self.scheduler.wrap(client, destination)
+                key = self._keys.get(destination)
+                with METRICS.span("stage_seconds", stage="sheets_open"):
+                    if key:
+                        spreadsheet = client.open_by_key(key)
+                    else:
+                        spreadsheet = client.open(spreadsheet_title)
+                        self._keys[destination] = spreadsheet.id
+                self.stats["spreadsheet_opens"] += 1
+                self._spreadsheets[destination] = spreadsheet
+            return spreadsheet
+
+    def worksheet(self, destination: str):
+        with self._lock:
+            sheet = self._worksheets.get(destination)
+            if sheet is None:
+                _, worksheet_title = self.destinations[destination]
+                spreadsheet = self.spreadsheet(destination)
+                with METRICS.span("stage_seconds", stage="sheets_worksheet"):
+                    sheet = spreadsheet.sheet1 if worksheet_title is None else spreadsheet.worksheet(worksheet_title)
+                self.stats["worksheet_lookups"] += 1
+                self._worksheets[destination] = sheet
+            return sheet
+
+    # Drop cached handles; the next call resolves them again (by key, without a title search)
+    def invalidate(self, destination: Optional[str] = None):
+        with self._lock:
+            if destination is None:
+                self._spreadsheets.clear()
+                self._worksheets.clear()
+            else:
+                self._spreadsheets.pop(destination, None)
+                self._worksheets.pop(destination, None)
+
+    # Forget the client and all handles, forcing a fresh authorization on next use
+    def reset(self):
+        with self._lock:
+            self._client = None
+            self.invalidate()
+
+    # Called when a Sheets operation failed: stale handles are dropped, rejected credentials re-authorized
+    def handle_error(self, destination: str, error: Exception):
+        status = getattr(getattr(error, "response", None), "status_code", None)
+        if status in AUTH_ERROR_STATUS:
+            logger.warning(f"Sheets rejected the cached credentials ({status}); re-authorizing.")
+            self.reset()
+        else:
+            self.invalidate(destination)
@@ -0,0 +1,222 @@
+import itertools
+import json
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from gspread.exceptions import APIError, SpreadsheetNotFound, WorksheetNotFound
+from gspread.utils import a1_to_rowcol
+
+
+FAKE_WRITE_CALLS = frozenset({"append_row", "append_rows", "update", "add_cols", "add_rows", "add_worksheet"})
+
+
+# Just enough of a requests.Response for gspread's APIError
+class FakeResponse:
+    def __init__(self, status_code: int, message: str, retry_after: Optional[float] = None):
+        self.status_code = status_code
+        self.headers: Dict[str, str] = {} if retry_after is None else {"Retry-After": f"{retry_after:g}"}
+        self.text = json.dumps({"error": {"code": status_code, "message": message, "status": "UNAVAILABLE"}})
+
+    def json(self):
+        return json.loads(self.text)
+
+
+# Simulated Sheets API quota: at most `reads` read and `writes` write requests in any window of
+# `period` seconds, answering the rest with 429 like Google does. `error_rate` adds random 503s
+# (requests that were not processed), with a Retry-After header when `error_retry_after` is set.
+class FakeQuota:
+    def __init__(self, reads: int = 60, writes: int = 60, period: float = 60.0, error_rate: float = 0.0,
+                 error_retry_after: Optional[float] = None, seed: Optional[int] = None,
+                 clock=time.monotonic):
+        self.limits = {"read": reads, "write": writes}
+        self.period = period
+        self.error_rate = error_rate
+        self.error_retry_after = error_retry_after
+        self.clock = clock
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recent = {"read": deque(), "write": deque()}
+        self.accepted = {"read": 0, "write": 0}
+        self.rejected = {"read": 0, "write": 0}
+        self.errors = 0
+
+    # Raises APIError(429) when the call is over quota, APIError(503) for a simulated outage
+    def check(self, name: str):
+        quota = "write" if name in FAKE_WRITE_CALLS else "read"
+        now = self.clock()
+        with self._lock:
+            recent = self._recent[quota]
+            while recent and recent[0] <= now - self.period:
+                recent.popleft()
+            if len(recent) >= self.limits[quota]:
+                self.rejected[quota] += 1
+                raise APIError(FakeResponse(429, f"Quota exceeded for quota metric '{quota} requests'."))
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.errors += 1
+                raise APIError(FakeResponse(503, "The service is currently unavailable.", self.error_retry_after))
+            recent.append(now)
+            self.accepted[quota] += 1
+
+
+# In-memory stand-in for the parts of the gspread client the app uses.
+#
+# FakeSheetsBackend plays the role of the authorized client (open / open_by_key) and records
+# how often each API call was made, so the connection layer, the writers and the benchmarks
+# can run offline. An optional per-call latency simulates the round trip to Google, and an
+# optional FakeQuota the per-minute request quotas.
+class FakeSheetsBackend:
+    def __init__(self, latency: float = 0.0, quota: Optional[FakeQuota] = None):
+        self.latency = latency
+        self.quota = quota
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self._ids = itertools.count(1)
+        self._spreadsheets: Dict[str, "FakeSpreadsheet"] = {}
+
+    def _record(self, name: str):
+        if self.quota is not None:
+            self.quota.check(name)
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def create(self, title: str, worksheet_titles: Optional[List[str]] = None) -> "FakeSpreadsheet":
+        with self._lock:
+            spreadsheet = FakeSpreadsheet(self, f"fake-{next(self._ids)}", title)
+            for worksheet_title in worksheet_titles or ["Sheet1"]:
+                spreadsheet._add_worksheet(worksheet_title, rows=1000, cols=26)
+            self._spreadsheets[spreadsheet.id] = spreadsheet
+        return spreadsheet
+
+    # Create the three spreadsheets the app writes to
+    def create_app_spreadsheets(self) -> "FakeSheetsBackend":
+        from sheets_client import SHEET_DESTINATIONS
+
+        for spreadsheet_title, worksheet_title in SHEET_DESTINATIONS.values():
+            self.create(spreadsheet_title, [worksheet_title or "Sheet1"])
+        return self
+
+    def open(self, title: str) -> "FakeSpreadsheet":
+        self._record("open")
+        for spreadsheet in self._spreadsheets.values():
+            if spreadsheet.title == title:
+                return spreadsheet
+        raise SpreadsheetNotFound(title)
+
+    def open_by_key(self, key: str) -> "FakeSpreadsheet":
+        self._record("open_by_key")
+        try:
+            return self._spreadsheets[key]
+        except KeyError:
+            raise SpreadsheetNotFound(key)
+
+
+class FakeSpreadsheet:
+    def __init__(self, backend: FakeSheetsBackend, spreadsheet_id: str, title: str):
+        self.backend = backend
+        self.id = spreadsheet_id
+        self.title = title
+        self._worksheets: List["FakeWorksheet"] = []
+
+    @property
+    def sheet1(self) -> "FakeWorksheet":
+        self.backend._record("sheet1")
+        return self._worksheets[0]
+
+    def worksheet(self, title: str) -> "FakeWorksheet":
+        self.backend._record("worksheet")
+        for sheet in self._worksheets:
+            if sheet.title == title:
+                return sheet
+        raise WorksheetNotFound(title)
+
+    def worksheets(self) -> List["FakeWorksheet"]:
+        self.backend._record("worksheets")
+        return list(self._worksheets)
+
+    def add_worksheet(self, title: str, rows: int = 1000, cols: int = 26, index: Optional[int] = None) -> "FakeWorksheet":
+        self.backend._record("add_worksheet")
+        return self._add_worksheet(title, rows, cols)
+
+    def _add_worksheet(self, title: str, rows: int, cols: int) -> "FakeWorksheet":
+        if any(sheet.title == title for sheet in self._worksheets):
+            raise ValueError(f"A sheet with the name '{title}' already exists.")
+        sheet = FakeWorksheet(self, len(self._worksheets), title, rows, cols)
+        self._worksheets.append(sheet)
+        return sheet
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet: FakeSpreadsheet, sheet_id: int, title: str, rows: int, cols: int):
+        self.spreadsheet = spreadsheet
+        self.id = sheet_id
+        self.title = title
+        self.row_count = rows
+        self.col_count = cols
+        self.rows: List[List] = []
+
+    def _record(self, name: str):
+        self.spreadsheet.backend._record(name)
+
+    def get_all_values(self, **kwargs) -> List[List[str]]:
+        self._record("get_all_values")
+        width = max((len(row) for row in self.rows), default=0)
+        return [[str(value) for value in row] + [""] * (width - len(row)) for row in self.rows]
+
+    def row_values(self, row: int, **kwargs) -> List[str]:
+        self._record("row_values")
+        if row > len(self.rows):
+            return []
+        values = [str(value) for value in self.rows[row - 1]]
+        while values and values[-1] == "":
+            values.pop()
+        return values
+
+    def col_values(self, col: int, **kwargs) -> List[str]:
+        self._record("col_values")
+        values = [str(row[col - 1]) if len(row) >= col else "" for row in self.rows]
+        while values and values[-1] == "":
+            values.pop()
+        return values
+
+    def append_row(self, values: List, **kwargs):
+        self._record("append_row")
+        self._append([values])
+
+    def append_rows(self, values: List[List], **kwargs):
+        self._record("append_rows")
+        self._append(values)
+
+    def _append(self, rows: List[List]):
+        with self.spreadsheet.backend._lock:
+            for row in rows:
+                self.rows.append(list(row))
+                self.col_count = max(self.col_count, len(row))
+            self.row_count = max(self.row_count, len(self.rows))
+
+    def update(self, values: List[List] = None, range_name: str = None, **kwargs):
+        self._record("update")
+        start_row, start_col = a1_to_rowcol(range_name.split(":")[0])
+        with self.spreadsheet.backend._lock:
+            for row_offset, row_values in enumerate(values):
+                row_index = start_row - 1 + row_offset
+                if start_col - 1 + len(row_values) > self.col_count:
+                    raise ValueError("Range exceeds grid limits; add columns first.")
+                while len(self.rows) <= row_index:
+                    self.rows.append([])
+                row = self.rows[row_index]
+                needed = start_col - 1 + len(row_values)
+                row.extend([""] * (needed - len(row)))
+                row[start_col - 1:needed] = list(row_values)
+
+    def add_cols(self, cols: int):
+        self._record("add_cols")
+        self.col_count += cols
+
+    def add_rows(self, rows: int):
+        self._record("add_rows")
+        self.row_count += rows
@@ -0,0 +1,347 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from metrics import METRICS
+from row_encoding import expand_row
+from sheets_client import SHEET_DESTINATIONS
+
+logger = logging.getLogger(__name__)
+
+# Time bound of a partition: "" (none) or "month"
+DEFAULT_PARTITION_PERIOD = os.environ.get("SHEETS_PARTITION_PERIOD", "")
+# Size bound of a partition in data rows; 0 disables it
+DEFAULT_PARTITION_MAX_ROWS = int(os.environ.get("SHEETS_PARTITION_MAX_ROWS", "0"))
+PARTITION_PERIODS = ("", "month")
+MANIFEST_TITLE = "_partitions"
+MANIFEST_COLUMNS = ["destination", "worksheet", "period", "sequence", "min_timestamp", "max_timestamp", "status"]
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+OPEN, CLOSED, LEGACY = "open", "closed", "legacy"
+
+
+def partitioning_enabled(period: str = DEFAULT_PARTITION_PERIOD, max_rows: int = DEFAULT_PARTITION_MAX_ROWS) -> bool:
+    return bool(period or max_rows)
+
+
+# Submission time of a row; assessment rows use "Timestamp", Strategy Tool rows "timestamp"
+def record_timestamp(record: dict) -> str:
+    return str(record.get("Timestamp") or record.get("timestamp") or time.strftime(TIMESTAMP_FORMAT))
+
+
+def period_of(timestamp: str, period: str) -> str:
+    return timestamp[:7] if period == "month" else ""
+
+
+# First timestamp after a "YYYY-MM" period
+def period_end(period: str) -> str:
+    year, month = int(period[:4]), int(period[5:7])
+    year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return f"{year:04d}-{month:02d}-01 00:00:00"
+
+
+# One worksheet of a destination, as listed in the manifest. Timestamps are the rows' own
+# "YYYY-MM-DD HH:MM:SS" strings, which compare in time order; empty bounds are open.
+class Partition:
+    __slots__ = ("destination", "worksheet", "period", "sequence", "min_timestamp", "max_timestamp", "status",
+                 "manifest_row")
+
+    def __init__(self, destination: str, worksheet: str, period: str, sequence: int, min_timestamp: str,
+                 max_timestamp: str, status: str, manifest_row: int):
+        self.destination = destination
+        self.worksheet = worksheet
+        self.period = period
+        self.sequence = sequence
+        self.min_timestamp = min_timestamp
+        self.max_timestamp = max_timestamp
+        self.status = status
+        self.manifest_row = manifest_row
+
+    # Whether the partition can hold rows with since <= timestamp < until
+    def covers(self, since: Optional[str] = None, until: Optional[str] = None) -> bool:
+        upper = self.max_timestamp or (period_end(self.period) if self.period else "")
+        if since and upper and upper < since:
+            return False
+        if until and self.min_timestamp and self.min_timestamp >= until:
+            return False
+        return True
+
+    def values(self) -> List:
+        return [self.destination, self.worksheet, self.period, self.sequence, self.min_timestamp,
+                self.max_timestamp, self.status]
+
+
+# Routes the rows of each destination to time- and/or size-bounded worksheets.
+#
+# With period="month" a row goes to the tab of its own month (e.g. AssessmentData_2026-10), so
+# rows replayed late from the spool still land in the right month. With max_rows set, the open
+# tab is closed once it holds that many data rows and the next one (…_002) is created. The tabs
+# are listed in a "_partitions" worksheet of the same spreadsheet with the range of timestamps
+# they hold, so readers and exporters only download the ones that overlap the time they ask for.
+# The original single worksheet is registered as a "legacy" partition when the manifest is
+# created; it is still read, but no longer written to.
+#
+# Row counts are read once per tab and process and then counted locally, so the size bound is
+# approximate when several processes write to the same destination.
+#
+# A read_only router (the list/export CLI) never writes to the spreadsheet: without a manifest the
+# destination is read as its single original worksheet, and route() is refused.
+class PartitionRouter:
+    def __init__(self, open_spreadsheet: Callable[[str], object], destinations: Optional[dict] = None,
+                 period: str = DEFAULT_PARTITION_PERIOD, max_rows: int = DEFAULT_PARTITION_MAX_ROWS,
+                 read_only: bool = False):
+        if period not in PARTITION_PERIODS:
+            raise ValueError(f"Unknown partition period '{period}', expected one of {PARTITION_PERIODS}.")
+        self.open_spreadsheet = open_spreadsheet
+        self.destinations = dict(destinations or SHEET_DESTINATIONS)
+        self.period = period
+        self.max_rows = max_rows
+        self.read_only = read_only
+        self._lock = threading.RLock()
+        self._manifests: Dict[str, Tuple[object, List[Partition]]] = {}
+        self._sheets: Dict[Tuple[str, str], object] = {}
+        self._row_counts: Dict[Tuple[str, str], int] = {}
+
+    # Split a batch of records of `destination` by partition: [(schema key, worksheet, record indexes)]
+    def route(self, destination: str, records: List[dict]) -> List[Tuple[str, object, List[int]]]:
+        if self.read_only:
+            raise ValueError("A read-only PartitionRouter cannot route rows for writing.")
+        with self._lock:
+            groups: Dict[str, List[int]] = {}
+            earliest: Dict[str, str] = {}
+            for index, record in enumerate(records):
+                timestamp = record_timestamp(record)
+                partition = self._writable(destination, period_of(timestamp, self.period), timestamp)
+                groups.setdefault(partition.worksheet, []).append(index)
+                key = (destination, partition.worksheet)
+                self._row_counts[key] = self._row_counts.get(key, 0) + 1
+                if partition.worksheet not in earliest or timestamp < earliest[partition.worksheet]:
+                    earliest[partition.worksheet] = timestamp
+            for partition in self._partitions(destination):
+                timestamp = earliest.get(partition.worksheet)
+                if timestamp and (not partition.min_timestamp or timestamp < partition.min_timestamp):
+                    partition.min_timestamp = timestamp
+                    self._update_manifest(destination, partition)
+            return [(f"{destination}/{title}", self._sheet(destination, title), indexes)
+                    for title, indexes in groups.items()]
+
+    # Partitions of `destination` that can hold rows with since <= timestamp < until, oldest first
+    def partitions(self, destination: str, since: Optional[str] = None, until: Optional[str] = None) -> List[Partition]:
+        with self._lock:
+            return [partition for partition in self._partitions(destination) if partition.covers(since, until)]
+
+    # Rows of `destination` with since <= timestamp < until, downloading only the overlapping partitions.
+    # Compact rows (row_encoding) are expanded to one column per answered question.
+    def read_rows(self, destination: str, since: Optional[str] = None, until: Optional[str] = None) -> Iterator[dict]:
+        for partition in self.partitions(destination, since, until):
+            with self._lock:
+                sheet = self._sheet(destination, partition.worksheet)
+            values = sheet.get_all_values()
+            if not values:
+                continue
+            headers = values[0]
+            for cells in values[1:]:
+                row = {header: value for header, value in zip(headers, cells) if header and value != ""}
+                timestamp = record_timestamp(row)
+                if (since and timestamp < since) or (until and timestamp >= until):
+                    continue
+                yield expand_row(row)
+
+    # Drop cached worksheets, manifests and row counts, e.g. after a failed write
+    def invalidate(self, destination: Optional[str] = None):
+        with self._lock:
+            for cache in (self._sheets, self._row_counts):
+                for key in [key for key in cache if destination is None or key[0] == destination]:
+                    del cache[key]
+            if destination is None:
+                self._manifests.clear()
+            else:
+                self._manifests.pop(destination, None)
+
+    def _base_title(self, destination: str) -> str:
+        return self.destinations[destination][1] or "Responses"
+
+    def _partitions(self, destination: str) -> List[Partition]:
+        return self._manifest(destination)[1]
+
+    def _manifest(self, destination: str) -> Tuple[object, List[Partition]]:
+        manifest = self._manifests.get(destination)
+        if manifest is None:
+            manifest = self._manifests[destination] = self._load_manifest(destination)
+        return manifest
+
+    def _load_manifest(self, destination: str) -> Tuple[object, List[Partition]]:
+        from gspread.exceptions import WorksheetNotFound
+
+        spreadsheet = self.open_spreadsheet(destination)
+        try:
+            sheet = spreadsheet.worksheet(MANIFEST_TITLE)
+        except WorksheetNotFound:
+            if self.read_only:
+                return None, self._legacy_partitions(destination, spreadsheet)
+            return self._create_manifest(destination, spreadsheet)
+        partitions = []
+        seen = set()
+        for number, cells in enumerate(sheet.get_all_values()[1:], start=2):
+            entry = dict(zip(MANIFEST_COLUMNS, cells + [""] * len(MANIFEST_COLUMNS)))
+            # Two processes creating the same partition at once may both list it; the first entry counts
+            if entry["destination"] == destination and entry["worksheet"] not in seen:
+                seen.add(entry["worksheet"])
+                partitions.append(Partition(destination, entry["worksheet"], entry["period"],
+                                            int(entry["sequence"] or 0), entry["min_timestamp"],
+                                            entry["max_timestamp"], entry["status"], number))
+        return sheet, partitions
+
+    # New manifest; the destination's existing worksheet becomes its legacy partition
+    def _create_manifest(self, destination: str, spreadsheet) -> Tuple[object, List[Partition]]:
+        partitions = self._legacy_partitions(destination, spreadsheet, time.strftime(TIMESTAMP_FORMAT))
+        sheet = spreadsheet.add_worksheet(MANIFEST_TITLE, rows=100, cols=len(MANIFEST_COLUMNS))
+        sheet.update(values=[MANIFEST_COLUMNS], range_name="A1")
+        if partitions:
+            sheet.append_rows([partitions[0].values()])
+        logger.info(f"Created the partition manifest of '{destination}'"
+                    f"{f', legacy worksheet {partitions[0].worksheet}' if partitions else ''}.")
+        return sheet, partitions
+
+    # The destination's original worksheet as a legacy partition, if it holds anything
+    def _legacy_partitions(self, destination: str, spreadsheet, max_timestamp: str = "") -> List[Partition]:
+        _, worksheet_title = self.destinations[destination]
+        legacy = spreadsheet.sheet1 if worksheet_title is None else self._find_worksheet(spreadsheet, worksheet_title)
+        if legacy is None or not legacy.row_values(1):
+            return []
+        return [Partition(destination, legacy.title, "", 0, "", max_timestamp, LEGACY, 2)]
+
+    @staticmethod
+    def _find_worksheet(spreadsheet, title: str):
+        from gspread.exceptions import WorksheetNotFound
+
+        try:
+            return spreadsheet.worksheet(title)
+        except WorksheetNotFound:
+            return None
+
+    # The open partition for a row of `period`, rolled over when it is full
+    def _writable(self, destination: str, period: str, timestamp: str) -> Partition:
+        candidates = [partition for partition in self._partitions(destination)
+                      if partition.status != LEGACY and partition.period == period]
+        current = candidates[-1] if candidates else None
+        if current is not None and current.status == OPEN:
+            if not self.max_rows or self._row_count(destination, current) < self.max_rows:
+                return current
+            current.status = CLOSED
+            current.max_timestamp = self._newest_timestamp(destination, current)
+            self._update_manifest(destination, current)
+        return self._create_partition(destination, period, (current.sequence if current else 0) + 1, timestamp)
+
+    def _partition_title(self, destination: str, period: str, sequence: int) -> str:
+        parts = [self._base_title(destination)]
+        if period:
+            parts.append(period)
+        if self.max_rows:
+            parts.append(f"{sequence:03d}")
+        return "_".join(parts)
+
+    def _create_partition(self, destination: str, period: str, sequence: int, timestamp: str) -> Partition:
+        spreadsheet = self.open_spreadsheet(destination)
+        title = self._partition_title(destination, period, sequence)
+        with METRICS.span("stage_seconds", stage="sheets_partition_create"):
+            sheet = self._find_worksheet(spreadsheet, title)
+            if sheet is not None:
+                # Created by another process since the manifest was read
+                self._manifests.pop(destination, None)
+                existing = next((p for p in self._partitions(destination) if p.worksheet == title), None)
+                if existing is not None:
+                    self._sheets[(destination, title)] = sheet
+                    return existing
+            else:
+                # Data rows plus the header; appends beyond it grow the grid
+                sheet = spreadsheet.add_worksheet(title, rows=min(self.max_rows or 1000, 1000) + 1, cols=26)
+            manifest_sheet, partitions = self._manifest(destination)
+            partition = Partition(destination, title, period, sequence, timestamp, "", OPEN, 0)
+            manifest_sheet.append_rows([partition.values()])
+            # Row of the new entry, found by title since other processes may append to the manifest too
+            partition.manifest_row = manifest_sheet.col_values(2).index(title) + 1
+        partitions.append(partition)
+        self._sheets[(destination, title)] = sheet
+        self._row_counts[(destination, title)] = 0
+        logger.info(f"Created partition '{title}' of '{destination}'.")
+        return partition
+
+    def _sheet(self, destination: str, title: str):
+        sheet = self._sheets.get((destination, title))
+        if sheet is None:
+            sheet = self._sheets[(destination, title)] = self.open_spreadsheet(destination).worksheet(title)
+        return sheet
+
+    # Data rows of a partition: read once (column A, minus the header) and counted locally afterwards
+    def _row_count(self, destination: str, partition: Partition) -> int:
+        key = (destination, partition.worksheet)
+        if key not in self._row_counts:
+            self._row_counts[key] = max(len(self._sheet(destination, partition.worksheet).col_values(1)) - 1, 0)
+        return self._row_counts[key]
+
+    # Newest timestamp written to a partition, read from its own timestamp column when it is closed
+    def _newest_timestamp(self, destination: str, partition: Partition) -> str:
+        sheet = self._sheet(destination, partition.worksheet)
+        headers = sheet.row_values(1)
+        column = next((index for index, header in enumerate(headers, start=1)
+                       if header in ("Timestamp", "timestamp")), None)
+        timestamps = sheet.col_values(column)[1:] if column else []
+        return max(timestamps, default="") or time.strftime(TIMESTAMP_FORMAT)
+
+    def _update_manifest(self, destination: str, partition: Partition):
+        manifest_sheet, _ = self._manifest(destination)
+        manifest_sheet.update(values=[partition.values()], range_name=f"A{partition.manifest_row}")
+
+
+def write_csv(rows: List[dict], path: str):
+    headers = list(dict.fromkeys(column for row in rows for column in row))
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=headers)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    from sheets_client import SheetsClientPool
+    from sheets_scheduler import SHEETS_SCHEDULER
+
+    parser = argparse.ArgumentParser(description="Partitioned response worksheets")
+    parser.add_argument("--service-account", required=True, help="service account key file (JSON)")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    listing = subcommands.add_parser("list", help="print the partitions of a destination")
+    listing.add_argument("destination", choices=sorted(SHEET_DESTINATIONS))
+    export = subcommands.add_parser("export", help="export the rows of a time range to CSV")
+    export.add_argument("destination", choices=sorted(SHEET_DESTINATIONS))
+    export.add_argument("-o", "--output", required=True)
+    for subcommand in (listing, export):
+        subcommand.add_argument("--since", type=datetime.fromisoformat, default=None, help="e.g. 2026-01-01")
+        subcommand.add_argument("--until", type=datetime.fromisoformat, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with open(args.service_account, 'r') as file:
+        pool = SheetsClientPool(json.load(file), scheduler=SHEETS_SCHEDULER)
+    router = PartitionRouter(pool.spreadsheet, read_only=True)
+    since = args.since.strftime(TIMESTAMP_FORMAT) if args.since else None
+    until = args.until.strftime(TIMESTAMP_FORMAT) if args.until else None
+    if args.command == "list":
+        for partition in router.partitions(args.destination, since, until):
+            print(f"{partition.worksheet:40s} {partition.status:7s} {partition.min_timestamp or '-':19s} .. "
+                  f"{partition.max_timestamp or (period_end(partition.period) if partition.period else '-')}")
+        return
+    start = time.perf_counter()
+    rows = list(router.read_rows(args.destination, since, until))
+    write_csv(rows, args.output)
+    logger.info(f"Exported {len(rows)} row(s) of '{args.destination}' from "
+                f"{len(router.partitions(args.destination, since, until))} partition(s) to {args.output} "
+                f"in {time.perf_counter() - start:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# Per-minute request quotas of the service account; the Sheets API allows 60 read and 60 write
+# requests per minute and user, and all destinations share the one account
+DEFAULT_READ_QUOTA = int(os.environ.get("SHEETS_READ_QUOTA_PER_MINUTE", "60"))
+DEFAULT_WRITE_QUOTA = int(os.environ.get("SHEETS_WRITE_QUOTA_PER_MINUTE", "60"))
+# Retries of a request answered with 429/5xx, and the longest a caller waits for its turn
+DEFAULT_MAX_RETRIES = int(os.environ.get("SHEETS_MAX_RETRIES", "5"))
+DEFAULT_MAX_WAIT = float(os.environ.get("SHEETS_MAX_WAIT", "120"))
+QUOTA_PERIOD = 60.0
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 64.0
+# Answers after which a read is sent again; writes are only resent when they cannot have been applied
+RETRY_STATUS = (429, 500, 502, 503, 504)
+READ, WRITE = "read", "write"
+
+# gspread client, spreadsheet and worksheet methods by quota class; other attributes pass through
+READ_METHODS = frozenset({
+    "open", "open_by_key", "open_by_url", "worksheet", "worksheets", "get_worksheet", "sheet1",
+    "get_all_values", "get_all_records", "get_values", "get", "batch_get", "row_values", "col_values",
+    "acell", "cell", "find", "findall", "fetch_sheet_metadata",
+})
+WRITE_METHODS = frozenset({
+    "append_row", "append_rows", "update", "batch_update", "update_acell", "update_cell", "update_cells",
+    "add_worksheet", "del_worksheet", "duplicate_sheet", "add_rows", "add_cols", "resize", "insert_row",
+    "insert_rows", "delete_rows", "delete_columns", "clear", "batch_clear", "format", "update_title",
+})
+# Calls returning spreadsheets/worksheets, which are wrapped so their own calls are scheduled too
+HANDLE_METHODS = frozenset({"open", "open_by_key", "open_by_url", "worksheet", "worksheets", "get_worksheet",
+                            "sheet1", "add_worksheet", "duplicate_sheet"})
+# Properties that fetch from the API (gspread's Spreadsheet.sheet1)
+HANDLE_PROPERTIES = frozenset({"sheet1"})
+
+
+def quota_class(method: str) -> Optional[str]:
+    if method in READ_METHODS:
+        return READ
+    if method in WRITE_METHODS:
+        return WRITE
+    return None
+
+
+def error_status(error: Exception) -> Optional[int]:
+    return getattr(getattr(error, "response", None), "status_code", None)
+
+
+# Whether a request answered with `status` may be sent again. A 429 was rejected before anything was
+# applied. Other 5xx may come after the server applied a write, and appends and add_worksheet are
+# not idempotent (a resent append duplicates the rows), so writes are only resent on a 503 with
+# Retry-After, which says the request was not processed.
+def retryable(quota: str, status: Optional[int], delay: Optional[float]) -> bool:
+    if status == 429:
+        return True
+    if quota == WRITE:
+        return status == 503 and delay is not None
+    return status in RETRY_STATUS
+
+
+# Seconds from a numeric Retry-After header of the error's response, if any
+def retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+# Requests of one quota class. The bucket holds a burst of a sixth of the quota and refills with
+# the rest over the period, so no window of `period` seconds ever sees more than `limit` requests.
+# Not thread-safe on its own; SheetsScheduler only touches it under its condition lock.
+class TokenBucket:
+    def __init__(self, limit: int, period: float = QUOTA_PERIOD, clock: Callable[[], float] = time.monotonic):
+        self.limit = limit
+        self.clock = clock
+        self.capacity = max(1, limit // 6)
+        self.rate = max(limit - self.capacity, 1) / period
+        self.tokens = float(self.capacity)
+        self.updated = clock()
+        self.paused_until = 0.0
+
+    # Take a token: 0.0 if one was available, otherwise the seconds until the next one
+    def take(self) -> float:
+        now = self.clock()
+        if now < self.paused_until:
+            return self.paused_until - now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    # Hold every request of the class back after a 429; the bucket refills from empty afterwards
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, self.clock() + seconds)
+        self.tokens = 0.0
+        self.updated = self.paused_until
+
+
+# A read in flight that identical concurrent reads wait for instead of sending their own
+class _Flight:
+    __slots__ = ("done", "result", "error", "followers")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[Exception] = None
+        self.followers = 0
+
+
+# Central gate for Google Sheets API calls of the process.
+#
+# Every request takes a token from the bucket of its quota class (read or write) first. Callers
+# waiting for a token queue per destination, and the destinations take turns (round robin), so a
+# burst of ERP submissions cannot hold back the Strategy Tool or R&D behind it. Requests answered
+# with 429 (and reads answered with 5xx) are retried with exponential backoff and jitter, see
+# retryable(); a 429 also pauses the whole quota class, since it means the shared account is over
+# quota (e.g. because of another process).
+# Identical reads of the same spreadsheet/worksheet in flight at the same time are sent once and
+# share the answer, unless a write to that handle started in between.
+#
+# Handles wrapped with wrap() (SheetsClientPool does this for its spreadsheets) schedule their
+# calls, and those of the worksheets they return, through the scheduler. Queue depth, throttle
+# time, retries and coalesced reads are exported through METRICS (metrics_samples collector).
+class SheetsScheduler:
+    def __init__(self, read_quota: int = DEFAULT_READ_QUOTA, write_quota: int = DEFAULT_WRITE_QUOTA,
+                 period: float = QUOTA_PERIOD, max_retries: int = DEFAULT_MAX_RETRIES,
+                 max_wait: float = DEFAULT_MAX_WAIT, backoff_base: float = BACKOFF_BASE,
+                 backoff_cap: float = BACKOFF_CAP, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.buckets = {READ: TokenBucket(read_quota, period, clock), WRITE: TokenBucket(write_quota, period, clock)}
+        self.max_retries = max_retries
+        self.max_wait = max_wait
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._cond = threading.Condition()
+        # Quota class -> destination -> waiting tickets, and the destinations in turn order
+        self._waiting: Dict[str, Dict[str, deque]] = {quota: {} for quota in self.buckets}
+        self._turns: Dict[str, deque] = {quota: deque() for quota in self.buckets}
+        self._destinations = set()
+        self._inflight: Dict[Tuple, _Flight] = {}
+        # Writes started per handle (by id); part of the coalescing key, so reads never join an older read
+        self._generations: Dict[int, int] = {}
+        self._stats = {"requests": 0, "failures": 0, "retries": 0, "rate_limited": 0, "coalesced": 0,
+                       "throttled_seconds": 0.0, "max_queue_depth": 0}
+
+    def wrap(self, target, destination: str) -> "ScheduledHandle":
+        return ScheduledHandle(target, self, destination)
+
+    # Call `method` of `target` (a gspread client, spreadsheet or worksheet) for `destination`
+    def request(self, destination: str, target, method: str, args: tuple = (), kwargs: Optional[dict] = None):
+        kwargs = kwargs or {}
+        quota = quota_class(method)
+        if method in HANDLE_PROPERTIES:
+            function = lambda: getattr(target, method)
+        else:
+            function = lambda: getattr(target, method)(*args, **kwargs)
+        if quota == WRITE:
+            result = self._write(destination, target, function)
+        else:
+            result = self._read(destination, target, method, args, kwargs, function)
+        if method in HANDLE_METHODS:
+            if isinstance(result, list):
+                return [self.wrap(handle, destination) for handle in result]
+            return self.wrap(result, destination)
+        return result
+
+    # Run `function` with a token of `quota`, retrying 429/5xx answers with backoff
+    def call(self, destination: str, quota: str, function: Callable):
+        attempt = 0
+        while True:
+            self._acquire(quota, destination)
+            try:
+                result = function()
+            except Exception as e:
+                status = error_status(e)
+                delay = retry_after(e)
+                if not retryable(quota, status, delay) or attempt >= self.max_retries:
+                    self._count(quota, destination, "error")
+                    raise
+                if delay is None:
+                    # Exponential backoff with jitter, so callers throttled together do not retry together
+                    delay = min(self.backoff_cap, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+                attempt += 1
+                with self._cond:
+                    self._stats["retries"] += 1
+                    if status == 429:
+                        self._stats["rate_limited"] += 1
+                        self.buckets[quota].pause(delay)
+                METRICS.inc("sheets_retries_total", 1, (("quota", quota), ("status", str(status))))
+                logger.warning(f"Sheets {quota} request for '{destination}' failed with {status}, "
+                               f"retry {attempt}/{self.max_retries} in {delay:.1f}s.")
+                # After a 429 the paused bucket makes the retry wait; other errors only hold back this caller
+                if status != 429:
+                    self._sleep(delay)
+                continue
+            self._count(quota, destination, "ok")
+            return result
+
+    # Let waiting callers look at the clock again, e.g. after a test advanced an injected clock
+    def wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    # Wait `seconds` on the scheduler's clock; wake() makes the waiter look at the clock again
+    def _sleep(self, seconds: float):
+        until = self.clock() + seconds
+        with self._cond:
+            while True:
+                remaining = until - self.clock()
+                if remaining <= 0:
+                    return
+                self._cond.wait(remaining)
+
+    def queue_depth(self, quota: Optional[str] = None, destination: Optional[str] = None) -> int:
+        with self._cond:
+            return sum(len(queue) for name, queues in self._waiting.items() if quota in (None, name)
+                       for key, queue in queues.items() if destination in (None, key))
+
+    def stats(self) -> dict:
+        with self._cond:
+            return dict(self._stats)
+
+    # Queue depth gauges and scheduler counters for the metrics export
+    def metrics_samples(self) -> List[Tuple[str, str, dict, float]]:
+        with self._cond:
+            samples = [("sheets_queue_depth", "gauge", {"quota": quota, "destination": destination},
+                        len(self._waiting[quota].get(destination, ())))
+                       for quota in self.buckets for destination in sorted(self._destinations)]
+            samples.append(("sheets_coalesced_reads_total", "counter", {}, self._stats["coalesced"]))
+            samples.append(("sheets_throttle_seconds_total", "counter", {}, self._stats["throttled_seconds"]))
+        return samples
+
+    def _write(self, destination: str, target, function: Callable):
+        self._bump_generation(target)
+        try:
+            return self.call(destination, WRITE, function)
+        finally:
+            self._bump_generation(target)
+
+    def _bump_generation(self, target):
+        with self._cond:
+            self._generations[id(target)] = self._generations.get(id(target), 0) + 1
+
+    def _read(self, destination: str, target, method: str, args: tuple, kwargs: dict, function: Callable):
+        try:
+            with self._cond:
+                key = (id(target), self._generations.get(id(target), 0), method, args,
+                       tuple(sorted(kwargs.items())))
+                flight = self._inflight.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._inflight[key] = _Flight()
+                else:
+                    flight.followers += 1
+                    self._stats["coalesced"] += 1
+        except TypeError:
+            # Unhashable arguments are never coalesced
+            return self.call(destination, READ, function)
+
+        if not leader:
+            if not flight.done.wait(self.max_wait):
+                raise TimeoutError(f"Timed out waiting for a coalesced Sheets {method} call.")
+            if flight.error is not None:
+                raise flight.error
+            # Each caller gets its own rows, as from a request of its own
+            if isinstance(flight.result, list):
+                return [list(item) if isinstance(item, list) else item for item in flight.result]
+            return flight.result
+
+        try:
+            flight.result = self.call(destination, READ, function)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._cond:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    # Wait until `destination` has its turn and a token of `quota` is available; returns the seconds waited
+    def _acquire(self, quota: str, destination: str) -> float:
+        bucket = self.buckets[quota]
+        ticket = object()
+        start = self.clock()
+        deadline = start + self.max_wait
+        with self._cond:
+            self._destinations.add(destination)
+            queue = self._waiting[quota].setdefault(destination, deque())
+            queue.append(ticket)
+            turns = self._turns[quota]
+            if destination not in turns:
+                turns.append(destination)
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"],
+                                                 sum(len(waiting) for waiting in self._waiting[quota].values()))
+            granted = False
+            try:
+                while True:
+                    wait = None
+                    if turns[0] == destination and queue[0] is ticket:
+                        wait = bucket.take()
+                        if wait == 0.0:
+                            granted = True
+                            break
+                    remaining = deadline - self.clock()
+                    if remaining <= 0:
+                        raise TimeoutError(f"Waited more than {self.max_wait:.0f}s for the Sheets {quota} quota.")
+                    self._cond.wait(remaining if wait is None else min(wait, remaining))
+            finally:
+                queue.remove(ticket)
+                if granted or not queue:
+                    # The destination goes to the back of the line, or leaves it when nobody else waits
+                    turns.remove(destination)
+                    if queue:
+                        turns.append(destination)
+                if not queue:
+                    del self._waiting[quota][destination]
+                self._cond.notify_all()
+            waited = self.clock() - start
+            self._stats["throttled_seconds"] += waited
+        if METRICS.enabled:
+            METRICS.observe("sheets_throttle_seconds", waited, (("destination", destination), ("quota", quota)))
+        return waited
+
+    def _count(self, quota: str, destination: str, result: str):
+        with self._cond:
+            self._stats["requests"] += 1
+            if result != "ok":
+                self._stats["failures"] += 1
+        METRICS.inc("sheets_requests_total", 1, (("destination", destination), ("quota", quota), ("result", result)))
+
+
+# A gspread client, spreadsheet or worksheet whose API calls go through a SheetsScheduler;
+# plain attributes (title, id, col_count, ...) are read from the wrapped object
+class ScheduledHandle:
+    __slots__ = ("_target", "_scheduler", "_destination")
+
+    def __init__(self, target, scheduler: SheetsScheduler, destination: str):
+        self._target = target
+        self._scheduler = scheduler
+        self._destination = destination
+
+    def __getattr__(self, name: str):
+        if name in HANDLE_PROPERTIES:
+            return self._scheduler.request(self._destination, self._target, name)
+        value = getattr(self._target, name)
+        if quota_class(name) is None or not callable(value):
+            return value
+
+        def scheduled(*args, **kwargs):
+            return self._scheduler.request(self._destination, self._target, name, args, kwargs)
+        return scheduled
+
+    def __repr__(self) -> str:
+        return f"<scheduled {self._target!r} for '{self._destination}'>"
+
+
+SHEETS_SCHEDULER = SheetsScheduler()
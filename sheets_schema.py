@@ -0,0 +1,77 @@
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+
+# Cached column layout of each destination worksheet.
+#
+# Only row 1 is ever read (row_values(1)), once per process and destination. Each user_data key
+# maps to its header's column index, so rows are written aligned to the headers whatever order
+# or subset of questions a submission contains. Keys without a column are appended to the
+# header row in place; the data rows below are never downloaded.
+class ColumnSchemaRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._headers: Dict[str, List[str]] = {}
+        self._index: Dict[str, Dict[str, int]] = {}
+
+    def headers(self, destination: str, sheet) -> List[str]:
+        with self._lock:
+            return list(self._load(destination, sheet))
+
+    # Turn submissions into rows ordered like the sheet's header row, adding columns for new keys
+    def align_rows(self, destination: str, sheet, records: List[dict]) -> List[List]:
+        with self._lock:
+            self._load(destination, sheet)
+            index = self._index[destination]
+            new_keys = []
+            for record in records:
+                for key in record:
+                    if key not in index and key not in new_keys:
+                        new_keys.append(key)
+            if new_keys:
+                self._add_columns(destination, sheet, new_keys)
+            headers = self._headers[destination]
+            return [[record.get(header, "") for header in headers] for record in records]
+
+    def invalidate(self, destination: Optional[str] = None):
+        with self._lock:
+            if destination is None:
+                self._headers.clear()
+                self._index.clear()
+            else:
+                self._headers.pop(destination, None)
+                self._index.pop(destination, None)
+
+    def _load(self, destination: str, sheet) -> List[str]:
+        if destination not in self._headers:
+            with METRICS.span("stage_seconds", stage="sheets_read_headers"):
+                headers = sheet.row_values(1)
+            self._set_headers(destination, headers)
+        return self._headers[destination]
+
+    def _set_headers(self, destination: str, headers: List[str]):
+        self._headers[destination] = list(headers)
+        self._index[destination] = {header: i for i, header in enumerate(headers)}
+
+    def _add_columns(self, destination: str, sheet, new_keys: List[str]):
+        from gspread.utils import rowcol_to_a1
+
+        # Another process may have extended the header row since we cached it; re-read row 1 only
+        with METRICS.span("stage_seconds", stage="sheets_read_headers"):
+            headers = sheet.row_values(1)
+        self._set_headers(destination, headers)
+        missing = [key for key in new_keys if key not in self._index[destination]]
+        if not missing:
+            return
+
+        needed_cols = len(headers) + len(missing)
+        if sheet.col_count < needed_cols:
+            sheet.add_cols(needed_cols - sheet.col_count)
+        sheet.update(range_name=rowcol_to_a1(1, len(headers) + 1), values=[missing])
+        self._set_headers(destination, headers + missing)
+        logger.info(f"Added {len(missing)} column(s) to '{destination}': {', '.join(missing)}")
@@ -0,0 +1,178 @@
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from metrics import METRICS
+from sheets_schema import ColumnSchemaRegistry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPOOL_PATH = os.environ.get("SHEETS_SPOOL_PATH", os.path.join("local_data", "sheets_spool.sqlite3"))
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_FLUSH_INTERVAL = 5.0
+MAX_RETRY_BACKOFF = 300.0
+
+
+# Write-behind queue for Google Sheets submissions.
+#
+# Every submission is first committed to a local SQLite spool, so the Streamlit rerun
+# returns as soon as the row is on disk. A background thread drains the spool with one
+# append_rows call per destination (per partition worksheet when a PartitionRouter spreads the
+# destination over several worksheets), either when batch_size rows are pending or every
+# flush_interval seconds. Rows are only deleted from the spool after Sheets accepted them,
+# so quota errors and process restarts never lose a submission (delivery is at-least-once:
+# a crash between the append and the delete can write a row twice).
+class SheetsWriteBehind:
+    def __init__(self, open_worksheet: Callable[[str], object], spool_path: str = DEFAULT_SPOOL_PATH,
+                 batch_size: int = DEFAULT_BATCH_SIZE, flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 on_flush_error: Optional[Callable[[str, Exception], None]] = None,
+                 schema: Optional[ColumnSchemaRegistry] = None, partitions=None):
+        self.open_worksheet = open_worksheet
+        # Optional sheets_partitions.PartitionRouter spreading each destination over several worksheets
+        self.partitions = partitions
+        self.on_flush_error = on_flush_error
+        self.schema = schema or ColumnSchemaRegistry()
+        self.spool_path = spool_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        spool_dir = os.path.dirname(spool_path)
+        if spool_dir:
+            os.makedirs(spool_dir, exist_ok=True)
+        self._conn = sqlite3.connect(spool_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS spool ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "destination TEXT NOT NULL, "
+            "payload TEXT NOT NULL, "
+            "enqueued_at REAL NOT NULL)"
+        )
+        self._db_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._retry_after: Dict[str, float] = {}
+        self._failures: Dict[str, int] = {}
+
+    # Start the background flusher; rows left in the spool by a previous process are replayed first
+    def start(self):
+        if self._thread is not None:
+            return
+        pending = self.pending_count()
+        if pending:
+            logger.info(f"Replaying {pending} spooled Sheets row(s) from {self.spool_path}.")
+        self._thread = threading.Thread(target=self._run, name="sheets-write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    # Stop the flusher and make a last attempt to drain the spool
+    def stop(self, timeout: float = 10.0):
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        try:
+            self.flush(ignore_backoff=True)
+        except Exception as e:
+            logger.error(f"Final Sheets flush failed, rows stay spooled: {e}")
+
+    # Durably record a submission; the call returns once the row is committed to the spool
+    def enqueue(self, destination: str, user_data: dict):
+        payload = json.dumps(user_data, default=str)
+        with self._db_lock:
+            self._conn.execute(
+                "INSERT INTO spool (destination, payload, enqueued_at) VALUES (?, ?, ?)",
+                (destination, payload, time.time())
+            )
+        if self.pending_count(destination) >= self.batch_size:
+            self._wakeup.set()
+
+    def pending_count(self, destination: Optional[str] = None) -> int:
+        with self._db_lock:
+            if destination is None:
+                row = self._conn.execute("SELECT COUNT(*) FROM spool").fetchone()
+            else:
+                row = self._conn.execute("SELECT COUNT(*) FROM spool WHERE destination = ?", (destination,)).fetchone()
+        return row[0]
+
+    # Drain everything that is currently spooled; returns the number of rows written
+    def flush(self, ignore_backoff: bool = False) -> int:
+        written = 0
+        with self._flush_lock:
+            for destination in self._pending_destinations():
+                if not ignore_backoff and time.monotonic() < self._retry_after.get(destination, 0.0):
+                    continue
+                while True:
+                    count = self._flush_batch(destination)
+                    written += count
+                    if count < self.batch_size:
+                        break
+        return written
+
+    def _pending_destinations(self) -> List[str]:
+        with self._db_lock:
+            rows = self._conn.execute("SELECT DISTINCT destination FROM spool ORDER BY destination").fetchall()
+        return [row[0] for row in rows]
+
+    def _flush_batch(self, destination: str) -> int:
+        with self._db_lock:
+            batch = self._conn.execute(
+                "SELECT id, payload FROM spool WHERE destination = ? ORDER BY id LIMIT ?",
+                (destination, self.batch_size)
+            ).fetchall()
+        if not batch:
+            return 0
+
+        records = [json.loads(payload) for _, payload in batch]
+        written = 0
+        schema_key = destination
+        try:
+            # (schema key, worksheet, indexes of the records it gets); one group unless partitioned
+            if self.partitions is None:
+                groups = [(destination, self.open_worksheet(destination), list(range(len(records))))]
+            else:
+                groups = self.partitions.route(destination, records)
+            for schema_key, sheet, indexes in groups:
+                rows = self.schema.align_rows(schema_key, sheet, [records[index] for index in indexes])
+                with METRICS.span("stage_seconds", stage="sheets_append_rows"):
+                    sheet.append_rows(rows)
+                # Rows of a worksheet that accepted them are not retried if a later group fails
+                with self._db_lock:
+                    self._conn.executemany("DELETE FROM spool WHERE id = ?", [(batch[index][0],) for index in indexes])
+                written += len(indexes)
+        except Exception as e:
+            failures = self._failures.get(destination, 0) + 1
+            self._failures[destination] = failures
+            backoff = min(self.flush_interval * (2 ** failures), MAX_RETRY_BACKOFF)
+            self._retry_after[destination] = time.monotonic() + backoff
+            logger.error(f"Flushing {len(batch) - written} row(s) to '{destination}' failed, "
+                         f"retrying in {backoff:.0f}s: {e}")
+            self.schema.invalidate(schema_key)
+            if self.partitions is not None:
+                self.partitions.invalidate(destination)
+            if self.on_flush_error is not None:
+                self.on_flush_error(destination, e)
+            return written
+
+        self._failures.pop(destination, None)
+        self._retry_after.pop(destination, None)
+        logger.info(f"Flushed {len(batch)} row(s) to '{destination}'.")
+        return len(batch)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Unexpected error in Sheets write-behind flusher: {e}")
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
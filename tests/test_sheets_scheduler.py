@@ -0,0 +1,153 @@
+# Tests of the Sheets scheduler against the simulated quota server (sheets_fake.FakeQuota). The
+# clock of the scheduler and the quota is injected, so token refills and 429 pauses move only
+# when a test advances it.
+#
+#   python -m pytest -q tests
+import os
+import sys
+import threading
+import time
+
+import pytest
+from gspread.exceptions import APIError
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sheets_fake import FakeQuota, FakeResponse, FakeSheetsBackend
+from sheets_scheduler import READ, WRITE, SheetsScheduler, TokenBucket
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+def start(target, *args) -> threading.Thread:
+    thread = threading.Thread(target=target, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+@pytest.mark.parametrize("limit", [7, 60, 300])
+def test_token_bucket_never_exceeds_the_quota_window(limit):
+    clock = FakeClock()
+    bucket = TokenBucket(limit, period=60.0, clock=clock)
+    quota = FakeQuota(reads=limit, period=60.0, clock=clock)
+    # Five minutes of callers taking every token as soon as it is available
+    steps = 5 * 60 * 4
+    for _ in range(steps):
+        while bucket.take() == 0.0:
+            quota.check("get_all_values")
+        clock.now += 0.25
+    assert quota.rejected["read"] == 0
+    # The initial burst plus the sustained rate (the quota minus the burst per period)
+    assert quota.accepted["read"] >= bucket.capacity + bucket.rate * (steps - 1) * 0.25 - 1
+
+
+def test_destinations_take_turns():
+    clock = FakeClock()
+    scheduler = SheetsScheduler(write_quota=6000, clock=clock)
+    scheduler.buckets[WRITE].tokens = 0.0
+    order = []
+
+    def write(destination: str):
+        scheduler.call(destination, WRITE, lambda: order.append(destination))
+
+    # A burst of ERP writes queues first, then Strategy and R&D
+    threads = []
+    for destination, count in (("erp", 4), ("strategy", 2), ("rnd", 2)):
+        queued = scheduler.queue_depth(WRITE)
+        threads += [start(write, destination) for _ in range(count)]
+        wait_until(lambda: scheduler.queue_depth(WRITE) == queued + count)
+
+    clock.now += 60
+    scheduler.wake()
+    for thread in threads:
+        thread.join(5)
+    assert order == ["erp", "strategy", "rnd", "erp", "strategy", "rnd", "erp", "erp"]
+
+
+def test_429_pauses_the_quota_class_until_the_backoff_ends():
+    clock = FakeClock()
+    quota = FakeQuota(writes=2, period=60.0, clock=clock)
+    backend = FakeSheetsBackend(quota=quota).create_app_spreadsheets()
+    # Another process on the account used up this minute's writes
+    quota.check("append_rows")
+    quota.check("append_rows")
+    scheduler = SheetsScheduler(write_quota=600, backoff_base=10.0, clock=clock)
+    sheets = {destination: scheduler.wrap(backend, destination).open(title).sheet1
+              for destination, title in (("erp", "Maturity_Assessment_Responses"),
+                                         ("strategy", "client_inputs_strategytoolrnd"))}
+
+    first = start(lambda: sheets["erp"].append_rows([["erp"]]))
+    wait_until(lambda: scheduler.stats()["rate_limited"] == 1)
+    bucket = scheduler.buckets[WRITE]
+    assert clock.now + 5.0 <= bucket.paused_until <= clock.now + 10.0
+
+    # Other destinations wait out the pause instead of hitting the quota too
+    second = start(lambda: sheets["strategy"].append_rows([["strategy"]]))
+    wait_until(lambda: scheduler.queue_depth(WRITE) == 2)
+    assert quota.rejected["write"] == 1
+
+    clock.now += 61
+    scheduler.wake()
+    first.join(5)
+    second.join(5)
+    assert quota.rejected["write"] == 1
+    assert quota.accepted["write"] == 4
+    assert scheduler.stats()["failures"] == 0
+
+
+def flaky(status: int, retry_after=None):
+    calls = []
+
+    def call():
+        calls.append(1)
+        if len(calls) == 1:
+            raise APIError(FakeResponse(status, "The service is currently unavailable.", retry_after))
+        return len(calls)
+    return call, calls
+
+
+def test_writes_are_not_resent_after_a_server_error():
+    scheduler = SheetsScheduler(backoff_base=0.001)
+    call, calls = flaky(503)
+    with pytest.raises(APIError):
+        scheduler.call("erp", WRITE, call)
+    assert len(calls) == 1
+
+    # A 503 with Retry-After was not processed, so the write is sent again
+    call, calls = flaky(503, retry_after=0.001)
+    assert scheduler.call("erp", WRITE, call) == 2
+
+    # Reads are always safe to resend
+    call, calls = flaky(500)
+    assert scheduler.call("erp", READ, call) == 2
+
+
+def test_server_error_retries_wait_on_the_scheduler_clock():
+    clock = FakeClock()
+    scheduler = SheetsScheduler(backoff_base=10.0, clock=clock)
+    call, calls = flaky(500)
+    results = []
+    thread = start(lambda: results.append(scheduler.call("erp", READ, call)))
+    wait_until(lambda: scheduler.stats()["retries"] == 1)
+    # The backoff only ends when the injected clock passes it, not after real seconds
+    time.sleep(0.05)
+    assert len(calls) == 1
+
+    clock.now += 10
+    scheduler.wake()
+    thread.join(5)
+    assert results == [2]
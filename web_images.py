@@ -0,0 +1,187 @@
+import hashlib
+import html
+import io
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Rendered widths (px) of the variants; the browser picks one through srcset
+DEFAULT_WIDTHS = tuple(int(width) for width in os.environ.get("WEB_IMAGE_WIDTHS", "768,1280,1920,2560").split(","))
+DEFAULT_QUALITY = int(os.environ.get("WEB_IMAGE_QUALITY", "80"))
+# Served by Streamlit's static file serving (server.enableStaticServing) as app/static/web_images/...
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "web_images")
+STATIC_URL = "app/static/web_images"
+# Bump when build_web_image changes how variants are encoded, so manifests of older encodings are not reused
+ENCODING_VERSION = 2
+
+
+# One encoded variant: WebP, or the JPEG/PNG fallback for browsers without WebP
+class ImageVariant:
+    __slots__ = ("width", "height", "format", "data", "file_name")
+
+    def __init__(self, width: int, height: int, format: str, data: bytes, file_name: str):
+        self.width = width
+        self.height = height
+        self.format = format
+        self.data = data
+        self.file_name = file_name
+
+    @property
+    def mime_type(self) -> str:
+        return f"image/{self.format.lower()}"
+
+    @property
+    def url(self) -> str:
+        return f"{STATIC_URL}/{self.file_name}"
+
+
+# All variants of one source image, smallest first per format
+class WebImage:
+    def __init__(self, source: str, variants: List[ImageVariant], fallback_format: str):
+        self.source = source
+        self.variants = variants
+        self.fallback_format = fallback_format
+
+    def by_format(self, format: str) -> List[ImageVariant]:
+        return [variant for variant in self.variants if variant.format == format]
+
+    # Smallest variant in `format` at least `width` px wide (the largest one if none is)
+    def best(self, width: int, format: Optional[str] = None) -> ImageVariant:
+        candidates = self.by_format(format or self.fallback_format)
+        return next((variant for variant in candidates if variant.width >= width), candidates[-1])
+
+    def srcset(self, format: str) -> str:
+        return ", ".join(f"{variant.url} {variant.width}w" for variant in self.by_format(format))
+
+    # <picture> element letting the browser choose the variant for its viewport and pixel density.
+    # `width` is the displayed CSS width in px; None stretches the image over the container.
+    def html(self, alt: str = "", width: Optional[int] = None) -> str:
+        sizes = f"{width}px" if width else "100vw"
+        fallback = self.best(width or self.by_format(self.fallback_format)[-1].width)
+        style = f"width: {width}px; max-width: 100%;" if width else "width: 100%;"
+        return (
+            f'<picture>'
+            f'<source type="image/webp" srcset="{self.srcset("WEBP")}" sizes="{sizes}">'
+            f'<img src="{fallback.url}" srcset="{self.srcset(self.fallback_format)}" sizes="{sizes}" '
+            f'alt="{html.escape(alt)}" width="{fallback.width}" height="{fallback.height}" '
+            f'style="{style} height: auto;" decoding="async">'
+            f'</picture>'
+        )
+
+
+# Encode `path` once per width and format. Widths above the source width are dropped (the
+# source width is used instead), images with transparency fall back to PNG instead of JPEG.
+def build_web_image(path: str, widths: Sequence[int] = DEFAULT_WIDTHS, quality: int = DEFAULT_QUALITY) -> WebImage:
+    from PIL import Image
+
+    with Image.open(path) as source:
+        source.load()
+    # Palette, RGB and greyscale images are only transparent with a transparency entry (tRNS)
+    has_alpha = source.mode in ("RGBA", "LA", "PA") or "transparency" in source.info
+    fallback_format = "PNG" if has_alpha else "JPEG"
+    stem = os.path.splitext(os.path.basename(path))[0]
+
+    variants = []
+    for width in sorted({min(width, source.width) for width in widths}):
+        height = round(source.height * width / source.width)
+        resized = source if width == source.width else source.resize((width, height), Image.LANCZOS)
+        for format in ("WEBP", fallback_format):
+            image = resized
+            if format == "JPEG" and image.mode != "RGB":
+                image = image.convert("RGB")
+            buffer = io.BytesIO()
+            if format == "WEBP":
+                image.save(buffer, format=format, quality=quality, method=6)
+            elif format == "JPEG":
+                image.save(buffer, format=format, quality=quality, optimize=True, progressive=True)
+            else:
+                image.save(buffer, format=format, optimize=True)
+            data = buffer.getvalue()
+            # The content hash in the name lets browsers cache a variant for as long as it exists
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            variants.append(ImageVariant(width, height, format, data,
+                                         f"{stem}-{width}w-{digest}.{format.lower().replace('jpeg', 'jpg')}"))
+    return WebImage(path, variants, fallback_format)
+
+
+# Process-wide store of encoded web images.
+#
+# Each source image is encoded once, and its variants are written to the static directory under
+# content-hashed names next to a small JSON manifest, so every session and rerun references the
+# same files. A new process reads the manifest and the files back instead of encoding again; a
+# changed source image, width list, quality or ENCODING_VERSION gives a new manifest name.
+class WebImageCache:
+    def __init__(self, static_dir: str = STATIC_DIR, widths: Sequence[int] = DEFAULT_WIDTHS,
+                 quality: int = DEFAULT_QUALITY):
+        self.static_dir = static_dir
+        self.widths = tuple(widths)
+        self.quality = quality
+        self._lock = threading.Lock()
+        self._images: Dict[Tuple, WebImage] = {}
+
+    def get(self, path: str, widths: Optional[Sequence[int]] = None) -> WebImage:
+        widths = tuple(widths or self.widths)
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_mtime, stat.st_size, widths, self.quality, ENCODING_VERSION)
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                return image
+            manifest_path = self._manifest_path(key)
+            image = self._read_files(path, manifest_path)
+            if image is None:
+                image = build_web_image(path, widths, self.quality)
+                self._write_files(image, manifest_path)
+                logger.info(f"Encoded {len(image.variants)} web variant(s) of {path}: "
+                            f"{', '.join(f'{v.width}w {v.format} {len(v.data) // 1024} KiB' for v in image.variants)}.")
+            self._images[key] = image
+            return image
+
+    def _manifest_path(self, key: Tuple) -> str:
+        stem = os.path.splitext(os.path.basename(key[0]))[0]
+        digest = hashlib.sha256(repr(key[1:]).encode("utf-8")).hexdigest()[:12]
+        return os.path.join(self.static_dir, f"{stem}-{digest}.json")
+
+    def _read_files(self, path: str, manifest_path: str) -> Optional[WebImage]:
+        try:
+            with open(manifest_path, 'r') as file:
+                manifest = json.load(file)
+            variants = []
+            for entry in manifest["variants"]:
+                with open(os.path.join(self.static_dir, entry["file_name"]), 'rb') as file:
+                    variants.append(ImageVariant(entry["width"], entry["height"], entry["format"], file.read(),
+                                                 entry["file_name"]))
+        except (OSError, ValueError, KeyError):
+            return None
+        return WebImage(path, variants, manifest["fallback_format"])
+
+    def _write_files(self, image: WebImage, manifest_path: str):
+        try:
+            os.makedirs(self.static_dir, exist_ok=True)
+            for variant in image.variants:
+                file_path = os.path.join(self.static_dir, variant.file_name)
+                if not os.path.exists(file_path):
+                    _write_atomic(file_path, variant.data)
+            manifest = {
+                "source": os.path.basename(image.source),
+                "fallback_format": image.fallback_format,
+                "variants": [{"width": variant.width, "height": variant.height, "format": variant.format,
+                              "file_name": variant.file_name} for variant in image.variants],
+            }
+            _write_atomic(manifest_path, json.dumps(manifest, indent=2).encode("utf-8"))
+        except OSError as e:
+            logger.error(f"Writing web image variants to {self.static_dir} failed: {e}")
+
+
+def _write_atomic(path: str, data: bytes):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as file:
+        file.write(data)
+    os.replace(temp_path, path)
+
+
+WEB_IMAGES = WebImageCache()